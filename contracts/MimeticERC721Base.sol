@@ -0,0 +1,868 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "@openzeppelin/contracts/access/Ownable.sol";
+import "@openzeppelin/contracts/token/ERC721/ERC721.sol";
+import "@openzeppelin/contracts/utils/Strings.sol";
+import "@openzeppelin/contracts/utils/math/SafeCast.sol";
+import "./utils/SSTORE2.sol";
+
+// Mimetic metadata logic on top of a plain ERC721. See `MimeticERC721` for the enumerable flavour.
+abstract contract MimeticERC721Base is ERC721, Ownable {
+    using Strings for uint256;
+    using SafeCast for uint256;
+
+    // Generation ids are stored in 16 bits and tracked in 256-bit words per token, indexed by a single word.
+    uint256 private constant MAX_GENERATIONS = 1 << 16;
+    // Unlock bit of generation 0, which every token holds from the moment it is minted.
+    uint256 internal constant GENESIS_UNLOCK_BIT = 1;
+    // Lowest byte of a string reference pointing to an SSTORE2 blob, shorter strings store their length there.
+    uint256 private constant LONG_STRING = 0xff;
+
+    // Packed into a single storage slot (128 + 16 + 32 + 32 + 3 * 8 bits), so unlock/activate touch one slot per generation.
+    struct Generation {
+        // Price to unlock. Once unlocked, owner may freely switch between the active generations.
+        uint128 price;
+        // Another generation which the user must own before they can unlock a specific generation.
+        uint16 prerequisiteGeneration;
+        // Number of times the specific generation was unlocked (purchased).
+        uint32 unlocks;
+        // Number of current activations the generation has.
+        uint32 activations;
+        // Flag whether the generation is enabled. Only enabled generations may be unlocked or activated.
+        bool enabled;
+        // Flag whether the generation is available for unlocking. Can be used to facilitate offerings for limited periods of time.
+        bool available;
+        // Flag whether the generation is automatically unlocked if the user owns the prerequisite generation.
+        bool autoUnlock;
+    }
+
+    // Properties applied in a single call by `addAndConfigureGeneration`, `addGenerations` and `configureGeneration`.
+    struct GenerationConfig {
+        string name;
+        string baseUri;
+        uint256 price;
+        uint256 prerequisiteGeneration;
+        bool autoUnlock;
+        bool available;
+        bool enabled;
+    }
+
+    // Everything `generations` returns about a generation, for the bulk catalogue getter.
+    struct GenerationInfo {
+        uint256 price;
+        uint256 prerequisiteGeneration;
+        uint256 unlocks;
+        uint256 activations;
+        string name;
+        string baseUri;
+        bool enabled;
+        bool available;
+        bool autoUnlock;
+    }
+
+    Generation[] internal _generations;
+    // Name of the generation, as a string reference (see `_writeString`). Kept out of `Generation` so that the hot
+    // paths never touch it.
+    mapping(uint256 => bytes32) internal _generationNames;
+    // Base URI for the generation, as a string reference, so that resolving a URI reads one slot and at most a single
+    // EXTCODECOPY instead of one SLOAD per 32 bytes. If not set (zero), the `_baseURI` is used.
+    mapping(uint256 => bytes32) internal _generationBaseUris;
+    // Per-token state is only accessed through the `_activeGenerationOf`/`_unlockedGenerationsOf` family of hooks,
+    // so that extensions may store it differently (see `MimeticERC721Compact`).
+    mapping(uint256 => uint256) private _tokenToGenerationId;
+    // bit-encoded generations, 256 per word: token => word index => unlocked generations
+    mapping(uint256 => mapping(uint256 => uint256)) private _tokenToUnlockedGenerations;
+    // bit-encoded indexes of the words above 0 holding unlocks, so that burn only visits those
+    mapping(uint256 => uint256) private _tokenToUnlockedWords;
+    // bit-encoded auto-unlock generations per word, resolved on read by the effective unlock mask views
+    mapping(uint256 => uint256) internal _autoUnlockGenerations;
+    // bit-encoded prerequisite chain of each generation within its own word of 256 generations, so that a prerequisite
+    // check is a single AND against the unlocked word of the token. See `_holdsPrerequisites`.
+    mapping(uint256 => uint256) internal _generationAncestors;
+
+    // In-memory list of counter changes, so that batches write each touched generation slot once.
+    struct CounterDeltas {
+        uint256[] generationIds;
+        int256[] deltas;
+        uint256 length;
+    }
+
+    // Events
+    event GenerationAdded(uint256 indexed generationId);
+    event GenerationEnabledDisabled(uint256 indexed generationId, bool isEnabled);
+    event GenerationUnlocked(uint256 indexed generationId, uint256 indexed tokenId, address indexed sender);
+    event GenerationActivated(uint256 indexed generationId, uint256 indexed tokenId);
+    event GenerationBaseUriChanged(uint256 indexed generationId);
+
+    modifier whenGenerationDisabled(uint256 _generationId) {
+        require(_generationId < _generations.length && !_generations[_generationId].enabled, "MimeticERC721: Generation must be disabled");
+        _;
+    }
+
+    modifier whenGenerationEnabled(uint256 _generationId) {
+        require(_generationId < _generations.length && _generations[_generationId].enabled, "MimeticERC721: Generation must be enabled");
+        _;
+    }
+
+    modifier whenGenerationAvailable(uint256 _generationId) {
+        require(_generationId < _generations.length && _generations[_generationId].available, "MimeticERC721: Generation unavailable");
+        _;
+    }
+
+    function addGeneration(
+            string memory _name,
+            string memory _baseUri,
+            uint256 _price,
+            uint256 _prereqGeneration,
+            bool _autoUnlock) public onlyOwner {
+        _addGeneration(_name, _baseUri, _price, _prereqGeneration, _autoUnlock, false, false);
+    }
+
+    // Adds a generation with its availability and enabled flag already applied, instead of following `addGeneration`
+    // with `setGenerationAvailability` and `enableGeneration`. Returns the new generation id.
+    function addAndConfigureGeneration(GenerationConfig calldata _config) public onlyOwner returns (uint256) {
+        return _addConfiguredGeneration(_config);
+    }
+
+    // Adds a generation per config, in order, so a config may use any of the preceding ones as its prerequisite.
+    // Returns the id of the first added generation.
+    function addGenerations(GenerationConfig[] calldata _configs) public onlyOwner returns (uint256 firstId) {
+        firstId = _generations.length;
+        for (uint256 i = 0; i < _configs.length; ++i) {
+            _addConfiguredGeneration(_configs[i]);
+        }
+    }
+
+    // Applies the name, price, prerequisite, availability and enabled flag of a disabled generation in a single
+    // storage write. An empty base URI keeps the current one. The auto-unlock flag of a generation cannot change.
+    function configureGeneration(uint256 _generationId, GenerationConfig calldata _config)
+            public
+            whenGenerationDisabled(_generationId)
+            onlyOwner {
+        Generation memory gen = _generations[_generationId];
+        uint256 prereqId = _config.prerequisiteGeneration;
+        require(bytes(_config.name).length > 0, "MimeticERC721: Invalid generation name");
+        require(_config.autoUnlock == gen.autoUnlock, "MimeticERC721: Auto-unlock flag cannot be changed");
+        require(!gen.autoUnlock || _config.price == 0, "MimeticERC721: Auto-unlock must be free");
+        require(prereqId <= _generationId && !_generations[prereqId].autoUnlock, "MimeticERC721: Invalid prerequisite generation");
+        if (_config.enabled) {
+            require(_generationId == prereqId || _generations[prereqId].enabled, "MimeticERC721: Prerequisite must be enabled");
+        }
+
+        bool prereqChanged = gen.prerequisiteGeneration != prereqId;
+        gen.price = _config.price.toUint128();
+        gen.prerequisiteGeneration = uint16(prereqId);
+        gen.available = _config.available;
+        gen.enabled = _config.enabled;
+        _generations[_generationId] = gen;
+        if (prereqChanged) {
+            _updateAncestors(_generationId);
+        }
+
+        _generationNames[_generationId] = _writeString(_generationNames[_generationId], _config.name);
+        if (bytes(_config.baseUri).length > 0) {
+            _generationBaseUris[_generationId] = _writeString(_generationBaseUris[_generationId], _config.baseUri);
+            emit GenerationBaseUriChanged(_generationId);
+        }
+        if (_config.enabled) {
+            emit GenerationEnabledDisabled(_generationId, true);
+        }
+    }
+
+    function removeGeneration(uint256 _generationId)
+            public
+            whenGenerationDisabled(_generationId)
+            onlyOwner {
+        require(_generationId + 1 == _generations.length, "MimeticERC721: Only the most recently added generation may be removed");
+        // Minting does not require generation 0 to be enabled, so a disabled generation may still hold unlocks.
+        require(_generations[_generationId].unlocks == 0, "MimeticERC721: Generation already has unlocks");
+        _generations.pop();
+        delete _generationNames[_generationId];
+        delete _generationBaseUris[_generationId];
+        delete _generationAncestors[_generationId];
+        _autoUnlockGenerations[_generationId >> 8] &= ~_generationBit(_generationId);
+    }
+
+    function generations(uint256 _generationId)
+            public
+            view
+            returns (
+                uint256 price,
+                uint256 prerequisiteGeneration,
+                uint256 unlocks,
+                uint256 activations,
+                string memory name,
+                string memory baseUri,
+                bool enabled,
+                bool available,
+                bool autoUnlock) {
+        // Same shape as the getter of the former unpacked struct, so existing clients keep working.
+        Generation storage gen = _generations[_generationId];
+        price = gen.price;
+        prerequisiteGeneration = gen.prerequisiteGeneration;
+        unlocks = gen.unlocks;
+        activations = gen.activations;
+        name = _readString(_generationNames[_generationId]);
+        baseUri = _readString(_generationBaseUris[_generationId]);
+        enabled = gen.enabled;
+        available = gen.available;
+        autoUnlock = gen.autoUnlock;
+    }
+
+    // Returns generations `_from` to `_to` (exclusive). `_to` is capped at the generation count, so the whole
+    // catalogue can be read with `getGenerations(0, type(uint256).max)`.
+    function getGenerations(uint256 _from, uint256 _to) public view returns (GenerationInfo[] memory infos) {
+        if (_to > _generations.length) {
+            _to = _generations.length;
+        }
+        require(_from <= _to, "MimeticERC721: Invalid generation range");
+
+        infos = new GenerationInfo[](_to - _from);
+        for (uint256 i = 0; i < infos.length; ++i) {
+            uint256 generationId = _from + i;
+            Generation storage gen = _generations[generationId];
+            infos[i] = GenerationInfo({
+                 price: gen.price
+                ,prerequisiteGeneration: gen.prerequisiteGeneration
+                ,unlocks: gen.unlocks
+                ,activations: gen.activations
+                ,name: _readString(_generationNames[generationId])
+                ,baseUri: _readString(_generationBaseUris[generationId])
+                ,enabled: gen.enabled
+                ,available: gen.available
+                ,autoUnlock: gen.autoUnlock
+            });
+        }
+    }
+
+    // Returns the generation count and the enabled, available and auto-unlock flags of every generation, bit-encoded
+    // 256 generations per word like the unlocked generations of a token.
+    function getGenerationFlags()
+            public
+            view
+            returns (uint256 count, uint256[] memory enabled, uint256[] memory available, uint256[] memory autoUnlock) {
+        count = _generations.length;
+        uint256 wordCount = (count + 255) >> 8;
+        enabled = new uint256[](wordCount);
+        available = new uint256[](wordCount);
+        autoUnlock = new uint256[](wordCount);
+
+        for (uint256 generationId = 0; generationId < count; ++generationId) {
+            Generation storage gen = _generations[generationId];
+            if (gen.enabled) {
+                enabled[generationId >> 8] |= _generationBit(generationId);
+            }
+            if (gen.available) {
+                available[generationId >> 8] |= _generationBit(generationId);
+            }
+        }
+        for (uint256 wordIndex = 0; wordIndex < wordCount; ++wordIndex) {
+            autoUnlock[wordIndex] = _autoUnlockGenerations[wordIndex];
+        }
+    }
+
+    function tokenToGenerationId(uint256 _tokenId) public view returns (uint256) {
+        return _activeGenerationOf(_tokenId);
+    }
+
+    function tokenToGenerationIds(uint256[] calldata _tokenIds) public view returns (uint256[] memory generationIds) {
+        generationIds = new uint256[](_tokenIds.length);
+        for (uint256 i = 0; i < _tokenIds.length; ++i) {
+            generationIds[i] = _activeGenerationOf(_tokenIds[i]);
+        }
+    }
+
+    // Returns the first word of the bit-encoded unlocked generations, i.e. generations 0-255.
+    function tokenToUnlockedGenerations(uint256 _tokenId) public view returns (uint256) {
+        return _unlockedGenerationsOf(_tokenId, 0);
+    }
+
+    // Returns the bit-encoded unlocked generations `256 * _wordIndex` to `256 * _wordIndex + 255`.
+    function unlockedGenerationsWord(uint256 _tokenId, uint256 _wordIndex) public view returns (uint256) {
+        return _unlockedGenerationsOf(_tokenId, _wordIndex);
+    }
+
+    function getGenerationCount() public view returns (uint256) {
+        return _generations.length;
+    }
+
+    function setGenerationName(uint256 _generationId, string memory _newName)
+            public
+            whenGenerationDisabled(_generationId)
+            onlyOwner {
+        require(bytes(_newName).length > 0, "MimeticERC721: Invalid generation name");
+        _generationNames[_generationId] = _writeString(_generationNames[_generationId], _newName);
+    }
+
+    function setGenerationBaseUri(uint256 _generationId, string memory _baseUri)
+            public
+            onlyOwner {
+        require(_generationId < _generations.length, "MimeticERC721: Invalid generation");
+        require(bytes(_baseUri).length > 0, "MimeticERC721: Invalid base URI");
+        _generationBaseUris[_generationId] = _writeString(_generationBaseUris[_generationId], _baseUri);
+        emit GenerationBaseUriChanged(_generationId);
+    }
+
+    function setGenerationPrice(uint256 _generationId, uint256 _price)
+            public
+            whenGenerationDisabled(_generationId)
+            onlyOwner {
+        require(!_generations[_generationId].autoUnlock, "MimeticERC721: Auto-unlock must be free");
+        _generations[_generationId].price = _price.toUint128();
+    }
+
+    function setGenerationPrerequisite(uint256 _generationId, uint256 _prereqGeneration)
+            public
+            whenGenerationDisabled(_generationId)
+            onlyOwner {
+        // Like in `addGeneration`, a prerequisite is an earlier generation, so prerequisite chains never loop.
+        require(_generationId >= _prereqGeneration, "MimeticERC721: Invalid prerequisite generation");
+        require(!_generations[_prereqGeneration].autoUnlock, "MimeticERC721: Invalid prerequisite generation");
+        Generation storage gen = _generations[_generationId];
+        if (gen.prerequisiteGeneration != _prereqGeneration) {
+            gen.prerequisiteGeneration = uint16(_prereqGeneration);
+            _updateAncestors(_generationId);
+        }
+    }
+
+    function setGenerationAvailability(uint256 _generationId, bool _availability)
+             public
+             onlyOwner {
+        require(_generationId < _generations.length, "MimeticERC721: Invalid generation");
+        _generations[_generationId].available = _availability;
+    }
+
+    function enableGeneration(uint256 _generationId)
+            public
+            whenGenerationDisabled(_generationId)
+            onlyOwner {
+        Generation storage gen = _generations[_generationId];
+        uint256 prereqId = gen.prerequisiteGeneration;
+        require(_generationId == prereqId || _generations[prereqId].enabled, "MimeticERC721: Prerequisite must be enabled");
+        gen.enabled = true;
+        emit GenerationEnabledDisabled(_generationId, true);
+    }
+
+    function disableGeneration(uint256 _generationId)
+            public
+            whenGenerationEnabled(_generationId)
+            onlyOwner {
+        Generation storage gen = _generations[_generationId];
+        if (gen.autoUnlock) {
+            require(gen.activations == 0, "MimeticERC721: Generation is actively used");
+        } else {
+            require(gen.unlocks == 0, "MimeticERC721: Generation already has unlocks");
+        }
+
+        gen.enabled = false;
+        emit GenerationEnabledDisabled(_generationId, false);
+    }
+
+    function isGenerationUnlocked(uint256 _tokenId, uint256 _generationId) public view returns (bool) {
+        Generation storage gen = _generations[_generationId];
+        // Auto-unlock generations may not depend on another auto-unlock generation, so a single hop is enough.
+        return _isUnlocked(_tokenId, gen.autoUnlock ? gen.prerequisiteGeneration : _generationId);
+    }
+
+    // Returns the bit-encoded generations 0-255 unlocked by the token, including the auto-unlocked ones.
+    function effectiveUnlockMask(uint256 _tokenId) public view returns (uint256) {
+        return _effectiveUnlockMask(_tokenId, 0);
+    }
+
+    // Same as `effectiveUnlockMask` for generations `256 * _wordIndex` to `256 * _wordIndex + 255`.
+    function effectiveUnlockMaskWord(uint256 _tokenId, uint256 _wordIndex) public view returns (uint256) {
+        return _effectiveUnlockMask(_tokenId, _wordIndex);
+    }
+
+    function effectiveUnlockMasks(uint256[] calldata _tokenIds) public view returns (uint256[] memory masks) {
+        masks = new uint256[](_tokenIds.length);
+        for (uint256 i = 0; i < _tokenIds.length; ++i) {
+            masks[i] = _effectiveUnlockMask(_tokenIds[i], 0);
+        }
+    }
+
+    // Returns the bit-encoded generations 0-255 the token can unlock right now (enabled, available, not auto-unlocked,
+    // not unlocked yet and with the prerequisites held) and their summed price, the `value` to unlock them all with
+    // `unlockGenerations`.
+    function getUnlockableGenerations(uint256 _tokenId) public view returns (uint256 mask, uint256 totalPrice) {
+        return _unlockableGenerations(_tokenId, 0);
+    }
+
+    // Same as `getUnlockableGenerations` for generations `256 * _wordIndex` to `256 * _wordIndex + 255`.
+    function getUnlockableGenerationsWord(uint256 _tokenId, uint256 _wordIndex)
+            public
+            view
+            returns (uint256 mask, uint256 totalPrice) {
+        return _unlockableGenerations(_tokenId, _wordIndex);
+    }
+
+    // Resolves through the base URI of the active generation, see `_generationTokenURI`.
+    function tokenURI(uint256 _tokenId) public view virtual override returns (string memory) {
+        require(_exists(_tokenId), "ERC721Metadata: URI query for nonexistent token");
+        return _generationTokenURI(_tokenId);
+    }
+
+    // Batch of `tokenURI`, so that metadata refreshers can fetch a page of URIs in a single call.
+    function tokenURIs(uint256[] calldata _tokenIds) public view returns (string[] memory uris) {
+        uris = new string[](_tokenIds.length);
+        for (uint256 i = 0; i < _tokenIds.length; ++i) {
+            require(_exists(_tokenIds[i]), "ERC721Metadata: URI query for nonexistent token");
+            uris[i] = _generationTokenURI(_tokenIds[i]);
+        }
+    }
+
+    function unlockGeneration(uint256 _tokenId, uint256 _generationId) public payable {
+        uint256 price = _unlockGeneration(_tokenId, _generationId, true);
+        require(msg.value >= price, "MimeticERC721: Insufficient funds");
+        _generations[_generationId].unlocks++;
+    }
+
+    function unlockGenerations(uint256[] calldata _tokenIds, uint256[] calldata _generationIds) public payable {
+        require(_tokenIds.length == _generationIds.length, "MimeticERC721: Array length mismatch");
+
+        CounterDeltas memory unlockDeltas = _newCounterDeltas(_tokenIds.length);
+        uint256 totalPrice;
+        for (uint256 i = 0; i < _tokenIds.length; ++i) {
+            uint256 generationId = _generationIds[i];
+            totalPrice += _unlockGeneration(_tokenIds[i], generationId, true);
+            _addCounterDelta(unlockDeltas, generationId, 1);
+        }
+        require(msg.value >= totalPrice, "MimeticERC721: Insufficient funds");
+
+        _applyUnlockDeltas(unlockDeltas);
+    }
+
+    function activateGeneration(uint256 _tokenId, uint256 _generationId) public {
+        uint256 previousId = _activateGeneration(msg.sender, _tokenId, _generationId);
+        _generations[previousId].activations--;
+        _generations[_generationId].activations++;
+    }
+
+    function activateGenerations(uint256[] calldata _tokenIds, uint256 _generationId) public {
+        CounterDeltas memory activationDeltas = _newCounterDeltas(2 * _tokenIds.length);
+        for (uint256 i = 0; i < _tokenIds.length; ++i) {
+            _activateGenerationDeferred(activationDeltas, msg.sender, _tokenIds[i], _generationId);
+        }
+        _applyActivationDeltas(activationDeltas);
+    }
+
+    function activateGenerations(uint256[] calldata _tokenIds, uint256[] calldata _generationIds) public {
+        require(_tokenIds.length == _generationIds.length, "MimeticERC721: Array length mismatch");
+
+        CounterDeltas memory activationDeltas = _newCounterDeltas(2 * _tokenIds.length);
+        for (uint256 i = 0; i < _tokenIds.length; ++i) {
+            _activateGenerationDeferred(activationDeltas, msg.sender, _tokenIds[i], _generationIds[i]);
+        }
+        _applyActivationDeltas(activationDeltas);
+    }
+
+    // Validates the unlock and marks the generation as unlocked for the token. Returns the price to be paid.
+    // Updating the generation `unlocks` counter is left to the caller. Unlocks which are not purchases, like grants,
+    // may skip the availability check.
+    function _unlockGeneration(uint256 _tokenId, uint256 _generationId, bool _requireAvailable) internal returns (uint256) {
+        require(_generationId < _generations.length, "MimeticERC721: Generation must be enabled");
+        Generation memory gen = _generations[_generationId];
+        require(gen.enabled, "MimeticERC721: Generation must be enabled");
+        require(!_requireAvailable || gen.available, "MimeticERC721: Generation unavailable");
+
+        uint256 wordIndex = _generationId >> 8;
+        uint256 unlockBit = _generationBit(_generationId);
+        uint256 unlocksForToken = _unlockedGenerationsOf(_tokenId, wordIndex);
+        require(!gen.autoUnlock && unlocksForToken & unlockBit != unlockBit, "MimeticERC721: Generation already unlocked");
+
+        require(
+            _holdsPrerequisites(_tokenId, _generationId, gen.prerequisiteGeneration, unlocksForToken),
+            "MimeticERC721: Must unlock prerequisite generation first"
+        );
+
+        _setUnlockedGenerations(_tokenId, wordIndex, unlocksForToken | unlockBit);
+
+        emit GenerationUnlocked(_generationId, _tokenId, msg.sender);
+        return gen.price;
+    }
+
+    // Validates the activation on behalf of `_holder` and switches the token to the generation. Returns the previously
+    // active generation. Updating the generation `activations` counters is left to the caller.
+    function _activateGeneration(address _holder, uint256 _tokenId, uint256 _generationId) internal returns (uint256) {
+        require(_generationId < _generations.length, "MimeticERC721: Generation must be enabled");
+        Generation memory gen = _generations[_generationId];
+        require(gen.enabled, "MimeticERC721: Generation must be enabled");
+        require(ownerOf(_tokenId) == _holder, "MimeticERC721: Must be token owner");
+
+        if (gen.autoUnlock) {
+            require(isGenerationUnlocked(_tokenId, gen.prerequisiteGeneration), "MimeticERC721: Must unlock prerequisite generation first");
+        } else {
+            require(_isUnlocked(_tokenId, _generationId), "MimeticERC721: Must unlock first");
+        }
+
+        uint256 previousId = _activeGenerationOf(_tokenId);
+        _setActiveGeneration(_tokenId, _generationId);
+
+        emit GenerationActivated(_generationId, _tokenId);
+        return previousId;
+    }
+
+    function _activateGenerationDeferred(
+            CounterDeltas memory _activationDeltas,
+            address _holder,
+            uint256 _tokenId,
+            uint256 _generationId) internal {
+        uint256 previousId = _activateGeneration(_holder, _tokenId, _generationId);
+        if (previousId != _generationId) {
+            _addCounterDelta(_activationDeltas, previousId, -1);
+            _addCounterDelta(_activationDeltas, _generationId, 1);
+        }
+    }
+
+    function _newCounterDeltas(uint256 _capacity) internal pure returns (CounterDeltas memory) {
+        return CounterDeltas(new uint256[](_capacity), new int256[](_capacity), 0);
+    }
+
+    // Linear lookup is used since batches usually touch only a handful of generations, and unlike an array indexed
+    // by generation id its cost does not grow with the catalogue size.
+    function _addCounterDelta(CounterDeltas memory _counterDeltas, uint256 _generationId, int256 _delta) internal pure {
+        for (uint256 i = 0; i < _counterDeltas.length; ++i) {
+            if (_counterDeltas.generationIds[i] == _generationId) {
+                _counterDeltas.deltas[i] += _delta;
+                return;
+            }
+        }
+        _counterDeltas.generationIds[_counterDeltas.length] = _generationId;
+        _counterDeltas.deltas[_counterDeltas.length] = _delta;
+        _counterDeltas.length++;
+    }
+
+    function _applyUnlockDeltas(CounterDeltas memory _unlockDeltas) internal {
+        for (uint256 i = 0; i < _unlockDeltas.length; ++i) {
+            _generations[_unlockDeltas.generationIds[i]].unlocks += uint256(_unlockDeltas.deltas[i]).toUint32();
+        }
+    }
+
+    function _applyActivationDeltas(CounterDeltas memory _activationDeltas) internal {
+        for (uint256 i = 0; i < _activationDeltas.length; ++i) {
+            int256 delta = _activationDeltas.deltas[i];
+            if (delta > 0) {
+                _generations[_activationDeltas.generationIds[i]].activations += uint256(delta).toUint32();
+            } else if (delta < 0) {
+                _generations[_activationDeltas.generationIds[i]].activations -= uint256(-delta).toUint32();
+            }
+        }
+    }
+
+    function _addConfiguredGeneration(GenerationConfig calldata _config) private returns (uint256) {
+        return _addGeneration(
+            _config.name,
+            _config.baseUri,
+            _config.price,
+            _config.prerequisiteGeneration,
+            _config.autoUnlock,
+            _config.available,
+            _config.enabled
+        );
+    }
+
+    function _addGeneration(
+            string memory _name,
+            string memory _baseUri,
+            uint256 _price,
+            uint256 _prereqGeneration,
+            bool _autoUnlock,
+            bool _available,
+            bool _enabled) internal returns (uint256 newId) {
+        newId = _generations.length;
+        require(newId < _maxGenerations(), "MimeticERC721: Generation limit reached");
+        require(bytes(_name).length > 0, "MimeticERC721: Invalid generation name");
+        require(newId >= _prereqGeneration, "MimeticERC721: Invalid prerequisite generation");
+        require(newId == _prereqGeneration || !_generations[_prereqGeneration].autoUnlock, "MimeticERC721: Invalid prerequisite generation");
+        if (_autoUnlock) {
+            require(newId != _prereqGeneration, "MimeticERC721: Invalid prerequisite generation");
+            require(_price == 0, "MimeticERC721: Auto-unlock generation must have no associated price");
+        }
+        if (_enabled) {
+            require(newId == _prereqGeneration || _generations[_prereqGeneration].enabled, "MimeticERC721: Prerequisite must be enabled");
+        }
+
+        emit GenerationAdded(newId);
+
+        _generations.push(Generation({
+             enabled: _enabled
+            ,price: _price.toUint128()
+            ,prerequisiteGeneration: uint16(_prereqGeneration)
+            ,unlocks: 0
+            ,activations: 0
+            ,autoUnlock: _autoUnlock
+            ,available: _available
+        }));
+        _generationNames[newId] = _writeString(bytes32(0), _name);
+        _generationBaseUris[newId] = _writeString(bytes32(0), _baseUri);
+        if (_autoUnlock) {
+            _autoUnlockGenerations[newId >> 8] |= _generationBit(newId);
+        }
+        uint256 ancestors = _ancestorsThrough(newId, _prereqGeneration);
+        if (ancestors != 0) {
+            _generationAncestors[newId] = ancestors;
+        }
+        if (_enabled) {
+            emit GenerationEnabledDisabled(newId, true);
+        }
+    }
+
+    // Ancestors of a generation with the given prerequisite within the word of the generation: the prerequisite and its
+    // own ancestors, or none if the prerequisite is the generation itself or lies in an earlier word.
+    function _ancestorsThrough(uint256 _generationId, uint256 _prereqId) internal view returns (uint256) {
+        if (_prereqId == _generationId || _prereqId >> 8 != _generationId >> 8) {
+            return 0;
+        }
+        return _generationAncestors[_prereqId] | _generationBit(_prereqId);
+    }
+
+    // Rebuilds the ancestors of a generation after its prerequisite changed, and of the later generations of the same
+    // word which descend from it, so the cost grows with the number of generations added after it in its word.
+    // Descendants in later words only record the part of the chain within their own word and are left untouched.
+    function _updateAncestors(uint256 _generationId) internal {
+        _generationAncestors[_generationId] = _ancestorsThrough(
+            _generationId,
+            _generations[_generationId].prerequisiteGeneration
+        );
+
+        uint256 generationBit = _generationBit(_generationId);
+        uint256 wordEnd = ((_generationId >> 8) + 1) << 8;
+        if (wordEnd > _generations.length) {
+            wordEnd = _generations.length;
+        }
+        // in id order, so that the prerequisite of a descendant is always rebuilt before it
+        for (uint256 descendantId = _generationId + 1; descendantId < wordEnd; ++descendantId) {
+            if (_generationAncestors[descendantId] & generationBit != 0) {
+                _generationAncestors[descendantId] = _ancestorsThrough(
+                    descendantId,
+                    _generations[descendantId].prerequisiteGeneration
+                );
+            }
+        }
+    }
+
+    // Whether the token holds the prerequisites of a generation. Within the word of the generation that is a single AND
+    // of its ancestors against `_unlocksForToken`, the unlocked word of the token. A chain continuing into an earlier
+    // word does not need to be followed: a prerequisite can only change while no token holds the generation, so a token
+    // holding a generation holds its whole chain, and the deepest ancestor in the word, or the prerequisite itself when
+    // it lies in an earlier word, stands for the rest. Prerequisites are never auto-unlock generations.
+    function _holdsPrerequisites(
+            uint256 _tokenId,
+            uint256 _generationId,
+            uint256 _prereqId,
+            uint256 _unlocksForToken) internal view returns (bool) {
+        if (_prereqId == _generationId) {
+            return true;
+        }
+        if (_prereqId >> 8 != _generationId >> 8) {
+            return _isUnlocked(_tokenId, _prereqId);
+        }
+        uint256 ancestors = _generationAncestors[_generationId];
+        return _unlocksForToken & ancestors == ancestors;
+    }
+
+    function _unlockableGenerations(uint256 _tokenId, uint256 _wordIndex)
+            internal
+            view
+            returns (uint256 mask, uint256 totalPrice) {
+        uint256 unlocksForToken = _unlockedGenerationsOf(_tokenId, _wordIndex);
+        uint256 firstId = _wordIndex << 8;
+        uint256 endId = firstId + 256;
+        if (endId > _generations.length) {
+            endId = _generations.length;
+        }
+
+        for (uint256 generationId = firstId; generationId < endId; ++generationId) {
+            Generation memory gen = _generations[generationId];
+            uint256 unlockBit = _generationBit(generationId);
+            if (
+                gen.enabled
+                && gen.available
+                && !gen.autoUnlock
+                && unlocksForToken & unlockBit == 0
+                && _holdsPrerequisites(_tokenId, generationId, gen.prerequisiteGeneration, unlocksForToken)
+            ) {
+                mask |= unlockBit;
+                totalPrice += gen.price;
+            }
+        }
+    }
+
+    function _isUnlocked(uint256 _tokenId, uint256 _generationId) internal view returns (bool) {
+        uint256 unlockBit = _generationBit(_generationId);
+        return _unlockedGenerationsOf(_tokenId, _generationId >> 8) & unlockBit == unlockBit;
+    }
+
+    function _effectiveUnlockMask(uint256 _tokenId, uint256 _wordIndex) internal view returns (uint256 mask) {
+        mask = _unlockedGenerationsOf(_tokenId, _wordIndex);
+        uint256 autoUnlockGenerations = _autoUnlockGenerations[_wordIndex];
+        while (autoUnlockGenerations != 0) {
+            uint256 generationId = (_wordIndex << 8) | _lowestBitIndex(autoUnlockGenerations);
+            if (_isUnlocked(_tokenId, _generations[generationId].prerequisiteGeneration)) {
+                mask |= _generationBit(generationId);
+            }
+            autoUnlockGenerations &= autoUnlockGenerations - 1;
+        }
+    }
+
+    function _generationBaseURI(uint256 _tokenId) internal view virtual returns (string memory) {
+        bytes32 baseUri = _generationBaseUris[_activeGenerationOf(_tokenId)];
+
+        // Check if revealed
+        if (baseUri != bytes32(0)) {
+            return _readString(baseUri);
+        }
+
+        // Use ERC721._baseURI() as the unrevealed URI, since it is not applicable for anything else anyway.
+        return _baseURI();
+    }
+
+    // `generationBaseUri + tokenId` of the active generation, or the unrevealed URI as is. Only the reference slot is
+    // loaded to check for the reveal, and a long base URI is copied once from the code of its pointer.
+    function _generationTokenURI(uint256 _tokenId) internal view virtual returns (string memory) {
+        bytes32 baseUri = _generationBaseUris[_activeGenerationOf(_tokenId)];
+
+        if (baseUri == bytes32(0)) {
+            return _baseURI();
+        }
+
+        return string(abi.encodePacked(_readString(baseUri), _tokenId.toString()));
+    }
+
+    // String references fit a single slot. Strings of up to 31 bytes are stored inline, left aligned with their length
+    // in the lowest byte, so the empty string is zero. Longer strings are SSTORE2 blobs, with the pointer in the
+    // highest 20 bytes and `LONG_STRING` in the lowest one. A blob is only deployed when the value differs from
+    // `_current`, compared by code hash, since a CREATE costs more than 32000 gas while an unchanged short string is
+    // a no-op SSTORE.
+    function _writeString(bytes32 _current, string memory _value) internal returns (bytes32 ref) {
+        uint256 length = bytes(_value).length;
+        if (length < 32) {
+            assembly {
+                ref := or(and(mload(add(_value, 0x20)), not(shr(shl(3, length), not(0)))), length)
+            }
+            return ref;
+        }
+        if (uint8(uint256(_current)) == LONG_STRING && SSTORE2.equals(address(bytes20(_current)), bytes(_value))) {
+            return _current;
+        }
+        return bytes32(bytes20(SSTORE2.write(bytes(_value)))) | bytes32(LONG_STRING);
+    }
+
+    function _readString(bytes32 _ref) internal view returns (string memory value) {
+        uint256 length = uint8(uint256(_ref));
+        if (length == LONG_STRING) {
+            return string(SSTORE2.read(address(bytes20(_ref))));
+        }
+        value = new string(length);
+        if (length > 0) {
+            assembly {
+                mstore(add(value, 0x20), xor(_ref, length))
+            }
+        }
+    }
+
+    // Generation 0 is implicitly unlocked and active while a token has no per-token state, so minting does not
+    // write anything per token besides the ERC721 bookkeeping.
+    function _mint(address _to, uint256 _tokenId) internal virtual override {
+        super._mint(_to, _tokenId);
+
+        Generation storage gen = _generations[0];
+        gen.unlocks++;
+        gen.activations++;
+    }
+
+    // Mints `_quantity` consecutive tokens starting at `_startTokenId`, bumping the generation 0 counters once.
+    function _mintBatch(address _to, uint256 _startTokenId, uint256 _quantity) internal virtual {
+        for (uint256 i = 0; i < _quantity; ++i) {
+            super._mint(_to, _startTokenId + i);
+        }
+
+        Generation storage gen = _generations[0];
+        uint32 quantity = _quantity.toUint32();
+        gen.unlocks += quantity;
+        gen.activations += quantity;
+    }
+
+    function _burn(uint256 _tokenId) internal virtual override {
+        // Visit only the words and generations held by the token, so the cost does not depend on the catalogue size.
+        uint256 unlockedWords = _unlockedWordsOf(_tokenId);
+        while (unlockedWords != 0) {
+            uint256 wordIndex = _lowestBitIndex(unlockedWords);
+            uint256 unlockedGenerations = _unlockedGenerationsOf(_tokenId, wordIndex);
+            while (unlockedGenerations != 0) {
+                // decrement unlock counter so that owner may disable the generation at a later date if needed
+                _generations[(wordIndex << 8) | _lowestBitIndex(unlockedGenerations)].unlocks--;
+                unlockedGenerations &= unlockedGenerations - 1;
+            }
+            unlockedWords &= unlockedWords - 1;
+        }
+
+        uint256 activeGeneration = _activeGenerationOf(_tokenId);
+        _generations[activeGeneration].activations--;
+        _clearTokenState(_tokenId);
+
+        super._burn(_tokenId);
+    }
+
+    function _maxGenerations() internal view virtual returns (uint256) {
+        return MAX_GENERATIONS;
+    }
+
+    function _activeGenerationOf(uint256 _tokenId) internal view virtual returns (uint256) {
+        return _tokenToGenerationId[_tokenId];
+    }
+
+    // Generation 0 must always be reported as unlocked, since it is never written to storage on mint.
+    function _unlockedGenerationsOf(uint256 _tokenId, uint256 _wordIndex) internal view virtual returns (uint256) {
+        uint256 unlockedGenerations = _tokenToUnlockedGenerations[_tokenId][_wordIndex];
+        return _wordIndex == 0 ? unlockedGenerations | GENESIS_UNLOCK_BIT : unlockedGenerations;
+    }
+
+    // Returns the bit-encoded indexes of the words which may hold unlocks for the token. Word 0 is always included.
+    function _unlockedWordsOf(uint256 _tokenId) internal view virtual returns (uint256) {
+        return _tokenToUnlockedWords[_tokenId] | 1;
+    }
+
+    function _setActiveGeneration(uint256 _tokenId, uint256 _generationId) internal virtual {
+        _tokenToGenerationId[_tokenId] = _generationId;
+    }
+
+    function _setUnlockedGenerations(uint256 _tokenId, uint256 _wordIndex, uint256 _unlockedGenerations) internal virtual {
+        if (_wordIndex != 0 && _tokenToUnlockedGenerations[_tokenId][_wordIndex] == 0) {
+            _tokenToUnlockedWords[_tokenId] |= 1 << _wordIndex;
+        }
+        _tokenToUnlockedGenerations[_tokenId][_wordIndex] = _unlockedGenerations;
+    }
+
+    function _clearTokenState(uint256 _tokenId) internal virtual {
+        uint256 unlockedWords = _unlockedWordsOf(_tokenId);
+        while (unlockedWords != 0) {
+            delete _tokenToUnlockedGenerations[_tokenId][_lowestBitIndex(unlockedWords)];
+            unlockedWords &= unlockedWords - 1;
+        }
+        delete _tokenToUnlockedWords[_tokenId];
+        delete _tokenToGenerationId[_tokenId];
+    }
+
+    function _generationBit(uint256 _generationId) internal pure returns (uint256) {
+        return 1 << (_generationId & 0xff);
+    }
+
+    // Returns the index of the least significant set bit of a non-zero word.
+    function _lowestBitIndex(uint256 _word) internal pure returns (uint256 index) {
+        uint256 bit;
+        unchecked {
+            bit = _word & (~_word + 1);
+        }
+
+        if (bit >= 1 << 128) { bit >>= 128; index += 128; }
+        if (bit >= 1 << 64) { bit >>= 64; index += 64; }
+        if (bit >= 1 << 32) { bit >>= 32; index += 32; }
+        if (bit >= 1 << 16) { bit >>= 16; index += 16; }
+        if (bit >= 1 << 8) { bit >>= 8; index += 8; }
+        if (bit >= 1 << 4) { bit >>= 4; index += 4; }
+        if (bit >= 1 << 2) { bit >>= 2; index += 2; }
+        if (bit >= 1 << 1) { index += 1; }
+    }
+}
@@ -0,0 +1,46 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "../MimeticERC721Base.sol";
+
+// Opt-in storage mode which keeps the whole per-token state in a single word: the active generation id in the
+// top 8 bits and the bit-encoded unlocked generations in the low 248 bits. Unlocking and activating then touch one
+// storage slot per token instead of two, at the cost of limiting the collection to 248 generations.
+abstract contract MimeticERC721Compact is MimeticERC721Base {
+    uint256 private constant COMPACT_MAX_GENERATIONS = 248;
+    uint256 private constant ACTIVE_GENERATION_SHIFT = 248;
+    uint256 private constant UNLOCKED_GENERATIONS_MASK = (1 << 248) - 1;
+
+    mapping(uint256 => uint256) private _tokenStates;
+
+    function _maxGenerations() internal view virtual override returns (uint256) {
+        return COMPACT_MAX_GENERATIONS;
+    }
+
+    function _activeGenerationOf(uint256 _tokenId) internal view virtual override returns (uint256) {
+        return _tokenStates[_tokenId] >> ACTIVE_GENERATION_SHIFT;
+    }
+
+    function _unlockedGenerationsOf(uint256 _tokenId, uint256 _wordIndex) internal view virtual override returns (uint256) {
+        return _wordIndex == 0 ? (_tokenStates[_tokenId] & UNLOCKED_GENERATIONS_MASK) | GENESIS_UNLOCK_BIT : 0;
+    }
+
+    function _unlockedWordsOf(uint256) internal view virtual override returns (uint256) {
+        return 1;
+    }
+
+    function _setActiveGeneration(uint256 _tokenId, uint256 _generationId) internal virtual override {
+        uint256 state = _tokenStates[_tokenId];
+        _tokenStates[_tokenId] = (state & UNLOCKED_GENERATIONS_MASK) | (_generationId << ACTIVE_GENERATION_SHIFT);
+    }
+
+    // Compact collections have fewer than 256 generations, so all unlocks live in the first word.
+    function _setUnlockedGenerations(uint256 _tokenId, uint256, uint256 _unlockedGenerations) internal virtual override {
+        uint256 state = _tokenStates[_tokenId];
+        _tokenStates[_tokenId] = (state & ~UNLOCKED_GENERATIONS_MASK) | _unlockedGenerations;
+    }
+
+    function _clearTokenState(uint256 _tokenId) internal virtual override {
+        delete _tokenStates[_tokenId];
+    }
+}
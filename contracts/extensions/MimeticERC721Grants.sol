@@ -0,0 +1,98 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
+import "../MimeticERC721Base.sol";
+
+// Free unlocks granted in bulk: the owner publishes the Merkle root of a list of (token, generation) grants, and the
+// grants are claimed lazily with a proof, so publishing costs one storage write whatever the size of the list.
+// Leaves are `keccak256(keccak256(abi.encode(tokenId, generationId)))`, hashed twice so that a leaf can never be
+// mistaken for an inner node, and pairs are hashed in sorted order (see `scripts/merkle_grants.py`).
+//
+// Claims skip the price and the availability flag, the generation must still be enabled and its prerequisite unlocked.
+// A grant is claimed by unlocking the generation, so a token burned and minted again may claim it again.
+abstract contract MimeticERC721Grants is MimeticERC721Base {
+    bytes32[] private _grantRoots;
+
+    event GrantRootAdded(uint256 indexed rootId, bytes32 root);
+    event GrantRootRevoked(uint256 indexed rootId);
+
+    function addGrantRoot(bytes32 _root) public onlyOwner returns (uint256 rootId) {
+        require(_root != bytes32(0), "MimeticERC721: Invalid grant root");
+        rootId = _grantRoots.length;
+        _grantRoots.push(_root);
+        emit GrantRootAdded(rootId, _root);
+    }
+
+    // Unclaimed grants of a revoked root can no longer be claimed, claimed ones stay unlocked.
+    function revokeGrantRoot(uint256 _rootId) public onlyOwner {
+        require(_rootId < _grantRoots.length, "MimeticERC721: Invalid grant root");
+        delete _grantRoots[_rootId];
+        emit GrantRootRevoked(_rootId);
+    }
+
+    function grantRoot(uint256 _rootId) public view returns (bytes32) {
+        return _grantRoots[_rootId];
+    }
+
+    function getGrantRootCount() public view returns (uint256) {
+        return _grantRoots.length;
+    }
+
+    function isGranted(uint256 _rootId, uint256 _tokenId, uint256 _generationId, bytes32[] calldata _proof)
+            public
+            view
+            returns (bool) {
+        if (_rootId >= _grantRoots.length || _grantRoots[_rootId] == bytes32(0)) {
+            return false;
+        }
+        return MerkleProof.verify(_proof, _grantRoots[_rootId], _grantLeaf(_tokenId, _generationId));
+    }
+
+    // Anyone may claim a grant for a token, like anyone may pay for an unlock.
+    function claimGrant(uint256 _rootId, uint256 _tokenId, uint256 _generationId, bytes32[] calldata _proof) public {
+        _claimGrant(_rootId, _tokenId, _generationId, _proof);
+        _generations[_generationId].unlocks++;
+    }
+
+    function claimGrants(
+            uint256 _rootId,
+            uint256[] calldata _tokenIds,
+            uint256[] calldata _generationIds,
+            bytes32[][] calldata _proofs) public {
+        require(
+            _tokenIds.length == _generationIds.length && _tokenIds.length == _proofs.length,
+            "MimeticERC721: Array length mismatch"
+        );
+
+        CounterDeltas memory unlockDeltas = _newCounterDeltas(_tokenIds.length);
+        for (uint256 i = 0; i < _tokenIds.length; ++i) {
+            _claimGrant(_rootId, _tokenIds[i], _generationIds[i], _proofs[i]);
+            _addCounterDelta(unlockDeltas, _generationIds[i], 1);
+        }
+        _applyUnlockDeltas(unlockDeltas);
+    }
+
+    // Claims the grant unless the generation is unlocked already, then activates it, so a holder can switch to a granted
+    // face in a single transaction.
+    function activateGenerationWithGrant(
+            uint256 _rootId,
+            uint256 _tokenId,
+            uint256 _generationId,
+            bytes32[] calldata _proof) public {
+        if (!_isUnlocked(_tokenId, _generationId)) {
+            _claimGrant(_rootId, _tokenId, _generationId, _proof);
+            _generations[_generationId].unlocks++;
+        }
+        activateGeneration(_tokenId, _generationId);
+    }
+
+    function _claimGrant(uint256 _rootId, uint256 _tokenId, uint256 _generationId, bytes32[] calldata _proof) private {
+        require(isGranted(_rootId, _tokenId, _generationId, _proof), "MimeticERC721: Invalid grant proof");
+        _unlockGeneration(_tokenId, _generationId, false);
+    }
+
+    function _grantLeaf(uint256 _tokenId, uint256 _generationId) internal pure returns (bytes32) {
+        return keccak256(abi.encodePacked(keccak256(abi.encode(_tokenId, _generationId))));
+    }
+}
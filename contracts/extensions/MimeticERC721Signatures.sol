@@ -0,0 +1,87 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "@openzeppelin/contracts/utils/cryptography/ECDSA.sol";
+import "@openzeppelin/contracts/utils/cryptography/draft-EIP712.sol";
+import "../MimeticERC721Base.sol";
+
+// Activations authorised by an EIP-712 signature of the token owner, so that a relayer can submit them, many per
+// transaction, and pay for the gas. Nonces are kept per token, so the signed activations of different tokens do not
+// depend on each other and may be submitted in any order.
+abstract contract MimeticERC721Signatures is EIP712, MimeticERC721Base {
+    bytes32 private constant ACTIVATE_GENERATION_TYPEHASH =
+        keccak256("ActivateGeneration(uint256 tokenId,uint256 generationId,uint256 nonce,uint256 deadline)");
+
+    struct SignedActivation {
+        uint256 tokenId;
+        uint256 generationId;
+        uint256 deadline;
+        uint8 v;
+        bytes32 r;
+        bytes32 s;
+    }
+
+    mapping(uint256 => uint256) private _activationNonces;
+
+    function DOMAIN_SEPARATOR() external view returns (bytes32) {
+        return _domainSeparatorV4();
+    }
+
+    // Nonce the next signed activation of the token must be signed with.
+    function activationNonce(uint256 _tokenId) public view returns (uint256) {
+        return _activationNonces[_tokenId];
+    }
+
+    function activateGenerationWithSig(
+            uint256 _tokenId,
+            uint256 _generationId,
+            uint256 _deadline,
+            uint8 _v,
+            bytes32 _r,
+            bytes32 _s) public {
+        address tokenOwner = _useActivationSignature(_tokenId, _generationId, _deadline, _v, _r, _s);
+        uint256 previousId = _activateGeneration(tokenOwner, _tokenId, _generationId);
+        _generations[previousId].activations--;
+        _generations[_generationId].activations++;
+    }
+
+    // Applies signed activations of any number of owners, netting the activation counters like `activateGenerations`.
+    // Reverts as a whole if any of them is invalid.
+    function activateGenerationsWithSigs(SignedActivation[] calldata _activations) public {
+        CounterDeltas memory activationDeltas = _newCounterDeltas(2 * _activations.length);
+        for (uint256 i = 0; i < _activations.length; ++i) {
+            SignedActivation calldata activation = _activations[i];
+            address tokenOwner = _useActivationSignature(
+                activation.tokenId,
+                activation.generationId,
+                activation.deadline,
+                activation.v,
+                activation.r,
+                activation.s
+            );
+            _activateGenerationDeferred(activationDeltas, tokenOwner, activation.tokenId, activation.generationId);
+        }
+        _applyActivationDeltas(activationDeltas);
+    }
+
+    // Checks that the current owner of the token signed the activation and consumes the nonce. Returns the owner.
+    function _useActivationSignature(
+            uint256 _tokenId,
+            uint256 _generationId,
+            uint256 _deadline,
+            uint8 _v,
+            bytes32 _r,
+            bytes32 _s) private returns (address tokenOwner) {
+        require(block.timestamp <= _deadline, "MimeticERC721: Signature expired");
+        tokenOwner = ownerOf(_tokenId);
+
+        bytes32 structHash = keccak256(abi.encode(
+            ACTIVATE_GENERATION_TYPEHASH,
+            _tokenId,
+            _generationId,
+            _activationNonces[_tokenId]++,
+            _deadline
+        ));
+        require(ECDSA.recover(_hashTypedDataV4(structHash), _v, _r, _s) == tokenOwner, "MimeticERC721: Invalid signature");
+    }
+}
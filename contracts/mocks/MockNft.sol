@@ -32,6 +32,10 @@ contract MockNft is MimeticERC721 {
         _safeMint(msg.sender, _id);
     }
 
+    function mintBatch(uint256 _startId, uint256 _quantity) public {
+        _mintBatch(msg.sender, _startId, _quantity);
+    }
+
     function burn(uint256 _id) public {
         _burn(_id);
     }
@@ -0,0 +1,32 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "../extensions/MimeticERC721Grants.sol";
+
+contract MockNftGrants is MimeticERC721Grants {
+    constructor() ERC721("MockNFT", "MFT") {
+        addGeneration(
+              "Mock NFT"
+             ,"ipfs://baseuri"
+             ,75 ether  // FTM
+             ,0
+             ,false
+        );
+    }
+
+    function _baseURI() internal view virtual override returns (string memory) {
+        return "ipfs://ABC123/unrevealed.jpeg";
+    }
+
+    function mint(uint256 _id) public {
+        _safeMint(msg.sender, _id);
+    }
+
+    function mintBatch(uint256 _startId, uint256 _quantity) public {
+        _mintBatch(msg.sender, _startId, _quantity);
+    }
+
+    function burn(uint256 _id) public {
+        _burn(_id);
+    }
+}
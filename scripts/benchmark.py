@@ -0,0 +1,488 @@
+"""Gas benchmarks for the MimeticERC721 entry points.
+
+    brownie run scripts/benchmark.py                    # run all suites, write JSON and CSV reports
+    brownie run scripts/benchmark.py check              # run and fail on regressions against the baseline
+    brownie run scripts/benchmark.py update_baseline    # run and store the results as the new baseline
+
+`brownie run` does not forward arguments, so settings are read from the environment:
+
+    BENCHMARK_SUITES     comma separated subset of SUITES (default: all)
+    BENCHMARK_OUTPUT     directory for benchmark.json and benchmark.csv (default: reports/benchmarks)
+    BENCHMARK_BASELINE   baseline file (default: benchmarks/gas_baseline.json)
+    BENCHMARK_TOLERANCE  allowed relative increase over the baseline (default: 0.01)
+
+The baseline stores the brownie, node and solc versions it was measured with next to the gas figures. `check` reports
+when they differ from the current ones, since another compiler or EVM rules shift the figures by themselves.
+"""
+import csv
+import json
+import os
+from importlib.metadata import version
+from pathlib import Path
+
+from brownie import MockNft, MockNftCompact, MockNftNonEnumerable, web3
+from brownie.project.compiler import solidity
+from scripts.utilities import get_deployer_account, get_user_account
+
+
+UNLOCK_PRICE = 42
+
+GENERATION_COUNTS = (1, 32, 128, 255)
+UNLOCKS_PER_TOKEN = (1, 4, 16, 64)
+PREREQUISITE_DEPTHS = (1, 4, 16)
+BATCH_SIZES = (1, 10, 100)
+LARGE_CATALOGUE_SIZE = 1000
+# "ipfs://" and a CIDv0, a CIDv1 with a directory, and a long gateway URL
+BASE_URI_LENGTHS = (53, 75, 100)
+
+REPORT_FIELDS = ["suite", "contract", "operation", "parameter", "value", "gas_used"]
+
+
+def deploy_mimetic(deployer, contract_type=MockNft):
+    mimetic = contract_type.deploy({"from": deployer})
+    mimetic.enableGeneration(0, {"from": deployer})
+    return mimetic
+
+
+def add_unlockable_generation(mimetic, deployer, prereq=0):
+    new_id = mimetic.getGenerationCount()
+    mimetic.addGeneration("Bench", "", UNLOCK_PRICE, prereq, False, {"from": deployer})
+    mimetic.enableGeneration(new_id, {"from": deployer})
+    mimetic.setGenerationAvailability(new_id, True, {"from": deployer})
+    return new_id
+
+
+def add_auto_unlock_generation(mimetic, deployer, prereq=0):
+    new_id = mimetic.getGenerationCount()
+    mimetic.addGeneration("Bench auto", "", 0, prereq, True, {"from": deployer})
+    mimetic.enableGeneration(new_id, {"from": deployer})
+    return new_id
+
+
+def fill_catalogue(mimetic, deployer, generation_count):
+    # Disabled auto-unlock generations only cost one transaction each.
+    while mimetic.getGenerationCount() < generation_count:
+        mimetic.addGeneration("Bench filler", "", 0, 0, True, {"from": deployer})
+
+
+class TokenIds:
+    def __init__(self, start=1):
+        self._next = start
+
+    def take(self, count=1):
+        token_ids = list(range(self._next, self._next + count))
+        self._next += count
+        return token_ids
+
+    def mint(self, mimetic, user, count=1):
+        token_ids = self.take(count)
+        mimetic.mintBatch(token_ids[0], count, {"from": user})
+        return token_ids
+
+
+class Recorder:
+    def __init__(self, suite, mimetic, parameter="", value=""):
+        self.suite = suite
+        self.mimetic = mimetic
+        self.parameter = parameter
+        self.value = value
+        self.results = []
+
+    def __call__(self, operation, gas_used):
+        self.results.append({
+            "suite": self.suite,
+            "contract": self.mimetic._name,
+            "operation": operation,
+            "parameter": self.parameter,
+            "value": self.value,
+            "gas_used": gas_used,
+        })
+
+
+def result_key(result):
+    key = f"{result['suite']}/{result['contract']}/{result['operation']}"
+    if result["parameter"]:
+        key += f"[{result['parameter']}={result['value']}]"
+    return key
+
+
+def measure_generation_count(deployer, user, receiver):
+    # Every entry point against a growing catalogue. `value` is the catalogue size before the measured addGeneration.
+    results = []
+    for count in GENERATION_COUNTS:
+        mimetic = deploy_mimetic(deployer)
+        tokens = TokenIds()
+        fill_catalogue(mimetic, deployer, count)
+        record = Recorder("generation_count", mimetic, "generation_count", count)
+
+        gen_id = mimetic.getGenerationCount()
+        record("addGeneration", mimetic.addGeneration("Bench", "", UNLOCK_PRICE, 0, False, {"from": deployer}).gas_used)
+        record("enableGeneration", mimetic.enableGeneration(gen_id, {"from": deployer}).gas_used)
+        mimetic.setGenerationAvailability(gen_id, True, {"from": deployer})
+
+        # The first mint pays for initialising generation 0 counters, so measure a follow-up one.
+        tokens.mint(mimetic, user)
+        (token_id,) = tokens.take()
+        record("mint", mimetic.mint(token_id, {"from": user}).gas_used)
+        record("unlockGeneration", mimetic.unlockGeneration(
+            token_id, gen_id, {"from": user, "value": UNLOCK_PRICE}
+        ).gas_used)
+        record("activateGeneration", mimetic.activateGeneration(token_id, gen_id, {"from": user}).gas_used)
+        record("transferFrom", mimetic.transferFrom(user, receiver, token_id, {"from": user}).gas_used)
+        record("burn", mimetic.burn(token_id, {"from": receiver}).gas_used)
+        results += record.results
+    return results
+
+
+def measure_unlocks_per_token(deployer, user, receiver):
+    results = []
+    mimetic = deploy_mimetic(deployer)
+    tokens = TokenIds()
+    gen_ids = [add_unlockable_generation(mimetic, deployer) for _ in range(max(UNLOCKS_PER_TOKEN))]
+
+    for count in UNLOCKS_PER_TOKEN:
+        record = Recorder("unlocks_per_token", mimetic, "unlocks_per_token", count)
+        (token_id,) = tokens.mint(mimetic, user)
+        held = gen_ids[:count]
+        mimetic.unlockGenerations([token_id] * count, held, {"from": user, "value": UNLOCK_PRICE * count})
+
+        record("activateGeneration", mimetic.activateGeneration(token_id, held[-1], {"from": user}).gas_used)
+        record("transferFrom", mimetic.transferFrom(user, receiver, token_id, {"from": user}).gas_used)
+        record("burn", mimetic.burn(token_id, {"from": receiver}).gas_used)
+        results += record.results
+    return results
+
+
+def measure_prerequisite_depth(deployer, user):
+    # Unlock the end of a prerequisite chain, then activate an auto-unlock generation that requires it.
+    results = []
+    mimetic = deploy_mimetic(deployer)
+    tokens = TokenIds()
+
+    chain = [0]
+    for _ in range(max(PREREQUISITE_DEPTHS)):
+        chain.append(add_unlockable_generation(mimetic, deployer, prereq=chain[-1]))
+    auto_ids = {depth: add_auto_unlock_generation(mimetic, deployer, prereq=chain[depth]) for depth in PREREQUISITE_DEPTHS}
+
+    for depth in PREREQUISITE_DEPTHS:
+        record = Recorder("prerequisite_depth", mimetic, "prerequisite_depth", depth)
+        (token_id,) = tokens.mint(mimetic, user)
+        ancestors = chain[1:depth]
+        if ancestors:
+            mimetic.unlockGenerations(
+                [token_id] * len(ancestors), ancestors, {"from": user, "value": UNLOCK_PRICE * len(ancestors)}
+            )
+
+        record("unlockGeneration", mimetic.unlockGeneration(
+            token_id, chain[depth], {"from": user, "value": UNLOCK_PRICE}
+        ).gas_used)
+        record("activateGeneration", mimetic.activateGeneration(token_id, auto_ids[depth], {"from": user}).gas_used)
+        results += record.results
+    return results
+
+
+def measure_batch_size(deployer, user):
+    results = []
+    mimetic = deploy_mimetic(deployer)
+    tokens = TokenIds()
+    unlock_id = add_unlockable_generation(mimetic, deployer)
+    auto_id = add_auto_unlock_generation(mimetic, deployer)
+
+    for size in BATCH_SIZES:
+        record = Recorder("batch_size", mimetic, "batch_size", size)
+        single = tokens.take(size)
+        batch = tokens.take(size)
+
+        record("mint (single txs)", sum(mimetic.mint(token_id, {"from": user}).gas_used for token_id in single))
+        record("mintBatch", mimetic.mintBatch(batch[0], size, {"from": user}).gas_used)
+
+        record("unlockGeneration (single txs)", sum(
+            mimetic.unlockGeneration(token_id, unlock_id, {"from": user, "value": UNLOCK_PRICE}).gas_used
+            for token_id in single
+        ))
+        record("unlockGenerations", mimetic.unlockGenerations(
+            batch, [unlock_id] * size, {"from": user, "value": UNLOCK_PRICE * size}
+        ).gas_used)
+
+        record("activateGeneration (single txs)", sum(
+            mimetic.activateGeneration(token_id, auto_id, {"from": user}).gas_used for token_id in single
+        ))
+        record("activateGenerations", mimetic.activateGenerations["uint256[],uint256"](
+            batch, auto_id, {"from": user}
+        ).gas_used)
+        # Mixed pairs, the batch switches back to generation 0 and to the unlocked generation alternately.
+        record("activateGenerations (pairs)", mimetic.activateGenerations["uint256[],uint256[]"](
+            batch, [(0, unlock_id)[i % 2] for i in range(size)], {"from": user}
+        ).gas_used)
+        results += record.results
+    return results
+
+
+def measure_large_catalogue(deployer, user):
+    # Unlock, activate and burn a generation in the first word, then again one in the last word of a large catalogue.
+    results = []
+    mimetic = deploy_mimetic(deployer)
+    tokens = TokenIds()
+
+    low_id = add_unlockable_generation(mimetic, deployer)
+    fill_catalogue(mimetic, deployer, LARGE_CATALOGUE_SIZE - 1)
+    high_id = add_unlockable_generation(mimetic, deployer)
+
+    for gen_id in (low_id, high_id):
+        record = Recorder("large_catalogue", mimetic, "generation_id", gen_id)
+        (token_id,) = tokens.mint(mimetic, user)
+
+        record("unlockGeneration", mimetic.unlockGeneration(
+            token_id, gen_id, {"from": user, "value": UNLOCK_PRICE}
+        ).gas_used)
+        record("activateGeneration", mimetic.activateGeneration(token_id, gen_id, {"from": user}).gas_used)
+        record("burn", mimetic.burn(token_id, {"from": user}).gas_used)
+        results += record.results
+    return results
+
+
+def measure_token_base(deployer, user, receiver):
+    # The same flow on the enumerable, plain and compact variants.
+    results = []
+    for contract_type in (MockNft, MockNftNonEnumerable, MockNftCompact):
+        mimetic = deploy_mimetic(deployer, contract_type)
+        tokens = TokenIds()
+        gen_id = add_unlockable_generation(mimetic, deployer)
+        record = Recorder("token_base", mimetic)
+
+        tokens.mint(mimetic, user)
+        (token_id,) = tokens.take()
+        record("mint", mimetic.mint(token_id, {"from": user}).gas_used)
+        record("unlockGeneration", mimetic.unlockGeneration(
+            token_id, gen_id, {"from": user, "value": UNLOCK_PRICE}
+        ).gas_used)
+        record("activateGeneration", mimetic.activateGeneration(token_id, gen_id, {"from": user}).gas_used)
+        record("transferFrom", mimetic.transferFrom(user, receiver, token_id, {"from": user}).gas_used)
+        record("burn", mimetic.burn(token_id, {"from": receiver}).gas_used)
+        results += record.results
+    return results
+
+
+def measure_configuration(deployer, user):
+    # Launching a generation with the separate owner transactions, with a single configuring one, and in batches.
+    results = []
+    mimetic = deploy_mimetic(deployer)
+    record = Recorder("configuration", mimetic)
+
+    gen_id = mimetic.getGenerationCount()
+    record("launch (single txs)", sum(tx.gas_used for tx in (
+        mimetic.addGeneration("Bench", "", UNLOCK_PRICE, 0, False, {"from": deployer}),
+        mimetic.setGenerationBaseUri(gen_id, "ipfs://bench/", {"from": deployer}),
+        mimetic.setGenerationAvailability(gen_id, True, {"from": deployer}),
+        mimetic.enableGeneration(gen_id, {"from": deployer}),
+    )))
+    config = ("Bench", "ipfs://bench/", UNLOCK_PRICE, 0, False, True, True)
+    record("addAndConfigureGeneration", mimetic.addAndConfigureGeneration(config, {"from": deployer}).gas_used)
+
+    gen_id = mimetic.getGenerationCount()
+    mimetic.addGeneration("Bench", "", UNLOCK_PRICE, 0, False, {"from": deployer})
+    record("configureGeneration", mimetic.configureGeneration(gen_id, config, {"from": deployer}).gas_used)
+    results += record.results
+
+    for size in BATCH_SIZES:
+        record = Recorder("configuration", mimetic, "batch_size", size)
+        record("addAndConfigureGeneration (single txs)", sum(
+            mimetic.addAndConfigureGeneration(config, {"from": deployer}).gas_used for _ in range(size)
+        ))
+        record("addGenerations", mimetic.addGenerations([config] * size, {"from": deployer}).gas_used)
+        results += record.results
+    return results
+
+
+def measure_token_uri(deployer, user):
+    # View paths, measured with eth_estimateGas so they include the 21000 gas base cost of a transaction.
+    results = []
+    for contract_type in (MockNft, MockNftNonEnumerable, MockNftCompact):
+        mimetic = deploy_mimetic(deployer, contract_type)
+        tokens = TokenIds()
+        gen_id = add_unlockable_generation(mimetic, deployer)
+        record = Recorder("token_uri", mimetic)
+
+        (revealed_id, unrevealed_id) = tokens.mint(mimetic, user, 2)
+        mimetic.unlockGeneration(unrevealed_id, gen_id, {"from": user, "value": UNLOCK_PRICE})
+        mimetic.activateGeneration(unrevealed_id, gen_id, {"from": user})
+
+        record("tokenURI (revealed)", mimetic.tokenURI.estimate_gas(revealed_id))
+        record("tokenURI (unrevealed)", mimetic.tokenURI.estimate_gas(unrevealed_id))
+        results += record.results
+
+        for size in BATCH_SIZES:
+            record = Recorder("token_uri", mimetic, "batch_size", size)
+            token_ids = tokens.mint(mimetic, user, size)
+            record("tokenURIs", mimetic.tokenURIs.estimate_gas(token_ids))
+            results += record.results
+    return results
+
+
+def measure_base_uri(deployer, user):
+    # The reveal flow and URI resolution for base URIs of typical lengths.
+    results = []
+    mimetic = deploy_mimetic(deployer)
+    tokens = TokenIds()
+    for length in BASE_URI_LENGTHS:
+        record = Recorder("base_uri", mimetic, "uri_length", length)
+        base_uri = "ipfs://" + "b" * (length - len("ipfs://"))
+
+        record("addGeneration (with base URI)", mimetic.addGeneration(
+            "Bench", base_uri, 0, 0, True, {"from": deployer}
+        ).gas_used)
+        gen_id = add_auto_unlock_generation(mimetic, deployer)
+        record("setGenerationBaseUri (reveal)", mimetic.setGenerationBaseUri(
+            gen_id, base_uri, {"from": deployer}
+        ).gas_used)
+
+        (token_id,) = tokens.mint(mimetic, user)
+        mimetic.activateGeneration(token_id, gen_id, {"from": user})
+        record("tokenURI", mimetic.tokenURI.estimate_gas(token_id))
+        record("generations", mimetic.generations.estimate_gas(gen_id))
+        results += record.results
+    return results
+
+
+SUITES = {
+    "generation_count": lambda deployer, user: measure_generation_count(deployer, user, deployer),
+    "unlocks_per_token": lambda deployer, user: measure_unlocks_per_token(deployer, user, deployer),
+    "prerequisite_depth": measure_prerequisite_depth,
+    "batch_size": measure_batch_size,
+    "large_catalogue": measure_large_catalogue,
+    "token_base": lambda deployer, user: measure_token_base(deployer, user, deployer),
+    "configuration": measure_configuration,
+    "token_uri": measure_token_uri,
+    "base_uri": measure_base_uri,
+}
+
+
+def run_suites():
+    selected = [name.strip() for name in os.environ.get("BENCHMARK_SUITES", "").split(",") if name.strip()]
+    unknown = set(selected) - set(SUITES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark suites: {', '.join(sorted(unknown))}")
+
+    deployer = get_deployer_account()
+    user = get_user_account()
+    results = []
+    for name in selected or SUITES:
+        results += SUITES[name](deployer, user)
+    return results
+
+
+def print_results(results):
+    width = max(len(result_key(result)) for result in results)
+    for result in results:
+        print(f"{result_key(result).ljust(width)}  {result['gas_used']:>12,}")
+
+
+def markdown_tables(results):
+    """One table per suite, an operation per row and a column per contract and parameter value."""
+    sections = []
+    for suite in dict.fromkeys(result["suite"] for result in results):
+        suite_results = [result for result in results if result["suite"] == suite]
+        several_contracts = len({result["contract"] for result in suite_results}) > 1
+
+        def column(result):
+            parts = [result["contract"]] if several_contracts else []
+            if result["parameter"]:
+                parts.append(f"{result['parameter']}={result['value']}")
+            return " ".join(parts) or "gas"
+
+        columns = list(dict.fromkeys(column(result) for result in suite_results))
+        rows = {}
+        for result in suite_results:
+            rows.setdefault(result["operation"], {})[column(result)] = f"{result['gas_used']:,}"
+        lines = [f"### {suite}", "", "| operation | " + " | ".join(columns) + " |", "|---|" + "---:|" * len(columns)]
+        for operation, cells in rows.items():
+            lines.append(f"| {operation} | " + " | ".join(cells.get(name, "-") for name in columns) + " |")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections) + "\n"
+
+
+def write_reports(results, output_dir):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(output_dir / "benchmark.json", "w") as f:
+        json.dump(results, f, indent=2)
+    with open(output_dir / "benchmark.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    with open(output_dir / "benchmark.md", "w") as f:
+        f.write(markdown_tables(results))
+
+    print(f"\nReports written to {output_dir}")
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Splits results into regressions, improvements and new entries, each a list of (key, baseline gas, gas)."""
+    regressions, improvements, new = [], [], []
+    for result in results:
+        key = result_key(result)
+        gas_used = result["gas_used"]
+        if key not in baseline:
+            new.append((key, None, gas_used))
+        elif gas_used > baseline[key] * (1 + tolerance):
+            regressions.append((key, baseline[key], gas_used))
+        elif gas_used < baseline[key]:
+            improvements.append((key, baseline[key], gas_used))
+    return regressions, improvements, new
+
+
+def environment():
+    """Versions the gas figures depend on."""
+    return {"brownie": version("eth-brownie"), "node": web3.clientVersion, "solc": str(solidity.get_version())}
+
+
+def baseline_path():
+    return Path(os.environ.get("BENCHMARK_BASELINE", "benchmarks/gas_baseline.json"))
+
+
+def main():
+    results = run_suites()
+    print_results(results)
+    write_reports(results, os.environ.get("BENCHMARK_OUTPUT", "reports/benchmarks"))
+    return results
+
+
+def update_baseline():
+    results = main()
+    path = baseline_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(
+            {"environment": environment(), "gas": {result_key(result): result["gas_used"] for result in results}},
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+    print(f"Baseline written to {path}")
+
+
+def check():
+    path = baseline_path()
+    if not path.exists():
+        raise SystemExit(f"No gas baseline at {path}, run `brownie run scripts/benchmark.py update_baseline` first")
+    with open(path) as f:
+        baseline = json.load(f)
+    tolerance = float(os.environ.get("BENCHMARK_TOLERANCE", "0.01"))
+
+    regressions, improvements, new = compare_to_baseline(main(), baseline["gas"], tolerance)
+    print()
+    current = environment()
+    for name, version in sorted(baseline["environment"].items()):
+        if current.get(name) != version:
+            print(f"baseline measured with {name} {version}, running {current.get(name)}")
+    for key, before, after in improvements:
+        print(f"improved   {key}: {before:,} -> {after:,}")
+    for key, _, after in new:
+        print(f"new        {key}: {after:,}")
+    for key, before, after in regressions:
+        print(f"REGRESSED  {key}: {before:,} -> {after:,} (+{(after - before) / before:.1%})")
+
+    if regressions:
+        raise SystemExit(f"{len(regressions)} gas regression(s) above the {tolerance:.1%} tolerance")
+    print("No gas regressions")
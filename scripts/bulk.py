@@ -0,0 +1,406 @@
+"""Deployment and bulk operations for MimeticERC721 contracts.
+
+    python -m scripts.bulk deploy
+    python -m scripts.bulk seed 0x... generations.yaml
+    python -m scripts.bulk mint 0x... 1 10000 --batch 100
+    python -m scripts.bulk unlock 0x... 1 1 10000
+    python -m scripts.bulk activate 0x... 1 1 10000
+    python -m scripts.bulk benchmark --count 500
+
+Bulk jobs go through a `TxPipeline`: nonces are assigned locally, so transactions are sent back to back without
+waiting for the previous receipt, up to `--window` of them in flight while their receipts are polled. The tokens or
+generations of every confirmed job are appended to the `--journal` file and left out of the jobs of later runs, so a
+run that failed half way is resumed by running the same command again, with any `--batch`. Reverted jobs are reported
+and left out of the journal, a rerun retries them.
+
+Gas is estimated against the pending state, which on a node without automine does not include the transactions in
+flight. A job whose estimate reverts while earlier ones are unmined may depend on them, like a generation whose
+prerequisite is added by the previous seed job, so the pipeline waits for every transaction in flight and estimates
+it again before reporting it. A transaction without a receipt after `--receipt-timeout` seconds is sent again, which
+puts it back if the node dropped it, and reported as failed if another transaction took its nonce or it still has no
+receipt after the resend.
+
+The seed file lists generations with the fields of `GenerationConfig`, prices in any unit brownie understands:
+
+    generations:
+      - name: Pixel
+        baseUri: ipfs://Qm.../
+        price: 10 ether
+        prerequisiteGeneration: 0
+        available: true
+        enabled: true
+"""
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+from brownie import Wei, network, project
+from web3.exceptions import TransactionNotFound
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# `items` are the journal keys of the tokens or generations the job covers, just `key` when None
+Job = namedtuple("Job", "key to data value gas items", defaults=(0, None, None))
+# a transaction in flight: its job, the transaction fields, the signed transaction (None when the node signs), the
+# `time.monotonic()` it was last sent at and how many times it was sent again
+Sent = namedtuple("Sent", "job tx raw time resends")
+
+GENERATION_DEFAULTS = {
+    "baseUri": "",
+    "price": 0,
+    "prerequisiteGeneration": 0,
+    "autoUnlock": False,
+    "available": False,
+    "enabled": False,
+}
+
+
+class JobFailed(Exception):
+    pass
+
+
+class Journal:
+    """Item keys of the confirmed jobs, stored as JSON lines. A `path` of None keeps them in memory only."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as journal_file:
+                self.done = {key for line in journal_file if line.strip() for key in json.loads(line)["keys"]}
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def record(self, keys, tx_hash, block_number):
+        self.done.update(keys)
+        if self.path:
+            with open(self.path, "a") as journal_file:
+                journal_file.write(json.dumps({"keys": list(keys), "tx": tx_hash, "block": block_number}) + "\n")
+
+
+class TxPipeline:
+    def __init__(
+        self,
+        web3,
+        sender,
+        window=32,
+        poll_interval=0.05,
+        journal=None,
+        gas_margin=1.2,
+        gas_price=None,
+        receipt_timeout=120,
+        max_resends=1,
+    ):
+        self.web3 = web3
+        self.sender = sender
+        self.window = window
+        self.poll_interval = poll_interval
+        self.journal = journal if journal is not None else Journal()
+        self.gas_margin = gas_margin
+        self.gas_price = gas_price
+        self.receipt_timeout = receipt_timeout
+        self.max_resends = max_resends
+        # (job, transaction hash or None, reason) of the jobs which did not go through
+        self.failed = []
+        self.confirmed = 0
+        self.skipped = 0
+
+    def run(self, jobs):
+        """Sends the jobs in order and waits for all of them. Returns the number of confirmed jobs."""
+        address = self.sender.address
+        nonce = self.web3.eth.get_transaction_count(address, "pending")
+        chain_id = self.web3.eth.chain_id
+        gas_price = self.gas_price if self.gas_price is not None else self.web3.eth.gas_price
+        private_key = getattr(self.sender, "private_key", None)
+        # transaction hash => Sent
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=min(self.window, 16)) as executor:
+            try:
+                for job in jobs:
+                    if all(key in self.journal for key in job_items(job)):
+                        self.skipped += 1
+                        continue
+                    while len(in_flight) >= self.window:
+                        self._wait_receipts(executor, in_flight)
+
+                    tx = {"from": address, "to": job.to, "data": job.data, "value": job.value, "gasPrice": gas_price}
+                    if job.gas is None:
+                        try:
+                            tx["gas"] = self._estimate_gas(tx, executor, in_flight)
+                        except ValueError as exc:
+                            # the job would revert, its nonce is left for the next one
+                            self.failed.append((job, None, str(exc)))
+                            continue
+                    else:
+                        tx["gas"] = job.gas
+                    tx["nonce"] = nonce
+
+                    raw = None
+                    if private_key:
+                        signed = self.web3.eth.account.sign_transaction(dict(tx, chainId=chain_id), private_key)
+                        raw = signed.rawTransaction
+                    in_flight[self._send(tx, raw)] = Sent(job, tx, raw, time.monotonic(), 0)
+                    nonce += 1
+            finally:
+                # Whatever stopped the submission, the sent transactions are still confirmed and journaled.
+                while in_flight:
+                    self._wait_receipts(executor, in_flight)
+
+        return self.confirmed
+
+    def _estimate_gas(self, tx, executor, in_flight):
+        try:
+            return int(self.web3.eth.estimate_gas(tx, "pending") * self.gas_margin)
+        except ValueError:
+            if not in_flight:
+                raise
+        # The job may depend on a transaction which is not mined yet, estimate again once all of them are.
+        while in_flight:
+            self._wait_receipts(executor, in_flight)
+        return int(self.web3.eth.estimate_gas(tx, "pending") * self.gas_margin)
+
+    def _send(self, tx, raw):
+        if raw is not None:
+            return self.web3.eth.send_raw_transaction(raw)
+        return self.web3.eth.send_transaction(tx)
+
+    def _wait_receipts(self, executor, in_flight):
+        receipts = list(executor.map(self._get_receipt, list(in_flight)))
+        if not any(receipts):
+            self._expire(in_flight)
+            time.sleep(self.poll_interval)
+            return
+
+        for receipt in filter(None, receipts):
+            tx_hash = receipt["transactionHash"]
+            job = in_flight.pop(tx_hash).job
+            if receipt["status"]:
+                self.journal.record(job_items(job), tx_hash.hex(), receipt["blockNumber"])
+                self.confirmed += 1
+            else:
+                self.failed.append((job, tx_hash.hex(), "reverted"))
+
+    def _expire(self, in_flight):
+        """Sends again the transactions without a receipt after `receipt_timeout`, and moves the ones whose nonce
+        another transaction took, or which were already sent `max_resends` times, to `failed`."""
+        now = time.monotonic()
+        for tx_hash, sent in list(in_flight.items()):
+            if now - sent.time < self.receipt_timeout or self._get_receipt(tx_hash):
+                continue
+            del in_flight[tx_hash]
+            if self.web3.eth.get_transaction_count(sent.tx["from"], "latest") > sent.tx["nonce"]:
+                self.failed.append((sent.job, tx_hash.hex(), "replaced by another transaction with its nonce"))
+            elif sent.resends >= self.max_resends:
+                self.failed.append((sent.job, tx_hash.hex(), f"no receipt after {self.receipt_timeout}s"))
+            else:
+                try:
+                    tx_hash = self._send(sent.tx, sent.raw)
+                except ValueError:
+                    # the node still knows the transaction, keep waiting for it
+                    pass
+                in_flight[tx_hash] = sent._replace(time=now, resends=sent.resends + 1)
+
+    def _get_receipt(self, tx_hash):
+        try:
+            return self.web3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+
+def job_items(job):
+    return job.items or (job.key,)
+
+
+def pending_runs(prefix, ids, size, journal):
+    """Splits the ids whose `prefix:id` key is not in `journal` into runs of consecutive ids of at most `size`.
+
+    Yields (job key, ids, item keys). Keys are per id, so a rerun with another batch size still skips the done ones.
+    """
+    run = []
+    for item_id in ids:
+        if f"{prefix}:{item_id}" in journal:
+            continue
+        if run and (len(run) == size or item_id != run[-1] + 1):
+            yield f"{prefix}:{run[0]}-{run[-1]}", run, tuple(f"{prefix}:{i}" for i in run)
+            run = []
+        run.append(item_id)
+    if run:
+        yield f"{prefix}:{run[0]}-{run[-1]}", run, tuple(f"{prefix}:{i}" for i in run)
+
+
+def mint_jobs(contract, start, count, batch, journal=()):
+    for key, token_ids, items in pending_runs(f"{contract.address}:mint", range(start, start + count), batch, journal):
+        yield Job(key, contract.address, contract.mintBatch.encode_input(token_ids[0], len(token_ids)), items=items)
+
+
+def unlock_jobs(contract, generation_id, start, count, batch, journal=()):
+    price = contract.generations(generation_id)[0]
+    prefix = f"{contract.address}:unlock:{generation_id}"
+    for key, token_ids, items in pending_runs(prefix, range(start, start + count), batch, journal):
+        yield Job(
+            key,
+            contract.address,
+            contract.unlockGenerations.encode_input(token_ids, [generation_id] * len(token_ids)),
+            price * len(token_ids),
+            items=items,
+        )
+
+
+def activate_jobs(contract, generation_id, start, count, batch, journal=()):
+    activate = contract.activateGenerations["uint256[],uint256"]
+    prefix = f"{contract.address}:activate:{generation_id}"
+    for key, token_ids, items in pending_runs(prefix, range(start, start + count), batch, journal):
+        yield Job(key, contract.address, activate.encode_input(token_ids, generation_id), items=items)
+
+
+def read_generations(path):
+    with open(path) as seed_file:
+        entries = yaml.safe_load(seed_file)["generations"]
+
+    configs = []
+    for entry in entries:
+        if "name" not in entry:
+            raise ValueError(f"Generation without a name in {path}: {entry}")
+        config = dict(GENERATION_DEFAULTS, **entry)
+        configs.append((
+            config["name"],
+            config["baseUri"],
+            int(Wei(config["price"])),
+            config["prerequisiteGeneration"],
+            config["autoUnlock"],
+            config["available"],
+            config["enabled"],
+        ))
+    return configs
+
+
+def seed_jobs(contract, configs, batch, journal=()):
+    # Keyed by the position in the seed file, so a rerun only adds the generations which were not added yet.
+    for key, positions, items in pending_runs(f"{contract.address}:seed", range(len(configs)), batch, journal):
+        yield Job(
+            key,
+            contract.address,
+            contract.addGenerations.encode_input([configs[position] for position in positions]),
+            items=items,
+        )
+
+
+def benchmark(container, sender, count, window):
+    """Mints `count` tokens one per transaction, through brownie, through the pipeline with a window of one and with
+    a window of `window`, and prints the transactions per second of each."""
+    contract = container.deploy({"from": sender})
+    results = []
+
+    start = time.perf_counter()
+    for token_id in range(1, count + 1):
+        contract.mint(token_id, {"from": sender})
+    results.append(("brownie, one at a time", time.perf_counter() - start))
+
+    runs = (("pipeline, window 1", 1, count + 1), (f"pipeline, window {window}", window, 2 * count + 1))
+    for label, pipeline_window, first_id in runs:
+        pipeline = TxPipeline(network.web3, sender, window=pipeline_window)
+        jobs = [
+            Job(f"mint:{token_id}", contract.address, contract.mint.encode_input(token_id))
+            for token_id in range(first_id, first_id + count)
+        ]
+        start = time.perf_counter()
+        pipeline.run(jobs)
+        elapsed = time.perf_counter() - start
+        if pipeline.failed:
+            raise JobFailed(f"{len(pipeline.failed)} benchmark transactions failed: {pipeline.failed[0]}")
+        results.append((label, elapsed))
+
+    assert contract.totalSupply() == 3 * count
+    for label, elapsed in results:
+        print(f"{label:<24} {count / elapsed:8.1f} txs/s  ({count} transactions in {elapsed:.2f}s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--network", default="development")
+    parser.add_argument("--contract", default="MockNft", help="contract type to deploy or to load at ADDRESS")
+    parser.add_argument("--account", choices=("deployer", "user"), default="deployer")
+    parser.add_argument("--window", type=int, default=32, help="transactions in flight at once")
+    parser.add_argument("--journal", default="bulk_journal.jsonl", help="confirmed jobs, for resuming")
+    parser.add_argument("--receipt-timeout", type=float, default=120, help="seconds before a transaction is resent")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("deploy")
+    seed = commands.add_parser("seed")
+    seed.add_argument("address")
+    seed.add_argument("file")
+    seed.add_argument("--batch", type=int, default=20, help="generations per transaction")
+    mint = commands.add_parser("mint")
+    mint.add_argument("address")
+    mint.add_argument("start", type=int)
+    mint.add_argument("count", type=int)
+    mint.add_argument("--batch", type=int, default=100, help="tokens per transaction")
+    for name in ("unlock", "activate"):
+        command = commands.add_parser(name)
+        command.add_argument("address")
+        command.add_argument("generation", type=int)
+        command.add_argument("start", type=int)
+        command.add_argument("count", type=int)
+        command.add_argument("--batch", type=int, default=50, help="tokens per transaction")
+    bench = commands.add_parser("benchmark")
+    bench.add_argument("--count", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    mimetic_project = project.load(PROJECT_ROOT)
+    # after loading the project, its configuration is needed
+    from scripts.eth_tester_backend import NETWORK_ID, register
+    from scripts.utilities import get_deployer_account, get_user_account
+
+    if args.network == NETWORK_ID:
+        register()
+    network.connect(args.network)
+
+    sender = get_deployer_account() if args.account == "deployer" else get_user_account()
+    container = mimetic_project[args.contract]
+
+    if args.command == "deploy":
+        contract = container.deploy({"from": sender})
+        print(f"{args.contract} deployed at {contract.address}")
+        return
+    if args.command == "benchmark":
+        benchmark(container, sender, args.count, args.window)
+        return
+
+    contract = container.at(args.address)
+    journal = Journal(args.journal)
+    if args.command == "seed":
+        jobs = seed_jobs(contract, read_generations(args.file), args.batch, journal)
+    elif args.command == "mint":
+        jobs = mint_jobs(contract, args.start, args.count, args.batch, journal)
+    elif args.command == "unlock":
+        jobs = unlock_jobs(contract, args.generation, args.start, args.count, args.batch, journal)
+    else:
+        jobs = activate_jobs(contract, args.generation, args.start, args.count, args.batch, journal)
+
+    pipeline = TxPipeline(
+        network.web3, sender, window=args.window, journal=journal, receipt_timeout=args.receipt_timeout
+    )
+    start = time.perf_counter()
+    pipeline.run(jobs)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{pipeline.confirmed} confirmed in {elapsed:.2f}s, "
+        f"{pipeline.skipped} already done, {len(pipeline.failed)} failed"
+    )
+    for job, tx_hash, reason in pipeline.failed:
+        print(f"  {job.key}: {reason} {tx_hash or ''}".rstrip())
+    if pipeline.failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""In-process development chain for brownie, backed by eth-tester and py-evm.
+
+    brownie test --network eth-tester
+    python -m scripts.eth_tester_backend run scripts/benchmark.py check
+    python -m scripts.eth_tester_backend latency --transactions 200
+
+`register()` adds an `eth-tester` development network to brownie. Instead of launching `ganache-cli` and talking to it
+over HTTP, "launching" it creates an `EthereumTester` chain in the current process and gives web3 a provider which
+calls it directly. Snapshots, reverts, `chain.sleep` and `chain.mine` map to the eth-tester API, so the module scoped
+fixtures and per-test isolation of the suite work unchanged. Set `networks: default: eth-tester` in
+`brownie-config.yaml` to use it by default; the chain settings are read from its `networks: eth-tester:
+cmd_settings` section:
+
+    accounts         number of funded accounts (default: 10)
+    gas_limit        block gas limit (default: 12000000, as for ganache)
+    default_balance  balance of every account (default: 100 ether, as for ganache)
+    evm_version      istanbul or berlin (default: istanbul, as for ganache-cli 6)
+
+Only pre-London rules are offered: brownie sends development transactions with a gas price of 0, which a chain with a
+base fee rejects. Reverts are reported in the format of ganache's `vmErrorsOnRPCResponse`, so `brownie.reverts(...)`
+sees the revert strings, but eth-tester has no `debug_traceTransaction`: `tx.trace`, coverage and the storage profiler
+need ganache. The accounts are eth-tester's own keys, not the ones ganache derives from the "brownie" mnemonic, and
+there is no `unlock_account` hook: eth-tester signs every transaction itself, so `accounts.at(address, force=True)`
+cannot send from an address without its private key. `accounts.add(private_key)` accounts work on both networks.
+
+`brownie run` and `brownie console` connect before any project code is imported, so they cannot reach the network;
+`run` loads the project, connects and calls a script function the same way, and `latency` compares the startup and
+per-transaction latency of ganache and eth-tester.
+"""
+import argparse
+import importlib
+import io
+import statistics
+import time
+from pathlib import Path
+
+import psutil
+from brownie import Wei, chain, network, project, run
+from brownie._config import CONFIG
+from brownie.network.rpc import LAUNCH_BACKENDS
+from brownie.network.web3 import web3
+from web3.providers.eth_tester import EthereumTesterProvider
+
+try:
+    from eth_abi import decode
+except ImportError:  # eth-abi < 4
+    from eth_abi import decode_abi as decode
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+NETWORK_ID = "eth-tester"
+HOST = "eth-tester://in-process"
+DEFAULT_SETTINGS = {
+    "accounts": 10,
+    "gas_limit": 12000000,
+    "default_balance": "100 ether",
+    "evm_version": "istanbul",
+}
+
+ERROR_SELECTOR = bytes.fromhex("08c379a0")
+REVERT_PREFIX = "execution reverted: "
+NULL_HASH = "0x" + "00" * 32
+FEE_FIELDS = ("gas_price", "max_fee_per_gas", "max_priority_fee_per_gas")
+# methods whose first parameter is a transaction, after web3 renamed its fields for eth-tester
+TRANSACTION_METHODS = ("eth_call", "eth_estimateGas", "eth_sendTransaction")
+
+
+def _revert_reason(error):
+    """The revert string of an eth-tester `TransactionFailed`, or None when the revert had no Error(string)."""
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, Exception):
+        return _revert_reason(reason)
+    if isinstance(reason, bytes):
+        # gas estimation passes the return data of the revert as it is
+        return decode(["string"], reason[4:])[0] if reason[:4] == ERROR_SELECTOR else None
+    if not isinstance(reason, str):
+        return None
+    if reason.startswith(REVERT_PREFIX):
+        reason = reason[len(REVERT_PREFIX):]
+    # calls decode Error(string) and give the repr of anything else
+    if not reason or reason.startswith(("b'", 'b"')):
+        return None
+    return reason
+
+
+def _vm_error(txid, reason):
+    """An RPC error shaped like ganache's, which brownie turns into a `VirtualMachineError` for `txid`."""
+    data = {"error": "revert"}
+    if reason is not None:
+        data["reason"] = reason
+    message = "VM Exception while processing transaction: revert" + (f" {reason}" if reason else "")
+    return {"error": {"code": -32000, "message": message, "data": {txid: data}}}
+
+
+def _with_gas_price(transaction):
+    if any(field in transaction for field in FEE_FIELDS):
+        return transaction
+    # without any fee field, eth-tester builds an EIP-1559 transaction, which a pre-London chain cannot run
+    return dict(transaction, gas_price=0)
+
+
+class InProcessProvider(EthereumTesterProvider):
+    endpoint_uri = HOST
+
+    def __init__(self, ethereum_tester):
+        super().__init__(ethereum_tester)
+        self.time_offset = 0
+
+    def make_request(self, method, params):
+        from eth_tester.exceptions import TransactionFailed
+
+        if method in TRANSACTION_METHODS and params:
+            params = [_with_gas_price(params[0]), *params[1:]]
+        try:
+            response = super().make_request(method, params)
+        except TransactionFailed as exc:
+            return _vm_error(NULL_HASH, _revert_reason(exc))
+
+        if isinstance(response.get("error"), str):
+            # unknown and unimplemented endpoints, brownie reads the code to tell that traces are not supported
+            return {"error": {"code": -32601, "message": response["error"]}}
+        if method == "eth_sendTransaction":
+            receipt = self.ethereum_tester.get_transaction_receipt(response["result"])
+            if not receipt["status"]:
+                return self._reverted(response["result"], params[0], receipt["block_number"])
+        return response
+
+    def _reverted(self, txid, transaction, block_number):
+        # Ganache reports the revert of a sent transaction as an error, replay it on the state before its block
+        # to get the reason.
+        from eth_tester.exceptions import TransactionFailed
+
+        try:
+            self.ethereum_tester.call(transaction, block_number - 1)
+        except TransactionFailed as exc:
+            return _vm_error(txid, _revert_reason(exc))
+        return _vm_error(txid, None)
+
+
+class InProcessChain:
+    """Stands in for the RPC client process brownie launches, the chain lives in the current process."""
+
+    def __init__(self):
+        self.pid = psutil.Process().pid
+        # brownie closes the pipes of the process it launched when exiting
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+        self._running = True
+
+    def is_running(self):
+        return self._running
+
+    def parent(self):
+        return psutil.Process()
+
+    def children(self, recursive=False):
+        return []
+
+    def kill(self):
+        self._running = False
+
+    def wait(self, timeout=None):
+        return 0
+
+
+def _ethereum_tester():
+    return web3.provider.ethereum_tester
+
+
+def launch(cmd, accounts=10, gas_limit=12000000, default_balance="100 ether", evm_version="istanbul", **kwargs):
+    from eth.vm.forks import BerlinVM, IstanbulVM
+    from eth_tester import EthereumTester, PyEVMBackend
+
+    vms = {"istanbul": IstanbulVM, "berlin": BerlinVM}
+    if evm_version not in vms:
+        raise ValueError(f"eth-tester backend: unsupported evm_version '{evm_version}', use one of {sorted(vms)}")
+
+    print(f"Launching in-process eth-tester chain ({evm_version}, {accounts} accounts)...")
+    backend = PyEVMBackend(
+        genesis_parameters=PyEVMBackend.generate_genesis_params(overrides={"gas_limit": gas_limit}),
+        genesis_state=PyEVMBackend.generate_genesis_state(
+            overrides={"balance": int(Wei(default_balance))}, num_accounts=accounts
+        ),
+        vm_configuration=((0, vms[evm_version]),),
+    )
+    web3.provider = InProcessProvider(EthereumTester(backend))
+    return InProcessChain()
+
+
+def on_connection():
+    pass
+
+
+def sleep(seconds):
+    tester = _ethereum_tester()
+    if seconds:
+        # eth-tester only moves time forward by mining a block with the new timestamp
+        tester.time_travel(tester.get_block_by_number("pending")["timestamp"] + seconds)
+    web3.provider.time_offset += seconds
+    return web3.provider.time_offset
+
+
+def mine(timestamp=None):
+    tester = _ethereum_tester()
+    if timestamp is None:
+        tester.mine_blocks(1)
+    else:
+        tester.time_travel(timestamp)
+
+
+def snapshot():
+    return _ethereum_tester().take_snapshot()
+
+
+def revert(snapshot_id):
+    _ethereum_tester().revert_to_snapshot(snapshot_id)
+
+
+def register():
+    """Adds the eth-tester network to brownie. Needs the project configuration to be loaded, and is idempotent."""
+    project_settings = CONFIG.settings["networks"].get(NETWORK_ID) or {}
+    CONFIG.networks[NETWORK_ID] = {
+        "id": NETWORK_ID,
+        "name": "eth-tester (in-process py-evm)",
+        "cmd": NETWORK_ID,
+        "host": HOST,
+        "cmd_settings": dict(DEFAULT_SETTINGS, **(project_settings.get("cmd_settings") or {})),
+    }
+    LAUNCH_BACKENDS[NETWORK_ID] = importlib.import_module(__name__)
+
+    if not getattr(web3.connect, "in_process", False):
+        connect = web3.connect
+
+        def connect_in_process(uri, timeout=30):
+            # there is nothing to connect to until the chain is launched
+            if uri.startswith(HOST):
+                web3.disconnect()
+                return
+            connect(uri, timeout)
+
+        connect_in_process.in_process = True
+        web3.connect = connect_in_process
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure_latency(container, network_id, transactions):
+    """Startup and per-operation latency of a development network, in seconds."""
+    start = time.perf_counter()
+    network.connect(network_id)
+    startup = time.perf_counter() - start
+    try:
+        from scripts.utilities import get_deployer_account
+
+        deployer = get_deployer_account()
+        start = time.perf_counter()
+        mimetic = container.deploy({"from": deployer})
+        deploy = time.perf_counter() - start
+
+        transaction_times, call_times, revert_times = [], [], []
+        for token_id in range(1, transactions + 1):
+            start = time.perf_counter()
+            mimetic.mint(token_id, {"from": deployer})
+            transaction_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            mimetic.ownerOf(token_id)
+            call_times.append(time.perf_counter() - start)
+
+        # the isolation fixtures revert to a snapshot after every test
+        chain.snapshot()
+        for _ in range(transactions):
+            mimetic.mint(transactions + 1, {"from": deployer})
+            start = time.perf_counter()
+            chain.revert()
+            revert_times.append(time.perf_counter() - start)
+    finally:
+        network.disconnect()
+
+    return {
+        "startup": startup,
+        "deploy": deploy,
+        "transaction": transaction_times,
+        "call": call_times,
+        "revert": revert_times,
+    }
+
+
+def print_latency(results):
+    print(
+        f"{'network':<14} {'startup':>8} {'deploy':>8}  {'tx p50':>7} {'tx p95':>7}  "
+        f"{'call p50':>8}  {'revert p50':>10}  {'txs/s':>6}"
+    )
+    for network_id, result in results.items():
+        transactions = result["transaction"]
+        print(
+            f"{network_id:<14} {result['startup']:>7.2f}s {result['deploy'] * 1000:>6.1f}ms  "
+            f"{_percentile(transactions, 0.5) * 1000:>5.1f}ms {_percentile(transactions, 0.95) * 1000:>5.1f}ms  "
+            f"{_percentile(result['call'], 0.5) * 1000:>6.1f}ms  {_percentile(result['revert'], 0.5) * 1000:>8.1f}ms  "
+            f"{len(transactions) / sum(transactions):>6.1f}"
+        )
+    if len(results) > 1:
+        (first_id, first), *others = results.items()
+        for network_id, result in others:
+            print(
+                f"{network_id} against {first_id}: startup {first['startup'] / result['startup']:.1f}x, "
+                f"transactions {statistics.mean(first['transaction']) / statistics.mean(result['transaction']):.1f}x"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_script = commands.add_parser("run", help="call a function of a script, like `brownie run`")
+    run_script.add_argument("script")
+    run_script.add_argument("function", nargs="?", default="main")
+    run_script.add_argument("--network", default=NETWORK_ID)
+    latency = commands.add_parser("latency", help="compare the latency of development networks")
+    latency.add_argument("--networks", nargs="+", default=["development", NETWORK_ID])
+    latency.add_argument("--contract", default="MockNft")
+    latency.add_argument("--transactions", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    mimetic_project = project.load(PROJECT_ROOT)
+    register()
+
+    if args.command == "latency":
+        container = mimetic_project[args.contract]
+        print_latency({
+            network_id: measure_latency(container, network_id, args.transactions) for network_id in args.networks
+        })
+        return
+
+    network.connect(args.network)
+    try:
+        run(args.script, args.function, project=mimetic_project)
+    finally:
+        network.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Gas of the core token flow across git revisions, as a markdown table.
+
+    python -m scripts.gas_history e7c0b02 112f0c7 HEAD
+    python -m scripts.gas_history e7c0b02 HEAD --output benchmarks/gas_history.md
+
+`scripts/benchmark.py` measures the working tree and uses entry points added along the way, so it cannot measure the
+contracts from before them. Here every revision is checked out into a temporary git worktree, compiled as a brownie
+project of its own, and its `MockNft` runs the flow every revision supports: `addGeneration`, `enableGeneration`,
+`mint`, `unlockGeneration`, `activateGeneration`, `transferFrom` and `burn`. Each column is a revision and the last
+one shows the change from the first to the last revision, so a before/after table of one change is
+`python -m scripts.gas_history <commit>~1 <commit>`.
+"""
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+
+from brownie import network, project
+from brownie.project.compiler import solidity
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+UNLOCK_PRICE = 42
+
+
+def checkout(revision, directory):
+    subprocess.run(
+        ["git", "-C", str(PROJECT_ROOT), "worktree", "add", "--detach", str(directory), revision],
+        check=True,
+        capture_output=True,
+    )
+
+
+def remove_checkout(directory):
+    subprocess.run(
+        ["git", "-C", str(PROJECT_ROOT), "worktree", "remove", "--force", str(directory)],
+        check=True,
+        capture_output=True,
+    )
+
+
+def measure(container, deployer, user, receiver):
+    """operation => gas used, for a `MockNft` container of any revision."""
+    mimetic = container.deploy({"from": deployer})
+    mimetic.enableGeneration(0, {"from": deployer})
+    gas = {}
+
+    gen_id = mimetic.getGenerationCount()
+    gas["addGeneration"] = mimetic.addGeneration("Bench", "", UNLOCK_PRICE, 0, False, {"from": deployer}).gas_used
+    gas["enableGeneration"] = mimetic.enableGeneration(gen_id, {"from": deployer}).gas_used
+    mimetic.setGenerationAvailability(gen_id, True, {"from": deployer})
+
+    # The first mint pays for initialising generation 0 counters, so measure a follow-up one.
+    mimetic.mint(1, {"from": user})
+    gas["mint"] = mimetic.mint(2, {"from": user}).gas_used
+    gas["unlockGeneration"] = mimetic.unlockGeneration(2, gen_id, {"from": user, "value": UNLOCK_PRICE}).gas_used
+    gas["activateGeneration"] = mimetic.activateGeneration(2, gen_id, {"from": user}).gas_used
+    gas["transferFrom"] = mimetic.transferFrom(user, receiver, 2, {"from": user}).gas_used
+    gas["burn"] = mimetic.burn(2, {"from": receiver}).gas_used
+    return gas
+
+
+def markdown_table(revisions, columns):
+    operations = list(dict.fromkeys(operation for gas in columns for operation in gas))
+    compare = len(columns) > 1
+    lines = [
+        "| operation | " + " | ".join(revisions) + (" | change |" if compare else " |"),
+        "|---|" + "---:|" * (len(revisions) + compare),
+    ]
+    for operation in operations:
+        cells = [f"{gas[operation]:,}" if operation in gas else "-" for gas in columns]
+        if compare:
+            first, last = columns[0].get(operation), columns[-1].get(operation)
+            cells.append(f"{(last - first) / first:+.1%}" if first and last else "-")
+        lines.append(f"| {operation} | " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("revisions", nargs="+", help="git revisions, oldest first")
+    parser.add_argument("--network", default="development")
+    parser.add_argument("--output", help="markdown file to write the table to")
+    args = parser.parse_args(argv)
+
+    project.load(PROJECT_ROOT)
+    # after loading the project, its configuration is needed
+    from scripts.eth_tester_backend import NETWORK_ID, register
+    from scripts.utilities import get_deployer_account, get_user_account
+
+    if args.network == NETWORK_ID:
+        register()
+    network.connect(args.network)
+    deployer, user = get_deployer_account(), get_user_account()
+
+    columns, compilers = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, revision in enumerate(args.revisions):
+            directory = Path(tmp) / f"revision{index}"
+            checkout(revision, directory)
+            try:
+                revision_project = project.load(directory, name=f"Revision{index}")
+                columns.append(measure(revision_project.MockNft, deployer, user, deployer))
+                compilers.append(str(solidity.get_version()))
+                revision_project.close()
+            finally:
+                remove_checkout(directory)
+
+    table = markdown_table(args.revisions, columns)
+    footer = f"solc {', '.join(dict.fromkeys(compilers))}, {network.web3.clientVersion}"
+    print(f"{table}\n\n{footer}")
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(f"{table}\n\n{footer}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""Incremental event indexer for MimeticERC721 token state.
+
+    brownie run scripts/indexer.py
+
+Rebuilds "token => owner, active generation, unlocked generations" from the `GenerationAdded`,
+`GenerationEnabledDisabled`, `GenerationUnlocked`, `GenerationActivated` and `Transfer` logs instead of calling
+`tokenToGenerationId`/`tokenToUnlockedGenerations` per token. Logs are fetched in block ranges which shrink when the
+node rejects a query and grow again while queries succeed, and each range is applied to SQLite in one transaction
+together with the checkpoint, so an interrupted run resumes where it stopped.
+
+Every change made within the last `reorg_depth` blocks is journalled. When the hash of an indexed block no longer
+matches the chain, the changes of the orphaned blocks are undone and indexing continues from the common ancestor.
+
+`main` reads its settings from the environment, since `brownie run` does not forward arguments:
+
+    INDEXER_ADDRESS    contract to index (default: the most recent `MockNft` deployment)
+    INDEXER_DATABASE   SQLite file (default: mimetic_index.sqlite)
+    INDEXER_START      first block to index (default: 0)
+
+Tokens minted before the first block get their owner and active generation read from the chain when a log first
+touches them. Unlocks made before it are not indexed.
+"""
+import json
+import os
+import sqlite3
+
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3 import Web3
+
+
+ZERO_ADDRESS = "0x" + "00" * 20
+GENESIS_UNLOCK_BIT = 1
+
+EVENT_SIGNATURES = {
+    "GenerationAdded": "GenerationAdded(uint256)",
+    "GenerationEnabledDisabled": "GenerationEnabledDisabled(uint256,bool)",
+    "GenerationUnlocked": "GenerationUnlocked(uint256,uint256,address)",
+    "GenerationActivated": "GenerationActivated(uint256,uint256)",
+    "Transfer": "Transfer(address,address,uint256)",
+}
+EVENT_TOPICS = {bytes(Web3.keccak(text=signature)): name for name, signature in EVENT_SIGNATURES.items()}
+SELECTORS = {name: bytes(Web3.keccak(text=f"{name}(uint256)")[:4]) for name in ("ownerOf", "tokenToGenerationId")}
+
+# JSON-RPC error code and message fragments of nodes rejecting a log query over too wide a range or with too many
+# results: geth "query returned more than 10000 results", Infura "limit exceeded", Alchemy "Log response size exceeded"
+# or "block range is too large", and similar wordings of other providers.
+LIMIT_EXCEEDED_CODE = -32005
+RANGE_ERROR_FRAGMENTS = ("range", "too large", "too many", "more than", "limit exceeded", "size exceeded")
+
+# table => primary key columns, used by the undo journal
+TABLE_KEYS = {
+    "generations": ("generation_id",),
+    "tokens": ("token_id",),
+    "unlocks": ("token_id", "generation_id"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block_number INTEGER NOT NULL
+);
+-- hashes of indexed blocks within the reorg window, plus the newest one before it as the anchor
+CREATE TABLE IF NOT EXISTS blocks (
+    block_number INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL
+);
+-- previous row of every change made within the reorg window, NULL when the row did not exist
+CREATE TABLE IF NOT EXISTS undo_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    block_number INTEGER NOT NULL,
+    table_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    previous_row TEXT
+);
+CREATE TABLE IF NOT EXISTS generations (
+    generation_id INTEGER PRIMARY KEY,
+    enabled INTEGER NOT NULL
+);
+-- token ids are uint256, stored as decimal text
+CREATE TABLE IF NOT EXISTS tokens (
+    token_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    active_generation INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_by_owner ON tokens (owner);
+-- unlocks may exist for tokens which are not minted yet, since unlocking does not require the token to exist
+CREATE TABLE IF NOT EXISTS unlocks (
+    token_id TEXT NOT NULL,
+    generation_id INTEGER NOT NULL,
+    PRIMARY KEY (token_id, generation_id)
+);
+"""
+
+
+class ReorgTooDeep(Exception):
+    pass
+
+
+def _topic_int(topic):
+    return int.from_bytes(bytes(topic), "big")
+
+
+def _topic_address(topic):
+    return to_checksum_address(bytes(topic)[-20:])
+
+
+def _block_hash(value):
+    return bytes(HexBytes(value)).hex()
+
+
+def _is_range_error(exc):
+    # web3 raises JSON-RPC errors as a ValueError holding the error object
+    error = exc.args[0] if exc.args else ""
+    if isinstance(error, dict):
+        if error.get("code") == LIMIT_EXCEEDED_CODE:
+            return True
+        error = error.get("message", "")
+    return any(fragment in str(error).lower() for fragment in RANGE_ERROR_FRAGMENTS)
+
+
+class MimeticIndexer:
+    def __init__(
+            self,
+            web3,
+            address,
+            database=":memory:",
+            start_block=0,
+            batch_size=2000,
+            min_batch_size=1,
+            max_batch_size=100000,
+            reorg_depth=64,
+            confirmations=0):
+        self.web3 = web3
+        self.address = to_checksum_address(address)
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.reorg_depth = reorg_depth
+        self.confirmations = confirmations
+
+        self.db = sqlite3.connect(database)
+        self.db.executescript(SCHEMA)
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO checkpoint (id, block_number) VALUES (0, ?)", (start_block - 1,))
+
+    def close(self):
+        self.db.close()
+
+    @property
+    def checkpoint(self):
+        """The last fully indexed block."""
+        return self.db.execute("SELECT block_number FROM checkpoint").fetchone()[0]
+
+    # Syncing
+
+    def sync(self, to_block=None):
+        """Indexes up to `to_block` (default: the chain head minus `confirmations`). Returns the number of logs applied."""
+        self._rollback_orphaned_blocks()
+
+        if to_block is None:
+            to_block = self.web3.eth.block_number - self.confirmations
+        applied = 0
+        while self.checkpoint < to_block:
+            from_block = self.checkpoint + 1
+            batch_end = min(to_block, from_block + self.batch_size - 1)
+            try:
+                logs = self._get_logs(from_block, batch_end)
+            except ValueError as exc:
+                # Most nodes reject ranges which are too wide or return too many logs, retry with a narrower one.
+                if not _is_range_error(exc) or batch_end == from_block or self.batch_size <= self.min_batch_size:
+                    raise
+                self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+                continue
+
+            self._apply_batch(logs, batch_end, _block_hash(self.web3.eth.get_block(batch_end)["hash"]))
+            applied += len(logs)
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+        return applied
+
+    def _get_logs(self, from_block, to_block):
+        logs = self.web3.eth.get_logs({
+            "address": self.address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [["0x" + topic.hex() for topic in EVENT_TOPICS]],
+        })
+        return sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+
+    def _apply_batch(self, logs, batch_end, batch_end_hash):
+        with self.db:
+            block_hashes = {batch_end: batch_end_hash}
+            for log in logs:
+                block_hashes[log["blockNumber"]] = _block_hash(log["blockHash"])
+                self._apply_log(log)
+
+            self.db.executemany(
+                "INSERT OR REPLACE INTO blocks (block_number, block_hash) VALUES (?, ?)", block_hashes.items()
+            )
+            self.db.execute("UPDATE checkpoint SET block_number = ?", (batch_end,))
+            self._prune(batch_end)
+
+    def _apply_log(self, log):
+        topics = log["topics"]
+        event = EVENT_TOPICS.get(bytes(topics[0]))
+        block = log["blockNumber"]
+
+        if event == "GenerationAdded":
+            self._write(block, "generations", (_topic_int(topics[1]),), {"enabled": 0})
+        elif event == "GenerationEnabledDisabled":
+            self._write(block, "generations", (_topic_int(topics[1]),), {"enabled": int.from_bytes(HexBytes(log["data"]), "big")})
+        elif event == "GenerationUnlocked":
+            self._write(block, "unlocks", (str(_topic_int(topics[2])), _topic_int(topics[1])), {})
+        elif event == "GenerationActivated":
+            token_id = str(_topic_int(topics[2]))
+            owner, _ = self._token_state(token_id, block)
+            self._write(block, "tokens", (token_id,), {"owner": owner, "active_generation": _topic_int(topics[1])})
+        elif event == "Transfer":
+            sender, receiver, token_id = _topic_address(topics[1]), _topic_address(topics[2]), str(_topic_int(topics[3]))
+            if receiver == ZERO_ADDRESS:
+                # burning clears the token state on chain as well
+                self._write(block, "tokens", (token_id,), None)
+                for (generation_id,) in self.db.execute("SELECT generation_id FROM unlocks WHERE token_id = ?", (token_id,)).fetchall():
+                    self._write(block, "unlocks", (token_id, generation_id), None)
+            else:
+                active_generation = 0 if sender == ZERO_ADDRESS else self._token_state(token_id, block)[1]
+                self._write(block, "tokens", (token_id,), {"owner": receiver, "active_generation": active_generation})
+
+    def _token_state(self, token_id, block):
+        """Owner and active generation of the token before the log, read at the previous block when it is not indexed.
+
+        A token without a row was minted before the start block, and this is the first log touching it, so its state at
+        the end of the previous block is the state before this log.
+        """
+        row = self._row("tokens", (token_id,))
+        if row is not None:
+            return row[1:]
+        return (
+            _topic_address(self._call("ownerOf", token_id, block - 1)),
+            _topic_int(self._call("tokenToGenerationId", token_id, block - 1)),
+        )
+
+    def _call(self, function, token_id, block):
+        data = SELECTORS[function] + int(token_id).to_bytes(32, "big")
+        return self.web3.eth.call({"to": self.address, "data": "0x" + data.hex()}, block)
+
+    # Storage with an undo journal
+
+    def _row(self, table, key):
+        where = " AND ".join(f"{column} = ?" for column in TABLE_KEYS[table])
+        return self.db.execute(f"SELECT * FROM {table} WHERE {where}", key).fetchone()
+
+    def _write(self, block_number, table, key, values):
+        """Replaces the row with `key` by `values`, or deletes it when `values` is None, journalling the previous row."""
+        previous = self._row(table, key)
+        self.db.execute(
+            "INSERT INTO undo_log (block_number, table_name, row_key, previous_row) VALUES (?, ?, ?, ?)",
+            (block_number, table, json.dumps(key), None if previous is None else json.dumps(previous)),
+        )
+        self._replace_row(table, key, None if values is None else key + tuple(values.values()))
+
+    def _replace_row(self, table, key, row):
+        where = " AND ".join(f"{column} = ?" for column in TABLE_KEYS[table])
+        self.db.execute(f"DELETE FROM {table} WHERE {where}", key)
+        if row is not None:
+            self.db.execute(f"INSERT INTO {table} VALUES ({', '.join('?' * len(row))})", row)
+
+    def _prune(self, head):
+        # Keep the journal for the reorg window, and the newest block hash before it as the anchor.
+        cutoff = head - self.reorg_depth
+        self.db.execute("DELETE FROM undo_log WHERE block_number <= ?", (cutoff,))
+        self.db.execute(
+            "DELETE FROM blocks WHERE block_number < (SELECT MAX(block_number) FROM blocks WHERE block_number <= ?)",
+            (cutoff,),
+        )
+
+    # Reorgs
+
+    def _rollback_orphaned_blocks(self):
+        stored = self.db.execute("SELECT block_number, block_hash FROM blocks ORDER BY block_number DESC").fetchall()
+        if not stored:
+            return
+
+        head = self.web3.eth.block_number
+        ancestor = None
+        for block_number, block_hash in stored:
+            if block_number <= head and _block_hash(self.web3.eth.get_block(block_number)["hash"]) == block_hash:
+                ancestor = block_number
+                break
+        if ancestor == stored[0][0]:
+            return
+
+        if ancestor is None:
+            oldest = stored[-1][0]
+            if oldest <= self.checkpoint - self.reorg_depth:
+                raise ReorgTooDeep(f"Reorg deeper than block {oldest}, the index has to be rebuilt")
+            # Nothing was pruned yet, and every block with logs is stored, so there were no changes before the oldest one.
+            ancestor = oldest - 1
+
+        with self.db:
+            undo = self.db.execute(
+                "SELECT table_name, row_key, previous_row FROM undo_log WHERE block_number > ? ORDER BY id DESC",
+                (ancestor,),
+            ).fetchall()
+            for table, key, previous in undo:
+                self._replace_row(table, tuple(json.loads(key)), None if previous is None else tuple(json.loads(previous)))
+            self.db.execute("DELETE FROM undo_log WHERE block_number > ?", (ancestor,))
+            self.db.execute("DELETE FROM blocks WHERE block_number > ?", (ancestor,))
+            self.db.execute("UPDATE checkpoint SET block_number = ?", (ancestor,))
+
+    # Queries
+
+    def owner_of(self, token_id):
+        row = self._row("tokens", (str(token_id),))
+        return None if row is None else row[1]
+
+    def active_generation(self, token_id):
+        """Same as `tokenToGenerationId`."""
+        row = self._row("tokens", (str(token_id),))
+        return 0 if row is None else row[2]
+
+    def unlocked_generations(self, token_id):
+        """Explicitly unlocked generations of the token, generation 0 included. Auto-unlocks are not resolved."""
+        rows = self.db.execute(
+            "SELECT generation_id FROM unlocks WHERE token_id = ? ORDER BY generation_id", (str(token_id),)
+        ).fetchall()
+        return sorted({0} | {generation_id for (generation_id,) in rows})
+
+    def unlocked_generations_word(self, token_id, word_index=0):
+        """Same as `unlockedGenerationsWord`, word 0 is `tokenToUnlockedGenerations`."""
+        word = 0
+        for generation_id in self.unlocked_generations(token_id):
+            if generation_id >> 8 == word_index:
+                word |= 1 << (generation_id & 0xff)
+        return word
+
+    def tokens_of(self, owner):
+        rows = self.db.execute("SELECT token_id FROM tokens WHERE owner = ?", (to_checksum_address(owner),)).fetchall()
+        return sorted(int(token_id) for (token_id,) in rows)
+
+    def generations(self):
+        """generation id => enabled. Generations removed on chain are not reported by any event and stay listed."""
+        return {generation_id: bool(enabled) for generation_id, enabled in self.db.execute("SELECT * FROM generations")}
+
+
+def main():
+    from brownie import MockNft, web3
+
+    address = os.environ.get("INDEXER_ADDRESS") or MockNft[-1].address
+    indexer = MimeticIndexer(
+        web3,
+        address,
+        os.environ.get("INDEXER_DATABASE", "mimetic_index.sqlite"),
+        start_block=int(os.environ.get("INDEXER_START", "0")),
+    )
+    applied = indexer.sync()
+    token_count = indexer.db.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+    print(f"Applied {applied} logs up to block {indexer.checkpoint}, {token_count} tokens indexed")
+    indexer.close()
@@ -0,0 +1,196 @@
+"""In-memory fuzzing of the MimeticERC721 reference model.
+
+    python -m scripts.mimetic_fuzz --sequences 20000 --steps 50 --seed 1
+
+Runs random operation sequences against `scripts.mimetic_model.MimeticModel`, checking the counter invariants after
+every step, and prints the throughput and the outcome of every operation. No chain is involved, see
+`tests/test_mimetic_model.py` for replaying sampled sequences against `MockNft`.
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from scripts.mimetic_model import MimeticModel, ModelRevert, Operation, PANIC
+
+
+# Account 0 deploys the contract and owns it, the others are token holders.
+ACCOUNTS = (0, 1, 2)
+OWNER = 0
+# A small pool of token ids, so that operations keep running into each other.
+TOKEN_IDS = range(1, 7)
+PRICES = (0, 1, 42)
+# Generation 0 costs 75 ether in `MockNft`, cap the value so that replayed transactions stay within test balances.
+MAX_VALUE = 10**18
+BATCH_SIZES = (0, 1, 2, 3)
+
+OPERATION_WEIGHTS = {
+    "addGeneration": 6,
+    "removeGeneration": 1,
+    "setGenerationPrice": 1,
+    "setGenerationPrerequisite": 1,
+    "setGenerationAvailability": 4,
+    "enableGeneration": 6,
+    "disableGeneration": 2,
+    "unlockGeneration": 10,
+    "unlockGenerations": 4,
+    "activateGeneration": 10,
+    "activateGenerations": 4,
+    "mint": 6,
+    "mintBatch": 2,
+    "burn": 3,
+    "transferFrom": 3,
+}
+
+
+def _generation_id(rng, model):
+    # Mostly existing generations, sometimes the next id which does not exist yet.
+    return rng.randrange(len(model.generations) + 1)
+
+
+def _sender(rng, admin=False):
+    # Admin operations come from the owner most of the time, to get past `onlyOwner`.
+    if admin and rng.random() < 0.9:
+        return OWNER
+    return rng.choice(ACCOUNTS)
+
+
+def _holder_of(rng, model, token_id):
+    # Token operations come from the token owner most of the time, to get past the ownership checks.
+    if token_id in model.owners and rng.random() < 0.9:
+        return model.owners[token_id]
+    return rng.choice(ACCOUNTS)
+
+
+def _unlock_value(rng, model, generation_ids):
+    price = sum(model.generations[gen_id].price for gen_id in generation_ids if gen_id < len(model.generations))
+    price = min(price, MAX_VALUE)
+    return max(0, price - 1) if rng.random() < 0.1 else price
+
+
+def random_operation(rng, model):
+    name = rng.choices(list(OPERATION_WEIGHTS), weights=list(OPERATION_WEIGHTS.values()))[0]
+
+    if name == "addGeneration":
+        auto_unlock = rng.random() < 0.3
+        price = 0 if auto_unlock else rng.choice(PRICES)
+        prereq = rng.randrange(len(model.generations) + 1)
+        return Operation(name, ("Gen", "", price, prereq, auto_unlock), _sender(rng, admin=True))
+    if name in ("removeGeneration", "enableGeneration", "disableGeneration"):
+        return Operation(name, (_generation_id(rng, model),), _sender(rng, admin=True))
+    if name == "setGenerationPrice":
+        return Operation(name, (_generation_id(rng, model), rng.choice(PRICES)), _sender(rng, admin=True))
+    if name == "setGenerationPrerequisite":
+        args = (_generation_id(rng, model), _generation_id(rng, model))
+        return Operation(name, args, _sender(rng, admin=True))
+    if name == "setGenerationAvailability":
+        return Operation(name, (_generation_id(rng, model), rng.random() < 0.8), _sender(rng, admin=True))
+
+    if name == "unlockGeneration":
+        token_id, gen_id = rng.choice(TOKEN_IDS), _generation_id(rng, model)
+        return Operation(name, (token_id, gen_id), _holder_of(rng, model, token_id), _unlock_value(rng, model, [gen_id]))
+    if name == "unlockGenerations":
+        size = rng.choice(BATCH_SIZES)
+        token_ids = [rng.choice(TOKEN_IDS) for _ in range(size)]
+        gen_ids = [_generation_id(rng, model) for _ in range(size)]
+        return Operation(name, (token_ids, gen_ids), rng.choice(ACCOUNTS), _unlock_value(rng, model, gen_ids))
+    if name == "activateGeneration":
+        token_id = rng.choice(TOKEN_IDS)
+        return Operation(name, (token_id, _generation_id(rng, model)), _holder_of(rng, model, token_id))
+    if name == "activateGenerations":
+        size = rng.choice(BATCH_SIZES)
+        token_ids = [rng.choice(TOKEN_IDS) for _ in range(size)]
+        sender = _holder_of(rng, model, token_ids[0]) if token_ids else rng.choice(ACCOUNTS)
+        if rng.random() < 0.5:
+            return Operation(name, (token_ids, _generation_id(rng, model)), sender)
+        return Operation(name, (token_ids, [_generation_id(rng, model) for _ in range(size)]), sender)
+
+    if name == "mint":
+        return Operation(name, (rng.choice(TOKEN_IDS),), rng.choice(ACCOUNTS))
+    if name == "mintBatch":
+        return Operation(name, (rng.choice(TOKEN_IDS), rng.choice(BATCH_SIZES)), rng.choice(ACCOUNTS))
+    if name == "burn":
+        return Operation(name, (rng.choice(TOKEN_IDS),), rng.choice(ACCOUNTS))
+    if name == "transferFrom":
+        token_id = rng.choice(TOKEN_IDS)
+        sender = _holder_of(rng, model, token_id)
+        return Operation(name, (sender, rng.choice(ACCOUNTS), token_id), sender)
+
+    raise ValueError(f"Unknown operation {name}")
+
+
+def new_model():
+    # `MockNft` as deployed by the tests: generation 0 enabled.
+    model = MimeticModel.mock_nft(OWNER)
+    model.enable_generation(OWNER, 0)
+    return model
+
+
+def run_sequence(rng, steps, check_invariants=True):
+    """Runs a random sequence on a fresh model. Returns the operations and their outcomes, `None` or a revert reason."""
+    model = new_model()
+    operations, outcomes = [], []
+    for _ in range(steps):
+        operation = random_operation(rng, model)
+        try:
+            model.execute(operation)
+            outcome = None
+        except ModelRevert as exc:
+            outcome = exc.reason
+        operations.append(operation)
+        outcomes.append(outcome)
+        if check_invariants:
+            model.check_invariants()
+    return operations, outcomes
+
+
+def generate_sequences(count, steps, seed):
+    rng = random.Random(seed)
+    return [run_sequence(rng, steps) for _ in range(count)]
+
+
+def sample_sequences(sequences, limit):
+    """Greedily picks up to `limit` sequences which together cover the most distinct (operation, outcome) pairs."""
+    coverage = [{(op.name, outcome) for op, outcome in zip(*sequence)} for sequence in sequences]
+    covered, picked = set(), []
+    for _ in range(limit):
+        best = max(range(len(sequences)), key=lambda i: len(coverage[i] - covered), default=None)
+        if best is None or not coverage[best] - covered:
+            break
+        covered |= coverage[best]
+        picked.append(sequences[best])
+    return picked
+
+
+def fuzz(sequences, steps, seed):
+    rng = random.Random(seed)
+    outcomes = Counter()
+    for _ in range(sequences):
+        operations, results = run_sequence(rng, steps)
+        outcomes.update((op.name, result) for op, result in zip(operations, results))
+    return outcomes
+
+
+def main(sequences=2000, steps=50, seed=0):
+    start = time.perf_counter()
+    outcomes = fuzz(sequences, steps, seed)
+    elapsed = time.perf_counter() - start
+
+    total = sum(outcomes.values())
+    print(f"{total:,} operations in {sequences:,} sequences, {elapsed:.1f}s ({total / elapsed * 60:,.0f} per minute)")
+    width = max(len(name) for name, _ in outcomes)
+    for (name, outcome), count in sorted(outcomes.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        print(f"{name.ljust(width)}  {count:>10,}  {outcome or 'ok'}")
+
+    panics = sorted({name for name, outcome in outcomes if outcome == PANIC})
+    if panics:
+        print(f"\nOperations which reverted without a reason: {', '.join(panics)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sequences", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.sequences, args.steps, args.seed)
@@ -0,0 +1,496 @@
+"""Pure-Python reference model of the MimeticERC721 state machine.
+
+Mirrors the generations, per-token unlock masks, counters and revert reasons of `MimeticERC721Base` as deployed by
+`MockNft`, so that long random operation sequences can be checked in memory (see `scripts/mimetic_fuzz.py`) and
+replayed against the contract to diff the results (see `tests/test_mimetic_model.py`).
+
+Operations are named after the contract functions. Accounts are opaque hashable values, the model does not care
+whether they are indexes or addresses.
+"""
+from collections import namedtuple
+
+
+MAX_GENERATIONS = 1 << 16
+MAX_UINT32 = 2**32 - 1
+MAX_UINT128 = 2**128 - 1
+WORD_MASK = 2**256 - 1
+GENESIS_UNLOCK_BIT = 1
+
+# Reason reported for reverts without a message, i.e. arithmetic underflows and out of bounds array accesses.
+PANIC = "Panic"
+
+Operation = namedtuple("Operation", ["name", "args", "sender", "value"], defaults=((), None, 0))
+
+
+class ModelRevert(Exception):
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _require(condition, reason):
+    if not condition:
+        raise ModelRevert(reason)
+
+
+def _bits(mask):
+    # Indexes of the set bits, lowest first, the same order the contract visits them in.
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Generation:
+    __slots__ = (
+        "price", "prerequisite_generation", "unlocks", "activations", "name", "base_uri",
+        "enabled", "available", "auto_unlock",
+    )
+
+    def __init__(self, name, base_uri, price, prerequisite_generation, auto_unlock):
+        self.price = price
+        self.prerequisite_generation = prerequisite_generation
+        self.unlocks = 0
+        self.activations = 0
+        self.name = name
+        self.base_uri = base_uri
+        self.enabled = False
+        self.available = False
+        self.auto_unlock = auto_unlock
+
+    def as_tuple(self):
+        # Same shape as the `generations` getter of the contract.
+        return (
+            self.price, self.prerequisite_generation, self.unlocks, self.activations, self.name, self.base_uri,
+            self.enabled, self.available, self.auto_unlock,
+        )
+
+
+class MimeticModel:
+    # contract function name => (model method, is a view, is payable)
+    OPERATIONS = {
+        "addGeneration": ("add_generation", False, False),
+        "removeGeneration": ("remove_generation", False, False),
+        "setGenerationName": ("set_generation_name", False, False),
+        "setGenerationBaseUri": ("set_generation_base_uri", False, False),
+        "setGenerationPrice": ("set_generation_price", False, False),
+        "setGenerationPrerequisite": ("set_generation_prerequisite", False, False),
+        "setGenerationAvailability": ("set_generation_availability", False, False),
+        "enableGeneration": ("enable_generation", False, False),
+        "disableGeneration": ("disable_generation", False, False),
+        "unlockGeneration": ("unlock_generation", False, True),
+        "unlockGenerations": ("unlock_generations", False, True),
+        "activateGeneration": ("activate_generation", False, False),
+        "activateGenerations": ("activate_generations", False, False),
+        "mint": ("mint", False, False),
+        "mintBatch": ("mint_batch", False, False),
+        "burn": ("burn", False, False),
+        "transferFrom": ("transfer_from", False, False),
+        "generations": ("generation", True, False),
+        "getGenerationCount": ("get_generation_count", True, False),
+        "tokenToGenerationId": ("token_to_generation_id", True, False),
+        "tokenToUnlockedGenerations": ("token_to_unlocked_generations", True, False),
+        "unlockedGenerationsWord": ("unlocked_generations_word", True, False),
+        "isGenerationUnlocked": ("is_generation_unlocked", True, False),
+        "effectiveUnlockMask": ("effective_unlock_mask", True, False),
+        "effectiveUnlockMaskWord": ("effective_unlock_mask_word", True, False),
+        "effectiveUnlockMasks": ("effective_unlock_masks", True, False),
+        "getUnlockableGenerations": ("get_unlockable_generations", True, False),
+        "getUnlockableGenerationsWord": ("get_unlockable_generations_word", True, False),
+        "ownerOf": ("owner_of", True, False),
+    }
+
+    def __init__(self, owner, max_generations=MAX_GENERATIONS):
+        self.owner = owner
+        self.max_generations = max_generations
+        self.generations = []
+        # token => owner, for minted tokens only
+        self.owners = {}
+        # token => active generation, missing means generation 0
+        self.active = {}
+        # token => bit-encoded explicitly unlocked generations across all words. Tokens may hold unlocks before they
+        # are minted, since unlocking does not require the token to exist.
+        self.unlocked = {}
+        # bit-encoded auto-unlock generations across all words
+        self.auto_unlock = 0
+        self._journal = None
+
+    @classmethod
+    def mock_nft(cls, owner, max_generations=MAX_GENERATIONS):
+        # State of a freshly deployed `MockNft`.
+        model = cls(owner, max_generations)
+        model.add_generation(owner, "Mock NFT", "ipfs://baseuri", 75 * 10**18, 0, False)
+        return model
+
+    def execute(self, operation):
+        """Applies the operation and returns its result, or raises `ModelRevert` leaving the state untouched."""
+        method_name, is_view, is_payable = self.OPERATIONS[operation.name]
+        method = getattr(self, method_name)
+        if is_view:
+            return method(*operation.args)
+
+        _require(is_payable or not operation.value, PANIC)
+        kwargs = {"value": operation.value} if is_payable else {}
+        self._journal = []
+        try:
+            return method(operation.sender, *operation.args, **kwargs)
+        except ModelRevert:
+            for undo in reversed(self._journal):
+                undo()
+            raise
+        finally:
+            self._journal = None
+
+    # State changes go through these so that `execute` can roll back reverted transactions.
+
+    def _set_attr(self, target, name, value):
+        if self._journal is not None:
+            old = getattr(target, name)
+            self._journal.append(lambda: setattr(target, name, old))
+        setattr(target, name, value)
+
+    def _set_item(self, mapping, key, value):
+        if self._journal is not None:
+            if key in mapping:
+                old = mapping[key]
+                self._journal.append(lambda: mapping.__setitem__(key, old))
+            else:
+                self._journal.append(lambda: mapping.pop(key, None))
+        mapping[key] = value
+
+    def _delete_item(self, mapping, key):
+        if key in mapping:
+            if self._journal is not None:
+                old = mapping[key]
+                self._journal.append(lambda: mapping.__setitem__(key, old))
+            del mapping[key]
+
+    def _set_auto_unlock(self, value):
+        self._set_attr(self, "auto_unlock", value)
+
+    def _add_counter(self, generation, name, delta):
+        value = getattr(generation, name) + delta
+        _require(0 <= value <= MAX_UINT32, PANIC)
+        self._set_attr(generation, name, value)
+
+    # Modifiers
+
+    def _only_owner(self, sender):
+        _require(sender == self.owner, "Ownable: caller is not the owner")
+
+    def _when_generation_disabled(self, generation_id):
+        _require(
+            generation_id < len(self.generations) and not self.generations[generation_id].enabled,
+            "MimeticERC721: Generation must be disabled",
+        )
+
+    def _when_generation_enabled(self, generation_id):
+        _require(
+            generation_id < len(self.generations) and self.generations[generation_id].enabled,
+            "MimeticERC721: Generation must be enabled",
+        )
+
+    def _generation(self, generation_id):
+        _require(generation_id < len(self.generations), PANIC)
+        return self.generations[generation_id]
+
+    # Generation management
+
+    def add_generation(self, sender, name, base_uri, price, prereq_generation, auto_unlock):
+        self._only_owner(sender)
+        new_id = len(self.generations)
+        _require(new_id < self.max_generations, "MimeticERC721: Generation limit reached")
+        _require(len(name.encode()) > 0, "MimeticERC721: Invalid generation name")
+        _require(new_id >= prereq_generation, "MimeticERC721: Invalid prerequisite generation")
+        _require(
+            new_id == prereq_generation or not self.generations[prereq_generation].auto_unlock,
+            "MimeticERC721: Invalid prerequisite generation",
+        )
+        if auto_unlock:
+            _require(new_id != prereq_generation, "MimeticERC721: Invalid prerequisite generation")
+            _require(price == 0, "MimeticERC721: Auto-unlock generation must have no associated price")
+        _require(price <= MAX_UINT128, "SafeCast: value doesn't fit in 128 bits")
+
+        self.generations.append(Generation(name, base_uri, price, prereq_generation, auto_unlock))
+        if self._journal is not None:
+            self._journal.append(self.generations.pop)
+        if auto_unlock:
+            self._set_auto_unlock(self.auto_unlock | (1 << new_id))
+
+    def remove_generation(self, sender, generation_id):
+        self._when_generation_disabled(generation_id)
+        self._only_owner(sender)
+        _require(
+            generation_id + 1 == len(self.generations),
+            "MimeticERC721: Only the most recently added generation may be removed",
+        )
+        _require(self.generations[generation_id].unlocks == 0, "MimeticERC721: Generation already has unlocks")
+        removed = self.generations.pop()
+        if self._journal is not None:
+            self._journal.append(lambda: self.generations.append(removed))
+        self._set_auto_unlock(self.auto_unlock & ~(1 << generation_id))
+
+    def set_generation_name(self, sender, generation_id, name):
+        self._when_generation_disabled(generation_id)
+        self._only_owner(sender)
+        _require(len(name.encode()) > 0, "MimeticERC721: Invalid generation name")
+        self._set_attr(self.generations[generation_id], "name", name)
+
+    def set_generation_base_uri(self, sender, generation_id, base_uri):
+        self._only_owner(sender)
+        _require(generation_id < len(self.generations), "MimeticERC721: Invalid generation")
+        _require(len(base_uri.encode()) > 0, "MimeticERC721: Invalid base URI")
+        self._set_attr(self.generations[generation_id], "base_uri", base_uri)
+
+    def set_generation_price(self, sender, generation_id, price):
+        self._when_generation_disabled(generation_id)
+        self._only_owner(sender)
+        _require(not self.generations[generation_id].auto_unlock, "MimeticERC721: Auto-unlock must be free")
+        _require(price <= MAX_UINT128, "SafeCast: value doesn't fit in 128 bits")
+        self._set_attr(self.generations[generation_id], "price", price)
+
+    def set_generation_prerequisite(self, sender, generation_id, prereq_generation):
+        self._when_generation_disabled(generation_id)
+        self._only_owner(sender)
+        _require(generation_id >= prereq_generation, "MimeticERC721: Invalid prerequisite generation")
+        _require(not self.generations[prereq_generation].auto_unlock, "MimeticERC721: Invalid prerequisite generation")
+        self._set_attr(self.generations[generation_id], "prerequisite_generation", prereq_generation)
+
+    def set_generation_availability(self, sender, generation_id, availability):
+        self._only_owner(sender)
+        _require(generation_id < len(self.generations), "MimeticERC721: Invalid generation")
+        self._set_attr(self.generations[generation_id], "available", availability)
+
+    def enable_generation(self, sender, generation_id):
+        self._when_generation_disabled(generation_id)
+        self._only_owner(sender)
+        gen = self.generations[generation_id]
+        prereq_id = gen.prerequisite_generation
+        _require(
+            generation_id == prereq_id or self._generation(prereq_id).enabled,
+            "MimeticERC721: Prerequisite must be enabled",
+        )
+        self._set_attr(gen, "enabled", True)
+
+    def disable_generation(self, sender, generation_id):
+        self._when_generation_enabled(generation_id)
+        self._only_owner(sender)
+        gen = self.generations[generation_id]
+        if gen.auto_unlock:
+            _require(gen.activations == 0, "MimeticERC721: Generation is actively used")
+        else:
+            _require(gen.unlocks == 0, "MimeticERC721: Generation already has unlocks")
+        self._set_attr(gen, "enabled", False)
+
+    # Views
+
+    def generation(self, generation_id):
+        return self._generation(generation_id).as_tuple()
+
+    def get_generation_count(self):
+        return len(self.generations)
+
+    def token_to_generation_id(self, token_id):
+        return self.active.get(token_id, 0)
+
+    def token_to_unlocked_generations(self, token_id):
+        return self.unlocked_generations_word(token_id, 0)
+
+    def unlocked_generations_word(self, token_id, word_index):
+        word = (self.unlocked.get(token_id, 0) >> (word_index << 8)) & WORD_MASK
+        return word | GENESIS_UNLOCK_BIT if word_index == 0 else word
+
+    def is_generation_unlocked(self, token_id, generation_id):
+        gen = self._generation(generation_id)
+        return self._is_unlocked(token_id, gen.prerequisite_generation if gen.auto_unlock else generation_id)
+
+    def effective_unlock_mask(self, token_id):
+        return self.effective_unlock_mask_word(token_id, 0)
+
+    def effective_unlock_mask_word(self, token_id, word_index):
+        mask = self.unlocked_generations_word(token_id, word_index)
+        offset = word_index << 8
+        for bit in _bits((self.auto_unlock >> offset) & WORD_MASK):
+            if self._is_unlocked(token_id, self.generations[offset | bit].prerequisite_generation):
+                mask |= 1 << bit
+        return mask
+
+    def effective_unlock_masks(self, token_ids):
+        return [self.effective_unlock_mask_word(token_id, 0) for token_id in token_ids]
+
+    def get_unlockable_generations(self, token_id):
+        return self.get_unlockable_generations_word(token_id, 0)
+
+    def get_unlockable_generations_word(self, token_id, word_index):
+        # Only the direct prerequisite is checked, the contract checks the whole chain within the word. Both agree as
+        # long as holding a generation implies holding its chain, which a difference here would point out.
+        mask, total_price = 0, 0
+        for generation_id in range(word_index << 8, min((word_index + 1) << 8, len(self.generations))):
+            gen = self.generations[generation_id]
+            prereq_id = gen.prerequisite_generation
+            if (
+                gen.enabled
+                and gen.available
+                and not gen.auto_unlock
+                and not self._is_unlocked(token_id, generation_id)
+                and (prereq_id == generation_id or self.is_generation_unlocked(token_id, prereq_id))
+            ):
+                mask |= 1 << (generation_id & 0xff)
+                total_price += gen.price
+        return (mask, total_price)
+
+    def owner_of(self, token_id):
+        _require(token_id in self.owners, "ERC721: owner query for nonexistent token")
+        return self.owners[token_id]
+
+    def _is_unlocked(self, token_id, generation_id):
+        return bool((self.unlocked.get(token_id, 0) | GENESIS_UNLOCK_BIT) >> generation_id & 1)
+
+    # Unlocking and activating
+
+    def unlock_generation(self, sender, token_id, generation_id, value=0):
+        price = self._unlock_generation(token_id, generation_id)
+        _require(value >= price, "MimeticERC721: Insufficient funds")
+        self._add_counter(self.generations[generation_id], "unlocks", 1)
+
+    def unlock_generations(self, sender, token_ids, generation_ids, value=0):
+        _require(len(token_ids) == len(generation_ids), "MimeticERC721: Array length mismatch")
+        deltas = {}
+        total_price = 0
+        for token_id, generation_id in zip(token_ids, generation_ids):
+            total_price += self._unlock_generation(token_id, generation_id)
+            deltas[generation_id] = deltas.get(generation_id, 0) + 1
+        _require(value >= total_price, "MimeticERC721: Insufficient funds")
+
+        for generation_id, delta in deltas.items():
+            self._add_counter(self.generations[generation_id], "unlocks", delta)
+
+    def activate_generation(self, sender, token_id, generation_id):
+        previous_id = self._activate_generation(sender, token_id, generation_id)
+        self._add_counter(self._generation(previous_id), "activations", -1)
+        self._add_counter(self.generations[generation_id], "activations", 1)
+
+    def activate_generations(self, sender, token_ids, generation_ids):
+        # `generation_ids` is a single id or a list of ids, like the two contract overloads.
+        if isinstance(generation_ids, int):
+            generation_ids = [generation_ids] * len(token_ids)
+        else:
+            _require(len(token_ids) == len(generation_ids), "MimeticERC721: Array length mismatch")
+
+        deltas = {}
+        for token_id, generation_id in zip(token_ids, generation_ids):
+            previous_id = self._activate_generation(sender, token_id, generation_id)
+            if previous_id != generation_id:
+                deltas[previous_id] = deltas.get(previous_id, 0) - 1
+                deltas[generation_id] = deltas.get(generation_id, 0) + 1
+
+        for generation_id, delta in deltas.items():
+            if delta:
+                self._add_counter(self._generation(generation_id), "activations", delta)
+
+    def _unlock_generation(self, token_id, generation_id):
+        _require(generation_id < len(self.generations), "MimeticERC721: Generation must be enabled")
+        gen = self.generations[generation_id]
+        _require(gen.enabled, "MimeticERC721: Generation must be enabled")
+        _require(gen.available, "MimeticERC721: Generation unavailable")
+        _require(
+            not gen.auto_unlock and not self._is_unlocked(token_id, generation_id),
+            "MimeticERC721: Generation already unlocked",
+        )
+
+        prereq_id = gen.prerequisite_generation
+        if prereq_id != generation_id:
+            _require(
+                self.is_generation_unlocked(token_id, prereq_id),
+                "MimeticERC721: Must unlock prerequisite generation first",
+            )
+
+        self._set_item(self.unlocked, token_id, self.unlocked.get(token_id, 0) | (1 << generation_id))
+        return gen.price
+
+    def _activate_generation(self, sender, token_id, generation_id):
+        _require(generation_id < len(self.generations), "MimeticERC721: Generation must be enabled")
+        gen = self.generations[generation_id]
+        _require(gen.enabled, "MimeticERC721: Generation must be enabled")
+        _require(self.owner_of(token_id) == sender, "MimeticERC721: Must be token owner")
+
+        if gen.auto_unlock:
+            _require(
+                self.is_generation_unlocked(token_id, gen.prerequisite_generation),
+                "MimeticERC721: Must unlock prerequisite generation first",
+            )
+        else:
+            _require(self._is_unlocked(token_id, generation_id), "MimeticERC721: Must unlock first")
+
+        previous_id = self.active.get(token_id, 0)
+        self._set_item(self.active, token_id, generation_id)
+        return previous_id
+
+    # ERC721
+
+    def mint(self, sender, token_id):
+        _require(token_id not in self.owners, "ERC721: token already minted")
+        self._set_item(self.owners, token_id, sender)
+        gen = self._generation(0)
+        self._add_counter(gen, "unlocks", 1)
+        self._add_counter(gen, "activations", 1)
+
+    def mint_batch(self, sender, start_token_id, quantity):
+        for token_id in range(start_token_id, start_token_id + quantity):
+            _require(token_id not in self.owners, "ERC721: token already minted")
+            self._set_item(self.owners, token_id, sender)
+        gen = self._generation(0)
+        _require(quantity <= MAX_UINT32, "SafeCast: value doesn't fit in 32 bits")
+        self._add_counter(gen, "unlocks", quantity)
+        self._add_counter(gen, "activations", quantity)
+
+    def burn(self, sender, token_id):
+        for generation_id in _bits(self.unlocked.get(token_id, 0) | GENESIS_UNLOCK_BIT):
+            self._add_counter(self._generation(generation_id), "unlocks", -1)
+        self._add_counter(self._generation(self.active.get(token_id, 0)), "activations", -1)
+        self._delete_item(self.unlocked, token_id)
+        self._delete_item(self.active, token_id)
+
+        self.owner_of(token_id)
+        self._delete_item(self.owners, token_id)
+
+    def transfer_from(self, sender, from_account, to_account, token_id):
+        # Approvals are not modelled, only the token owner may transfer.
+        _require(token_id in self.owners, "ERC721: operator query for nonexistent token")
+        _require(self.owners[token_id] == sender, "ERC721: transfer caller is not owner nor approved")
+        _require(self.owners[token_id] == from_account, "ERC721: transfer of token that is not own")
+        self._set_item(self.owners, token_id, to_account)
+
+    # Invariants
+
+    def check_invariants(self):
+        """Recounts the generation counters from the per-token state and raises `AssertionError` on any mismatch."""
+        unlocks = [0] * len(self.generations)
+        activations = [0] * len(self.generations)
+        if unlocks:
+            unlocks[0] = len(self.owners)
+
+        for token_id, unlocked in self.unlocked.items():
+            for generation_id in _bits(unlocked & ~GENESIS_UNLOCK_BIT):
+                assert generation_id < len(self.generations), f"token {token_id} holds removed generation {generation_id}"
+                # the contract checks whole prerequisite chains at once, relying on holders keeping them
+                assert self.is_generation_unlocked(token_id, self.generations[generation_id].prerequisite_generation), (
+                    f"token {token_id} holds generation {generation_id} without its prerequisite"
+                )
+                unlocks[generation_id] += 1
+        for token_id in self.owners:
+            active_id = self.active.get(token_id, 0)
+            assert active_id < len(self.generations), f"token {token_id} is active on removed generation {active_id}"
+            assert self.is_generation_unlocked(token_id, active_id), f"token {token_id} is active on a locked generation"
+            activations[active_id] += 1
+        for token_id in self.active:
+            assert token_id in self.owners, f"burned or unminted token {token_id} has an active generation"
+
+        for generation_id, gen in enumerate(self.generations):
+            assert gen.unlocks == unlocks[generation_id], (
+                f"generation {generation_id} counts {gen.unlocks} unlocks, tokens hold {unlocks[generation_id]}"
+            )
+            assert gen.activations == activations[generation_id], (
+                f"generation {generation_id} counts {gen.activations} activations, "
+                f"{activations[generation_id]} tokens are active"
+            )
@@ -0,0 +1,175 @@
+"""Relayer for EIP-712 signed activations of `MimeticERC721Signatures`.
+
+    brownie run scripts/relayer.py
+
+Token owners sign `ActivateGeneration(tokenId, generationId, nonce, deadline)` off-chain with `sign_activation` and hand
+the result to an `ActivationRelayer`, which submits them with `activateGenerationsWithSigs` and pays for the gas.
+Every pending activation is simulated before it is packed, so an invalid one is dropped instead of reverting the
+whole batch, and a batch is closed once the summed gas estimates of its activations reach `max_batch_gas`. Nonces are
+per token: a batch carries at most one activation per token, later ones wait for the following batches.
+
+`main` deploys a `MockNftSignatures` on the development network, signs activations for a few holders and relays them,
+reading its settings from the environment since `brownie run` does not forward arguments:
+
+    RELAYER_ACTIVATIONS   number of signed activations (default: 200)
+    RELAYER_HOLDERS       number of token holders signing them (default: 10)
+    RELAYER_BATCH_GAS     gas bound of a batch (default: 8000000)
+"""
+import os
+from collections import namedtuple
+
+from brownie.exceptions import VirtualMachineError
+from eth_keys import keys
+from hexbytes import HexBytes
+from web3 import Web3
+
+try:
+    from eth_abi import encode
+except ImportError:  # eth-abi < 4
+    from eth_abi import encode_abi as encode
+
+
+TX_BASE_GAS = 21000
+
+DOMAIN_TYPEHASH = Web3.keccak(text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+ACTIVATE_GENERATION_TYPEHASH = Web3.keccak(
+    text="ActivateGeneration(uint256 tokenId,uint256 generationId,uint256 nonce,uint256 deadline)"
+)
+
+
+class SignedActivation(namedtuple("SignedActivation", "token_id generation_id deadline v r s nonce")):
+    __slots__ = ()
+
+    def as_args(self):
+        # Same order as the `SignedActivation` struct of the contract, the nonce is not part of it.
+        return (self.token_id, self.generation_id, self.deadline, self.v, self.r, self.s)
+
+
+def domain_separator(name, version, chain_id, verifying_contract):
+    return Web3.keccak(encode(
+        ["bytes32", "bytes32", "bytes32", "uint256", "address"],
+        [DOMAIN_TYPEHASH, Web3.keccak(text=name), Web3.keccak(text=version), chain_id, verifying_contract],
+    ))
+
+
+def activation_digest(separator, token_id, generation_id, nonce, deadline):
+    struct_hash = Web3.keccak(encode(
+        ["bytes32", "uint256", "uint256", "uint256", "uint256"],
+        [ACTIVATE_GENERATION_TYPEHASH, token_id, generation_id, nonce, deadline],
+    ))
+    return Web3.keccak(b"\x19\x01" + bytes(HexBytes(separator)) + bytes(struct_hash))
+
+
+def sign_activation(private_key, separator, token_id, generation_id, nonce, deadline):
+    """Signs the activation with the key of the token owner. `separator` is the `DOMAIN_SEPARATOR` of the contract."""
+    digest = activation_digest(separator, token_id, generation_id, nonce, deadline)
+    signature = keys.PrivateKey(bytes(HexBytes(private_key))).sign_msg_hash(bytes(digest))
+    return SignedActivation(
+        token_id,
+        generation_id,
+        deadline,
+        signature.v + 27,
+        signature.r.to_bytes(32, "big"),
+        signature.s.to_bytes(32, "big"),
+        nonce,
+    )
+
+
+class ActivationRelayer:
+    def __init__(self, contract, sender, max_batch_gas=8_000_000):
+        self.contract = contract
+        self.sender = sender
+        self.max_batch_gas = max_batch_gas
+        self.pending = []
+        # (activation, revert reason) of the activations which were dropped
+        self.rejected = []
+
+    def add(self, activation):
+        self.pending.append(activation)
+
+    def next_batch(self):
+        """Takes the activations for the next transaction out of `pending`, dropping the ones which would revert."""
+        batch, deferred, batched_tokens, nonces = [], [], set(), {}
+        gas = TX_BASE_GAS
+        pending = sorted(self.pending, key=lambda activation: (activation.token_id, activation.nonce))
+
+        for index, activation in enumerate(pending):
+            token_id = activation.token_id
+            if token_id not in nonces:
+                nonces[token_id] = self.contract.activationNonce(token_id)
+            if activation.nonce < nonces[token_id]:
+                self.rejected.append((activation, "Nonce already used"))
+                continue
+            if activation.nonce > nonces[token_id] or token_id in batched_tokens:
+                deferred.append(activation)
+                continue
+
+            tx = {"from": self.sender}
+            try:
+                self.contract.activateGenerationWithSig.call(*activation.as_args(), tx)
+            except VirtualMachineError as exc:
+                self.rejected.append((activation, exc.revert_msg))
+                continue
+            cost = self.contract.activateGenerationWithSig.estimate_gas(*activation.as_args(), tx) - TX_BASE_GAS
+            if batch and gas + cost > self.max_batch_gas:
+                deferred += pending[index:]
+                break
+
+            batch.append(activation)
+            batched_tokens.add(token_id)
+            gas += cost
+
+        self.pending = deferred
+        return batch
+
+    def submit(self, batch):
+        return self.contract.activateGenerationsWithSigs([activation.as_args() for activation in batch], {"from": self.sender})
+
+    def flush(self):
+        """Submits batches until nothing pending can be included any more. Returns the transactions."""
+        transactions = []
+        while self.pending:
+            batch = self.next_batch()
+            if not batch:
+                break
+            transactions.append(self.submit(batch))
+        return transactions
+
+
+def main():
+    from brownie import MockNftSignatures, accounts, chain
+    from scripts.utilities import get_deployer_account
+
+    activation_count = int(os.environ.get("RELAYER_ACTIVATIONS", "200"))
+    holder_count = int(os.environ.get("RELAYER_HOLDERS", "10"))
+    max_batch_gas = int(os.environ.get("RELAYER_BATCH_GAS", "8000000"))
+
+    deployer = get_deployer_account()
+    mimetic = MockNftSignatures.deploy({"from": deployer})
+    mimetic.enableGeneration(0, {"from": deployer})
+    mimetic.addGeneration("Auto", "", 0, 0, True, {"from": deployer})
+    mimetic.enableGeneration(1, {"from": deployer})
+
+    # Holders need keys to sign, so use fresh local accounts rather than the unlocked ones of the node.
+    tokens_per_holder = -(-activation_count // holder_count)
+    holders = []
+    for index in range(holder_count):
+        holder = accounts.add()
+        deployer.transfer(holder, "1 ether")
+        mimetic.mintBatch(index * tokens_per_holder + 1, tokens_per_holder, {"from": holder})
+        holders.append(holder)
+
+    separator = mimetic.DOMAIN_SEPARATOR()
+    deadline = chain.time() + 3600
+    relayer = ActivationRelayer(mimetic, deployer, max_batch_gas)
+    for token_id in range(1, activation_count + 1):
+        holder = holders[(token_id - 1) // tokens_per_holder]
+        relayer.add(sign_activation(holder.private_key, separator, token_id, 1, 0, deadline))
+
+    transactions = relayer.flush()
+    relayed_gas = sum(tx.gas_used for tx in transactions)
+    # switching the last token back, as its holder would without a relayer
+    last_holder = holders[(activation_count - 1) // tokens_per_holder]
+    single_gas = mimetic.activateGeneration.estimate_gas(activation_count, 0, {"from": last_holder})
+    print(f"{activation_count} activations relayed in {len(transactions)} transactions, {len(relayer.rejected)} rejected")
+    print(f"gas per activation: {relayed_gas / activation_count:,.0f} relayed, {single_gas:,} as a user transaction")
@@ -0,0 +1,298 @@
+"""Cached `tokenURI` resolver for MimeticERC721 metadata APIs.
+
+    brownie run scripts/resolver.py
+
+Keeps "token => URI" in a size-bounded LRU, filled in batches through the `tokenURIs` and `tokenToGenerationIds`
+views. `poll` reads the logs emitted since the previous poll and evicts only the entries they affect:
+
+    GenerationActivated         the token switched faces
+    GenerationBaseUriChanged    every cached token whose active generation is the one revealed or moved
+    Transfer to 0x0             the token was burned
+
+Generations may only be removed while no token uses them, so removal needs no eviction. Changes to the unrevealed URI
+(`_baseURI`) are collection specific and emit nothing, call `clear` after them. When the last polled block is reorged
+out the whole cache is cleared, since the orphaned logs can no longer be told apart.
+
+`main` deploys a `MockNft` on the development network and drives lookups through the resolver, reading its settings
+from the environment since `brownie run` does not forward arguments:
+
+    RESOLVER_LOOKUPS      number of lookups (default: 10000)
+    RESOLVER_TOKENS       number of minted tokens (default: 1000)
+    RESOLVER_CACHE_SIZE   maximum cached entries (default: 500)
+    RESOLVER_ACTIVATIONS  activations applied, and polled, during the run (default: 100)
+"""
+import os
+import random
+import time
+from collections import OrderedDict, defaultdict
+
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+
+EVENT_SIGNATURES = {
+    "GenerationActivated": "GenerationActivated(uint256,uint256)",
+    "GenerationBaseUriChanged": "GenerationBaseUriChanged(uint256)",
+    "Transfer": "Transfer(address,address,uint256)",
+}
+EVENT_TOPICS = {bytes(Web3.keccak(text=signature)): name for name, signature in EVENT_SIGNATURES.items()}
+
+# Only the views used by the resolver.
+RESOLVER_ABI = [
+    {
+        "name": "tokenURI",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "_tokenId", "type": "uint256"}],
+        "outputs": [{"name": "", "type": "string"}],
+    },
+    {
+        "name": "tokenURIs",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "_tokenIds", "type": "uint256[]"}],
+        "outputs": [{"name": "uris", "type": "string[]"}],
+    },
+    {
+        "name": "tokenToGenerationIds",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "_tokenIds", "type": "uint256[]"}],
+        "outputs": [{"name": "generationIds", "type": "uint256[]"}],
+    },
+]
+
+
+def _topic_int(topic):
+    return int.from_bytes(bytes(topic), "big")
+
+
+def _block_hash(value):
+    return bytes(HexBytes(value)).hex()
+
+
+class ResolverStats:
+    __slots__ = ("hits", "misses", "evictions", "invalidations", "fetches", "fetched_tokens", "lookup_seconds", "fetch_seconds")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        stats = {name: getattr(self, name) for name in self.__slots__}
+        lookups = self.hits + self.misses
+        stats["hit_ratio"] = self.hits / lookups if lookups else 0.0
+        stats["mean_lookup_ms"] = self.lookup_seconds * 1000 / lookups if lookups else 0.0
+        stats["mean_fetch_ms"] = self.fetch_seconds * 1000 / self.fetches if self.fetches else 0.0
+        return stats
+
+
+class TokenUriResolver:
+    def __init__(self, web3, address, max_entries=10000, batch_size=200, max_block_range=2000):
+        self.web3 = web3
+        self.address = to_checksum_address(address)
+        self.contract = web3.eth.contract(address=self.address, abi=RESOLVER_ABI)
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.max_block_range = max_block_range
+        self.stats = ResolverStats()
+
+        # token id => (uri, active generation), least recently used first
+        self._entries = OrderedDict()
+        self._tokens_by_generation = defaultdict(set)
+        # Logs up to the current head are already reflected by anything fetched from now on.
+        self.checkpoint = web3.eth.block_number
+        self._checkpoint_hash = self._hash_of(self.checkpoint)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, token_id):
+        return token_id in self._entries
+
+    # Lookups
+
+    def resolve(self, token_id):
+        """The URI of `token_id`, from the cache when possible. Raises `ContractLogicError` for nonexistent tokens."""
+        return self.resolve_many([token_id])[0]
+
+    def resolve_many(self, token_ids):
+        """The URIs of `token_ids`, fetching the missing ones in batches. Stats count every distinct token id once."""
+        start = time.perf_counter()
+        unique_ids = dict.fromkeys(token_ids)
+        uris, missing = {}, []
+        for token_id in unique_ids:
+            entry = self._entries.get(token_id)
+            if entry is None:
+                missing.append(token_id)
+            else:
+                self._entries.move_to_end(token_id)
+                uris[token_id] = entry[0]
+        self.stats.misses += len(missing)
+        self.stats.hits += len(unique_ids) - len(missing)
+
+        uris.update(self._fetch(missing, strict=True))
+        self.stats.lookup_seconds += time.perf_counter() - start
+        return [uris[token_id] for token_id in token_ids]
+
+    def warm(self, token_ids):
+        """Fetches the URIs of `token_ids` which are not cached yet, skipping nonexistent tokens. Returns the number fetched."""
+        return len(self._fetch([token_id for token_id in dict.fromkeys(token_ids) if token_id not in self._entries]))
+
+    def clear(self):
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tokens_by_generation.clear()
+
+    def _fetch(self, token_ids, strict=False):
+        fetched = {}
+        if not token_ids:
+            return fetched
+        # Every call reads the same block, so an activation mined in between cannot pair a URI with another generation.
+        block_number = self.web3.eth.block_number
+        for i in range(0, len(token_ids), self.batch_size):
+            batch = token_ids[i:i + self.batch_size]
+            start = time.perf_counter()
+            try:
+                uris = self.contract.functions.tokenURIs(batch).call(block_identifier=block_number)
+                generation_ids = self.contract.functions.tokenToGenerationIds(batch).call(block_identifier=block_number)
+                pairs = zip(batch, uris, generation_ids)
+            except ContractLogicError:
+                # A nonexistent token reverts the whole batch, resolve the tokens one at a time instead.
+                pairs = self._fetch_each(batch, strict, block_number)
+            self.stats.fetches += 1
+            self.stats.fetch_seconds += time.perf_counter() - start
+
+            for token_id, uri, generation_id in pairs:
+                self._store(token_id, uri, generation_id)
+                fetched[token_id] = uri
+        self.stats.fetched_tokens += len(fetched)
+        return fetched
+
+    def _fetch_each(self, token_ids, strict, block_number):
+        pairs = []
+        for token_id in token_ids:
+            try:
+                uri = self.contract.functions.tokenURI(token_id).call(block_identifier=block_number)
+            except ContractLogicError:
+                if strict:
+                    raise
+                continue
+            generation_ids = self.contract.functions.tokenToGenerationIds([token_id])
+            pairs.append((token_id, uri, generation_ids.call(block_identifier=block_number)[0]))
+        return pairs
+
+    def _store(self, token_id, uri, generation_id):
+        self._entries[token_id] = (uri, generation_id)
+        self._tokens_by_generation[generation_id].add(token_id)
+        while len(self._entries) > self.max_entries:
+            evicted_id, (_, evicted_generation) = self._entries.popitem(last=False)
+            self._tokens_by_generation[evicted_generation].discard(evicted_id)
+            self.stats.evictions += 1
+
+    def _evict(self, token_id):
+        entry = self._entries.pop(token_id, None)
+        if entry is not None:
+            self._tokens_by_generation[entry[1]].discard(token_id)
+            self.stats.invalidations += 1
+
+    # Invalidation
+
+    def poll(self):
+        """Evicts the entries affected by the logs since the previous poll. Returns the number of entries evicted."""
+        invalidations = self.stats.invalidations
+        head = self.web3.eth.block_number
+        if self.checkpoint > head or self._hash_of(self.checkpoint) != self._checkpoint_hash:
+            # Nothing is left to invalidate after clearing, so the logs up to the head can be skipped.
+            self.clear()
+            self.checkpoint = head
+
+        while self.checkpoint < head:
+            from_block = self.checkpoint + 1
+            to_block = min(head, from_block + self.max_block_range - 1)
+            for log in self._get_logs(from_block, to_block):
+                self._apply_log(log)
+            self.checkpoint = to_block
+        self._checkpoint_hash = self._hash_of(self.checkpoint)
+        return self.stats.invalidations - invalidations
+
+    def _hash_of(self, block_number):
+        return _block_hash(self.web3.eth.get_block(block_number)["hash"]) if block_number >= 0 else None
+
+    def _get_logs(self, from_block, to_block):
+        return self.web3.eth.get_logs({
+            "address": self.address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [["0x" + topic.hex() for topic in EVENT_TOPICS]],
+        })
+
+    def _apply_log(self, log):
+        topics = log["topics"]
+        event = EVENT_TOPICS.get(bytes(topics[0]))
+
+        if event == "GenerationActivated":
+            self._evict(_topic_int(topics[2]))
+        elif event == "GenerationBaseUriChanged":
+            for token_id in list(self._tokens_by_generation.pop(_topic_int(topics[1]), ())):
+                self._evict(token_id)
+        elif event == "Transfer" and _topic_int(topics[2]) == 0:
+            # Transfers between holders keep the URI, burns remove the token.
+            self._evict(_topic_int(topics[3]))
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    from brownie import MockNft, web3
+    from scripts.utilities import get_deployer_account, get_user_account
+
+    lookups = int(os.environ.get("RESOLVER_LOOKUPS", "10000"))
+    token_count = int(os.environ.get("RESOLVER_TOKENS", "1000"))
+    cache_size = int(os.environ.get("RESOLVER_CACHE_SIZE", "500"))
+    activations = int(os.environ.get("RESOLVER_ACTIVATIONS", "100"))
+
+    deployer, user = get_deployer_account(), get_user_account()
+    mimetic = MockNft.deploy({"from": deployer})
+    mimetic.enableGeneration(0, {"from": deployer})
+    mimetic.addGeneration("Revealed", "ipfs://revealed/", 0, 0, True, {"from": deployer})
+    mimetic.enableGeneration(1, {"from": deployer})
+    for start in range(1, token_count + 1, 100):
+        mimetic.mintBatch(start, min(100, token_count + 1 - start), {"from": user})
+
+    # Skewed towards a few popular tokens, like the traffic of a marketplace.
+    rng = random.Random(0)
+    token_ids = [min(token_count, int(rng.paretovariate(1.2))) for _ in range(lookups)]
+    activate_every = lookups // activations if activations else lookups + 1
+
+    resolver = TokenUriResolver(web3, mimetic.address, max_entries=cache_size)
+    resolver.warm(range(1, min(cache_size, token_count) + 1))
+    latencies = []
+    for i, token_id in enumerate(token_ids, 1):
+        start = time.perf_counter()
+        resolver.resolve(token_id)
+        latencies.append(time.perf_counter() - start)
+        if i % activate_every == 0:
+            activated_id = token_ids[i - 1]
+            generation_id = 1 - mimetic.tokenToGenerationId(activated_id)
+            mimetic.activateGeneration(activated_id, generation_id, {"from": user})
+            resolver.poll()
+
+    uncached = []
+    for token_id in token_ids[:min(lookups, 1000)]:
+        start = time.perf_counter()
+        mimetic.tokenURI(token_id)
+        uncached.append(time.perf_counter() - start)
+
+    for name, value in resolver.stats.as_dict().items():
+        print(f"{name:<16} {value:,.3f}" if isinstance(value, float) else f"{name:<16} {value:,}")
+    for label, samples in (("resolver", latencies), ("uncached tokenURI", uncached)):
+        print(
+            f"{label:<18} p50 {_percentile(samples, 0.5) * 1000:.3f} ms"
+            f"  p99 {_percentile(samples, 0.99) * 1000:.3f} ms  over {len(samples):,} lookups"
+        )
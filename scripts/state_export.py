@@ -0,0 +1,324 @@
+"""Columnar snapshot of the per-token state of a MimeticERC721 collection.
+
+    brownie run scripts/state_export.py
+
+Writes one `.npy` file per column, all indexed by the position of the token in `tokenByIndex` order:
+
+    token_ids.npy           uint64 (tokens)
+    owners.npy              uint8 (tokens, 20), the raw owner addresses
+    active_generations.npy  uint16 (tokens), `tokenToGenerationId`
+    unlock_masks.npy        little-endian uint64 (tokens, 4 * words), the `unlockedGenerationsWord` words of the token,
+                            so that bit `g` of a row, counted from its first byte, is generation `g`
+    generation_unlocks.npy  uint64 (generations), tokens holding each generation, counted from unlock_masks
+
+and `metadata.json` with the block the snapshot was read at and the result of the cross-check. The files are created
+with `numpy.lib.format.open_memmap` and filled chunk by chunk, so the collection never has to fit in memory, and
+`load_snapshot` maps them back read-only.
+
+Every read is an `eth_call` pinned to one block. Enumeration, `ownerOf` and the unlock words go out as JSON-RPC batches
+over HTTP (one request per `batch_size` calls), the active generations through the `tokenToGenerationIds` view, one
+call per chunk. Providers without HTTP, such as IPC or the in-process eth-tester chain, get the calls one by one.
+Counting the set bits of every column of `unlock_masks` gives the number of tokens holding each generation, which must
+equal the `unlocks` counter of the generation: mints count generation 0, unlocks and grants count theirs, and burns
+take a token's generations back off.
+
+`main` deploys a `MockNft` on the development network, unlocks a few generations and exports it, or exports the
+collection at `EXPORT_ADDRESS` on the active network. Settings are read from the environment since `brownie run` does
+not forward arguments:
+
+    EXPORT_ADDRESS     collection to export (default: deploy a demo collection)
+    EXPORT_OUTPUT      output directory (default: reports/state_export)
+    EXPORT_TOKENS      tokens minted by the demo collection (default: 2000)
+    EXPORT_CHUNK_SIZE  tokens read and written per chunk (default: 2000)
+    EXPORT_BATCH_SIZE  calls per JSON-RPC batch (default: 500)
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import requests
+from eth_utils import to_checksum_address
+from web3 import Web3
+
+try:
+    from eth_abi import encode
+except ImportError:  # eth-abi < 4
+    from eth_abi import encode_abi as encode
+
+
+WORD_BITS = 256
+LIMBS_PER_WORD = WORD_BITS // 64
+ADDRESS_BYTES = 20
+# rows unpacked to bits at once when counting
+COUNT_ROWS = 1 << 14
+
+SELECTORS = {
+    name: bytes(Web3.keccak(text=signature)[:4])
+    for name, signature in {
+        "totalSupply": "totalSupply()",
+        "tokenByIndex": "tokenByIndex(uint256)",
+        "ownerOf": "ownerOf(uint256)",
+        "unlockedGenerationsWord": "unlockedGenerationsWord(uint256,uint256)",
+    }.items()
+}
+
+# Only the views used by the exporter.
+EXPORT_ABI = [
+    {
+        "name": "tokenToGenerationIds",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "_tokenIds", "type": "uint256[]"}],
+        "outputs": [{"name": "generationIds", "type": "uint256[]"}],
+    },
+    {
+        "name": "getGenerationCount",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "", "type": "uint256"}],
+    },
+    {
+        "name": "getGenerations",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "_from", "type": "uint256"}, {"name": "_to", "type": "uint256"}],
+        "outputs": [{
+            "name": "infos",
+            "type": "tuple[]",
+            "components": [
+                {"name": "price", "type": "uint256"},
+                {"name": "prerequisiteGeneration", "type": "uint256"},
+                {"name": "unlocks", "type": "uint256"},
+                {"name": "activations", "type": "uint256"},
+                {"name": "name", "type": "string"},
+                {"name": "baseUri", "type": "string"},
+                {"name": "enabled", "type": "bool"},
+                {"name": "available", "type": "bool"},
+                {"name": "autoUnlock", "type": "bool"},
+            ],
+        }],
+    },
+]
+
+
+class ExportError(Exception):
+    pass
+
+
+def _calldata(name, *args):
+    return "0x" + (SELECTORS[name] + encode(["uint256"] * len(args), list(args))).hex()
+
+
+def _word(result):
+    return int.from_bytes(bytes.fromhex(result[2:]), "big")
+
+
+def words_to_limbs(words):
+    """uint256 words of one row, word 0 first, as little-endian uint64 limbs."""
+    return np.frombuffer(b"".join(word.to_bytes(32, "little") for word in words), dtype="<u8")
+
+
+def generation_unlock_counts(masks, generation_count, rows=COUNT_ROWS):
+    """Number of rows of `masks` with each of the first `generation_count` bits set, `rows` rows at a time."""
+    counts = np.zeros(masks.shape[1] * 64, dtype=np.uint64)
+    for start in range(0, masks.shape[0], rows):
+        bits = np.unpackbits(np.ascontiguousarray(masks[start:start + rows]).view(np.uint8), axis=1, bitorder="little")
+        counts += bits.sum(axis=0, dtype=np.uint64)
+    return counts[:generation_count]
+
+
+def unlocked_generation_counts(masks):
+    """Number of unlocked generations of every row of `masks`."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks).sum(axis=1, dtype=np.uint64)
+    # NumPy < 2 has no popcount ufunc
+    return np.unpackbits(np.ascontiguousarray(masks).view(np.uint8), axis=1).sum(axis=1, dtype=np.uint64)
+
+
+def load_snapshot(output_dir, mmap_mode="r"):
+    """The columns of an export as memory-mapped arrays, and its metadata under "metadata"."""
+    output_dir = Path(output_dir)
+    snapshot = {path.stem: np.load(path, mmap_mode=mmap_mode) for path in sorted(output_dir.glob("*.npy"))}
+    snapshot["metadata"] = json.loads((output_dir / "metadata.json").read_text())
+    return snapshot
+
+
+class StateExporter:
+    def __init__(self, web3, address, chunk_size=2000, batch_size=500, timeout=60):
+        self.web3 = web3
+        self.address = to_checksum_address(address)
+        self.contract = web3.eth.contract(address=self.address, abi=EXPORT_ABI)
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.calls = 0
+        self.requests = 0
+        endpoint = getattr(web3.provider, "endpoint_uri", None)
+        self._endpoint = str(endpoint) if endpoint and str(endpoint).startswith("http") else None
+        self._session = requests.Session() if self._endpoint else None
+
+    def call_many(self, calls, block_number):
+        """Results of `calls`, a list of (method name, args), as 0x-prefixed return data."""
+        transactions = [{"to": self.address, "data": _calldata(name, *args)} for name, args in calls]
+        self.calls += len(transactions)
+        if self._session is None:
+            self.requests += len(transactions)
+            return [
+                "0x" + bytes(self.web3.eth.call(transaction, block_identifier=block_number)).hex()
+                for transaction in transactions
+            ]
+
+        params = [[transaction, hex(block_number)] for transaction in transactions]
+        results = []
+        for start in range(0, len(params), self.batch_size):
+            batch = [
+                {"jsonrpc": "2.0", "id": index, "method": "eth_call", "params": call}
+                for index, call in enumerate(params[start:start + self.batch_size])
+            ]
+            response = self._session.post(self._endpoint, json=batch, timeout=self.timeout)
+            response.raise_for_status()
+            self.requests += 1
+            items = response.json()
+            if not isinstance(items, list):
+                raise ExportError(f"The node does not support JSON-RPC batches: {items.get('error', items)}")
+            # responses of a batch may come back in any order
+            by_id = {item.get("id"): item for item in items}
+            results += [self._result(by_id.get(index, {}), batch[index]["params"]) for index in range(len(batch))]
+        return results
+
+    @staticmethod
+    def _result(response, call):
+        if "result" not in response:
+            raise ExportError(f"eth_call {call[0]['data'][:10]} failed: {response.get('error', 'no response')}")
+        return response["result"]
+
+    def export(self, output_dir, block_number=None):
+        """Writes the snapshot of the collection at `block_number` (default: the latest block) and returns its
+        metadata. Raises `ExportError` when a token id does not fit the uint64 column or a call fails."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        if block_number is None:
+            block_number = self.web3.eth.block_number
+        start_time = time.perf_counter()
+
+        total_supply = _word(self.call_many([("totalSupply", ())], block_number)[0])
+        generation_count = self.contract.functions.getGenerationCount().call(block_identifier=block_number)
+        word_count = max(1, -(-generation_count // WORD_BITS))
+
+        columns = {
+            "token_ids": ((total_supply,), np.uint64),
+            "owners": ((total_supply, ADDRESS_BYTES), np.uint8),
+            "active_generations": ((total_supply,), np.uint16),
+            "unlock_masks": ((total_supply, LIMBS_PER_WORD * word_count), np.dtype("<u8")),
+        }
+        arrays = {
+            name: np.lib.format.open_memmap(output_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+            for name, (shape, dtype) in columns.items()
+        }
+        for start in range(0, total_supply, self.chunk_size):
+            end = min(start + self.chunk_size, total_supply)
+            self._export_chunk(arrays, start, end, word_count, block_number)
+        for array in arrays.values():
+            array.flush()
+
+        generation_unlocks = generation_unlock_counts(arrays["unlock_masks"], generation_count)
+        np.save(output_dir / "generation_unlocks.npy", generation_unlocks)
+        counters = self.generation_counters(generation_count, block_number)
+        mismatches = [
+            {"generationId": generation_id, "unlocks": counters[generation_id], "holders": int(holders)}
+            for generation_id, holders in enumerate(generation_unlocks)
+            if counters[generation_id] != int(holders)
+        ]
+
+        metadata = {
+            "address": self.address,
+            "chainId": self.web3.eth.chain_id,
+            "blockNumber": block_number,
+            "totalSupply": total_supply,
+            "generationCount": generation_count,
+            "unlockWords": word_count,
+            "unlockedGenerations": int(unlocked_generation_counts(arrays["unlock_masks"]).sum()),
+            "unlockMismatches": mismatches,
+            "calls": self.calls,
+            "requests": self.requests,
+            "seconds": round(time.perf_counter() - start_time, 3),
+        }
+        (output_dir / "metadata.json").write_text(json.dumps(metadata, indent=2) + "\n")
+        return metadata
+
+    def _export_chunk(self, arrays, start, end, word_count, block_number):
+        token_ids = [_word(result) for result in self.call_many(
+            [("tokenByIndex", (index,)) for index in range(start, end)], block_number
+        )]
+        if any(token_id >= 1 << 64 for token_id in token_ids):
+            raise ExportError("Token ids above 2**64 - 1 do not fit the uint64 token_ids column")
+
+        calls = [("ownerOf", (token_id,)) for token_id in token_ids]
+        calls += [
+            ("unlockedGenerationsWord", (token_id, word_index))
+            for token_id in token_ids
+            for word_index in range(word_count)
+        ]
+        results = self.call_many(calls, block_number)
+        owners, words = results[:len(token_ids)], [_word(result) for result in results[len(token_ids):]]
+
+        arrays["token_ids"][start:end] = token_ids
+        arrays["owners"][start:end] = np.frombuffer(
+            b"".join(bytes.fromhex(owner[-2 * ADDRESS_BYTES:]) for owner in owners), dtype=np.uint8
+        ).reshape(-1, ADDRESS_BYTES)
+        arrays["active_generations"][start:end] = self.contract.functions.tokenToGenerationIds(token_ids).call(
+            block_identifier=block_number
+        )
+        arrays["unlock_masks"][start:end] = words_to_limbs(words).reshape(end - start, -1)
+
+    def generation_counters(self, generation_count, block_number, page=256):
+        """The `unlocks` counter of every generation."""
+        unlocks = []
+        for start in range(0, generation_count, page):
+            infos = self.contract.functions.getGenerations(start, start + page).call(block_identifier=block_number)
+            unlocks += [info[2] for info in infos]
+        return unlocks
+
+
+def main():
+    from brownie import MockNft, web3
+    from scripts.utilities import get_deployer_account, get_user_account
+
+    address = os.environ.get("EXPORT_ADDRESS")
+    output_dir = os.environ.get("EXPORT_OUTPUT", "reports/state_export")
+    token_count = int(os.environ.get("EXPORT_TOKENS", "2000"))
+    chunk_size = int(os.environ.get("EXPORT_CHUNK_SIZE", "2000"))
+    batch_size = int(os.environ.get("EXPORT_BATCH_SIZE", "500"))
+
+    if address is None:
+        deployer, user = get_deployer_account(), get_user_account()
+        mimetic = MockNft.deploy({"from": deployer})
+        mimetic.enableGeneration(0, {"from": deployer})
+        mimetic.addGeneration("Unlockable", "", 0, 0, False, {"from": deployer})
+        mimetic.enableGeneration(1, {"from": deployer})
+        mimetic.setGenerationAvailability(1, True, {"from": deployer})
+        for start in range(1, token_count + 1, 100):
+            mimetic.mintBatch(start, min(100, token_count + 1 - start), {"from": user})
+        unlocked = list(range(1, token_count + 1, 3))
+        for start in range(0, len(unlocked), 100):
+            token_ids = unlocked[start:start + 100]
+            mimetic.unlockGenerations(token_ids, [1] * len(token_ids), {"from": user})
+        mimetic.burn(2, {"from": user})
+        address = mimetic.address
+
+    exporter = StateExporter(web3, address, chunk_size=chunk_size, batch_size=batch_size)
+    metadata = exporter.export(output_dir)
+    print(
+        f"{metadata['totalSupply']:,} tokens at block {metadata['blockNumber']} written to {output_dir} "
+        f"in {metadata['seconds']:.2f}s: {metadata['calls']:,} calls in {metadata['requests']:,} requests"
+    )
+    for mismatch in metadata["unlockMismatches"]:
+        print(
+            f"  generation {mismatch['generationId']}: unlocks counter {mismatch['unlocks']}, "
+            f"held by {mismatch['holders']} tokens"
+        )
+    if metadata["unlockMismatches"]:
+        raise SystemExit(1)
@@ -0,0 +1,246 @@
+"""Storage access profiles of MimeticERC721 transactions.
+
+    brownie run scripts/storage_profile.py
+
+Replays the trace of a transaction (`debug_traceTransaction`, expanded by brownie with the active function of every
+step) and attributes gas, SLOAD and SSTORE counts and memory gas to the functions and modifiers that ran them. Modifier
+code is inlined by the compiler, so its steps are recognised by their source offsets and shown below the function they
+guard. A storage access is a first touch when its slot was not accessed before in the transaction, which berlin and
+later charge as cold (EIP-2929) while istanbul, the hardfork of the development network, charges every access alike.
+An SLOAD is repeated when the slot was loaded before, like the `_generations[_generationId]` reads of a
+`whenGenerationDisabled` modifier followed by the function body, or of `isGenerationUnlocked` and the counter updates
+after `_unlockGeneration`.
+
+The report is a tree with inclusive gas and a bar per frame, `folded()` gives the same data in the folded stack
+format of flamegraph.pl and speedscope. `main` deploys a `MockNft` on the development network and profiles a few
+operations, reading its settings from the environment since `brownie run` does not forward arguments:
+
+    PROFILE_OPERATIONS   comma separated subset of OPERATIONS (default: all)
+    PROFILE_FOLDED       directory to write <operation>.folded files to (default: none)
+"""
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+COPY_OPS = {"CALLDATACOPY", "CODECOPY", "EXTCODECOPY", "RETURNDATACOPY", "MCOPY"}
+MEMORY_OPS = COPY_OPS | {"MLOAD", "MSTORE", "MSTORE8"}
+COUNTERS = ("gas", "sloads", "first_touch_sloads", "repeated_sloads", "sstores", "first_touch_sstores", "memory_gas")
+BAR_WIDTH = 24
+
+OPERATIONS = ("enableGeneration", "mintBatch", "unlockGeneration", "activateGeneration", "burn")
+
+
+class Frame:
+    """Counters of the steps run directly in a function or modifier, the steps of its callees are in `children`."""
+
+    __slots__ = ("name", "children") + COUNTERS
+
+    def __init__(self, name):
+        self.name = name
+        self.children = {}
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+
+    def child(self, name):
+        if name not in self.children:
+            self.children[name] = Frame(name)
+        return self.children[name]
+
+    def total(self, counter):
+        return getattr(self, counter) + sum(child.total(counter) for child in self.children.values())
+
+
+def modifier_spans(source):
+    """(start, end, "Contract.modifier") source offsets of the modifiers defined in a Solidity source."""
+    contracts = [(match.start(), match.group(1)) for match in re.finditer(r"\b(?:contract|library)\s+(\w+)", source)]
+    spans = []
+    for match in re.finditer(r"\bmodifier\s+(\w+)", source):
+        depth, end = 0, None
+        for index in range(source.index("{", match.end()), len(source)):
+            if source[index] == "{":
+                depth += 1
+            elif source[index] == "}":
+                depth -= 1
+                if depth == 0:
+                    end = index + 1
+                    break
+        contract = next((name for start, name in reversed(contracts) if start < match.start()), "")
+        spans.append((match.start(), end or len(source), f"{contract}.{match.group(1)}"))
+    return spans
+
+
+def _word(value):
+    if isinstance(value, str):
+        return int(value, 16)
+    return int.from_bytes(bytes(value), "big")
+
+
+class StorageProfile:
+    def __init__(self, trace, modifiers=None):
+        """`trace` is the list of steps of a brownie `TransactionReceipt.trace`. `modifiers` maps source file names to
+        their `modifier_spans`, it is filled from the files of the project when None."""
+        self.root = Frame("transaction")
+        self._modifiers = modifiers if modifiers is not None else {}
+        self._read_modifiers = modifiers is None
+        # (address, slot) => number of SLOADs and the frames that made them
+        self.slot_loads = Counter()
+        self.slot_readers = defaultdict(Counter)
+
+        accessed, loaded = set(), set()
+        # geth counts call depths from 1, ganache from 0
+        previous_depth = trace[0]["depth"] if trace else 0
+        prefixes, chains = {previous_depth: []}, {}
+        for index, step in enumerate(trace):
+            depth = step["depth"]
+            if depth > previous_depth:
+                prefixes[depth] = self._path(trace[index - 1], prefixes, chains)
+            previous_depth = depth
+            chain = chains.setdefault(depth, [])
+            del chain[step.get("jumpDepth", 0):]
+            chain.append(step.get("fn") or "<unknown>")
+
+            path = self._path(step, prefixes, chains)
+            frame = self.root
+            for name in path:
+                frame = frame.child(name)
+
+            op = step["op"]
+            # the gas of a call includes the gas forwarded to the callee, whose steps are counted on their own
+            if not (index + 1 < len(trace) and trace[index + 1]["depth"] > depth):
+                frame.gas += step["gasCost"]
+            if op in MEMORY_OPS:
+                frame.memory_gas += step["gasCost"]
+            elif op == "SLOAD":
+                key = (step.get("address"), _word(step["stack"][-1]))
+                frame.sloads += 1
+                frame.first_touch_sloads += key not in accessed
+                frame.repeated_sloads += key in loaded
+                accessed.add(key)
+                loaded.add(key)
+                self.slot_loads[key] += 1
+                self.slot_readers[key][" > ".join(path)] += 1
+            elif op == "SSTORE":
+                key = (step.get("address"), _word(step["stack"][-1]))
+                frame.sstores += 1
+                frame.first_touch_sstores += key not in accessed
+                accessed.add(key)
+
+    def _path(self, step, prefixes, chains):
+        depth = step["depth"]
+        path = prefixes.get(depth, []) + chains.get(depth, [])
+        modifier = self._modifier(step.get("source"))
+        if modifier:
+            path.append(modifier)
+        return path
+
+    def _modifier(self, source):
+        if not source:
+            return None
+        filename = source["filename"]
+        if filename not in self._modifiers:
+            self._modifiers[filename] = self._load_modifiers(filename) if self._read_modifiers else []
+        start = source["offset"][0]
+        return next((name for first, last, name in self._modifiers[filename] if first <= start < last), None)
+
+    @staticmethod
+    def _load_modifiers(filename):
+        path = Path(filename)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        try:
+            return modifier_spans(path.read_text())
+        except OSError:
+            return []
+
+    def repeated_loads(self):
+        """(address, slot, loads, {frame path: loads}) of the slots loaded more than once, most loaded first."""
+        return [
+            (address, slot, loads, dict(self.slot_readers[(address, slot)]))
+            for (address, slot), loads in self.slot_loads.most_common()
+            if loads > 1
+        ]
+
+    def report(self, min_gas=0):
+        total = max(self.root.total("gas"), 1)
+        lines = [
+            f"{'gas':>9} {'self':>8}  {'sload':>5} {'1st':>4} {'rep':>4}  "
+            f"{'sstore':>6} {'1st':>4}  {'memory':>6}  frame"
+        ]
+
+        def add(frame, level):
+            gas = frame.total("gas")
+            if gas < min_gas:
+                return
+            bar = "#" * max(1, round(BAR_WIDTH * gas / total))
+            lines.append(
+                f"{gas:>9,} {frame.gas:>8,}  {frame.total('sloads'):>5} {frame.total('first_touch_sloads'):>4} "
+                f"{frame.total('repeated_sloads'):>4}  {frame.total('sstores'):>6} "
+                f"{frame.total('first_touch_sstores'):>4}  {frame.total('memory_gas'):>6,}  "
+                f"{'  ' * level}{frame.name} {bar}"
+            )
+            for child in sorted(frame.children.values(), key=lambda child: -child.total("gas")):
+                add(child, level + 1)
+
+        add(self.root, 0)
+        return "\n".join(lines)
+
+    def folded(self, counter="gas"):
+        """One "frame;frame;frame value" line per frame with its own (exclusive) value of `counter`."""
+        lines = []
+
+        def add(frame, stack):
+            stack = stack + [frame.name]
+            if getattr(frame, counter):
+                lines.append(f"{';'.join(stack)} {getattr(frame, counter)}")
+            for child in frame.children.values():
+                add(child, stack)
+
+        for child in self.root.children.values():
+            add(child, [])
+        return "\n".join(lines)
+
+
+def profile_transaction(tx):
+    return StorageProfile(tx.trace)
+
+
+def main():
+    from brownie import MockNft
+    from scripts.utilities import get_deployer_account, get_user_account
+
+    operations = [name.strip() for name in os.environ.get("PROFILE_OPERATIONS", ",".join(OPERATIONS)).split(",")]
+    unknown = [name for name in operations if name not in OPERATIONS]
+    if unknown:
+        raise SystemExit(f"Unknown PROFILE_OPERATIONS {', '.join(unknown)}, expected any of {', '.join(OPERATIONS)}")
+    folded_dir = os.environ.get("PROFILE_FOLDED")
+
+    deployer, user = get_deployer_account(), get_user_account()
+    mimetic = MockNft.deploy({"from": deployer})
+    mimetic.enableGeneration(0, {"from": deployer})
+    mimetic.addGeneration("Unlockable", "ipfs://unlockable/", 42, 0, False, {"from": deployer})
+    mimetic.setGenerationAvailability(1, True, {"from": deployer})
+
+    transactions = {
+        "enableGeneration": mimetic.enableGeneration(1, {"from": deployer}),
+        "mintBatch": mimetic.mintBatch(1, 10, {"from": user}),
+    }
+    if "unlockGeneration" in operations or "activateGeneration" in operations:
+        transactions["unlockGeneration"] = mimetic.unlockGeneration(1, 1, {"from": user, "value": 42})
+        transactions["activateGeneration"] = mimetic.activateGeneration(1, 1, {"from": user})
+    transactions["burn"] = mimetic.burn(1, {"from": user})
+
+    for operation in operations:
+        profile = profile_transaction(transactions[operation])
+        print(f"\n{operation}: {transactions[operation].gas_used:,} gas used")
+        print(profile.report())
+        for address, slot, loads, readers in profile.repeated_loads():
+            readers = ", ".join(f"{path} ({count})" for path, count in readers.items())
+            print(f"  slot {slot:#x} loaded {loads} times: {readers}")
+        if folded_dir:
+            os.makedirs(folded_dir, exist_ok=True)
+            with open(os.path.join(folded_dir, f"{operation}.folded"), "w") as folded_file:
+                folded_file.write(profile.folded() + "\n")
@@ -1,19 +1,25 @@
+from functools import lru_cache
+
 from brownie import accounts, config, network
 
-LOCAL_ENVIRONMENTS = ["development", "ganache", "mainnet-fork"]
+LOCAL_ENVIRONMENTS = ["development", "ganache", "mainnet-fork", "eth-tester"]
+
+
+# Loading a keystore prompts for its password and adding a key derives the address, so do it once per network.
+@lru_cache(maxsize=None)
+def _load_account(network_name, wallet, id):
+    if id:
+        return accounts.load(id)
+    return accounts.add(config["wallets"][wallet])
 
 
 def get_deployer_account(id=None):
     if network.show_active() in LOCAL_ENVIRONMENTS:
         return accounts[0]
-    if id:
-        return accounts.load(id)
-    return accounts.add(config["wallets"]["deployer"])
+    return _load_account(network.show_active(), "deployer", id)
 
 
 def get_user_account(id=None):
     if network.show_active() in LOCAL_ENVIRONMENTS:
         return accounts[1]
-    if id:
-        return accounts.load(id)
-    return accounts.add(config["wallets"]["user"])
+    return _load_account(network.show_active(), "user", id)
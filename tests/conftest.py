@@ -0,0 +1,18 @@
+import pytest
+from brownie._config import CONFIG
+from scripts.eth_tester_backend import NETWORK_ID, register
+
+
+def pytest_configure(config):
+    # Brownie connects after collection, to --network or to `networks: default` in brownie-config.yaml. Other networks
+    # keep brownie's own configuration and connection.
+    selected = config.getoption("--network") or [CONFIG.settings["networks"]["default"]]
+    if selected[0] == NETWORK_ID:
+        register()
+
+
+@pytest.fixture
+def isolation(fn_isolation):
+    # Reverts the chain to the snapshot taken after the module scoped fixtures ran, once per test. Chain backed modules
+    # opt in with `pytestmark = pytest.mark.usefixtures("isolation")`, so pure tests never snapshot or revert.
+    pass
@@ -0,0 +1,136 @@
+import pytest
+from brownie import MockNft, web3
+from hexbytes import HexBytes
+from scripts.bulk import Job, Journal, Sent, TxPipeline, activate_jobs, mint_jobs, read_generations, seed_jobs
+from scripts.utilities import get_deployer_account
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def mimetic(module_isolation, deployer):
+    contract = MockNft.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    contract.addGeneration("Auto", "", 0, 0, True)
+    contract.enableGeneration(1)
+    yield contract
+
+
+def test_pipeline_sends_all_jobs(mimetic, deployer):
+    pipeline = TxPipeline(web3, deployer, window=4)
+
+    confirmed = pipeline.run(mint_jobs(mimetic, 1, 95, 10))
+
+    assert confirmed == 10
+    assert pipeline.failed == []
+    assert mimetic.totalSupply() == 95
+    assert mimetic.ownerOf(95) == deployer
+
+
+def test_pipeline_skips_journaled_jobs(mimetic, deployer, tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+    TxPipeline(web3, deployer, journal=Journal(journal_path)).run(mint_jobs(mimetic, 1, 20, 10))
+
+    # a second run with a longer range only sends the jobs which are not in the journal yet
+    pipeline = TxPipeline(web3, deployer, journal=Journal(journal_path))
+    pipeline.run(mint_jobs(mimetic, 1, 30, 10))
+
+    assert (pipeline.skipped, pipeline.confirmed) == (2, 1)
+    assert mimetic.totalSupply() == 30
+
+
+def test_jobs_resume_with_another_batch_size(mimetic, deployer, tmp_path):
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    TxPipeline(web3, deployer, journal=journal).run(mint_jobs(mimetic, 1, 20, 10, journal))
+
+    resumed = Journal(journal.path)
+    jobs = list(mint_jobs(mimetic, 1, 30, 7, resumed))
+    pipeline = TxPipeline(web3, deployer, journal=resumed)
+    pipeline.run(jobs)
+
+    assert [job.key for job in jobs] == [f"{mimetic.address}:mint:21-27", f"{mimetic.address}:mint:28-30"]
+    assert (pipeline.confirmed, pipeline.failed) == (2, [])
+    assert mimetic.totalSupply() == 30
+    assert f"{mimetic.address}:mint:30" in resumed
+
+
+def test_pipeline_reports_reverting_jobs_and_continues(mimetic, deployer):
+    jobs = [
+        Job("first", mimetic.address, mimetic.mint.encode_input(1)),
+        Job("duplicate", mimetic.address, mimetic.mint.encode_input(1)),
+        Job("second", mimetic.address, mimetic.mint.encode_input(2)),
+    ]
+    pipeline = TxPipeline(web3, deployer, window=1)
+
+    pipeline.run(jobs)
+
+    assert pipeline.confirmed == 2
+    assert [job.key for job, _, _ in pipeline.failed] == ["duplicate"]
+    assert "second" in pipeline.journal and "duplicate" not in pipeline.journal
+    assert mimetic.totalSupply() == 2
+
+
+def test_seed_and_activate_jobs(mimetic, deployer, tmp_path):
+    seed_file = tmp_path / "generations.yaml"
+    seed_file.write_text(
+        "generations:\n"
+        "  - name: Pixel\n"
+        "    baseUri: ipfs://pixel/\n"
+        "    price: 1 gwei\n"
+        "    available: true\n"
+        "    enabled: true\n"
+        "  - name: Hidden\n"
+    )
+    pipeline = TxPipeline(web3, deployer)
+
+    pipeline.run(seed_jobs(mimetic, read_generations(str(seed_file)), 1))
+    pipeline.run(mint_jobs(mimetic, 1, 5, 5))
+    pipeline.run(activate_jobs(mimetic, 1, 1, 5, 2))
+
+    assert mimetic.getGenerationCount() == 4
+    assert mimetic.generations(2)[:2] == (10**9, 0)
+    assert mimetic.generations(2)[6:8] == (True, True)
+    assert mimetic.generations(3)[6:8] == (False, False)
+    assert [mimetic.tokenToGenerationId(token_id) for token_id in range(1, 6)] == [1] * 5
+    assert pipeline.failed == []
+
+
+def test_pipeline_resends_dropped_transactions(mimetic, deployer):
+    # a transaction the node does not know, as after it dropped it from its pool
+    job = Job("dropped", mimetic.address, mimetic.mint.encode_input(1))
+    tx = {"from": deployer.address, "to": job.to, "data": job.data, "value": 0, "gas": 500_000}
+    tx["nonce"] = web3.eth.get_transaction_count(deployer.address)
+    in_flight = {HexBytes("0x" + "ab" * 32): Sent(job, tx, None, 0, 0)}
+    pipeline = TxPipeline(web3, deployer, receipt_timeout=0)
+
+    pipeline._expire(in_flight)
+
+    [(tx_hash, sent)] = in_flight.items()
+    assert sent.resends == 1
+    assert web3.eth.get_transaction_receipt(tx_hash)["status"] == 1
+    assert mimetic.ownerOf(1) == deployer
+
+
+def test_pipeline_reports_replaced_and_lost_transactions(mimetic, deployer):
+    nonce = web3.eth.get_transaction_count(deployer.address)
+    replaced = Job("replaced", mimetic.address, mimetic.mint.encode_input(1))
+    lost = Job("lost", mimetic.address, mimetic.mint.encode_input(2))
+    in_flight = {
+        HexBytes("0x" + "ab" * 32): Sent(replaced, {"from": deployer.address, "nonce": nonce - 1}, None, 0, 0),
+        HexBytes("0x" + "cd" * 32): Sent(lost, {"from": deployer.address, "nonce": nonce}, None, 0, 1),
+    }
+    pipeline = TxPipeline(web3, deployer, receipt_timeout=0, max_resends=1)
+
+    pipeline._expire(in_flight)
+
+    assert in_flight == {}
+    assert [(job.key, reason) for job, _, reason in pipeline.failed] == [
+        ("replaced", "replaced by another transaction with its nonce"),
+        ("lost", "no receipt after 0s"),
+    ]
+    assert mimetic.totalSupply() == 0
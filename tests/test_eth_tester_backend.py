@@ -0,0 +1,89 @@
+import brownie
+import pytest
+from brownie import MockNft, chain, web3
+from brownie._config import CONFIG
+from scripts.eth_tester_backend import (
+    ERROR_SELECTOR,
+    NETWORK_ID,
+    NULL_HASH,
+    _revert_reason,
+    _vm_error,
+    _with_gas_price,
+)
+from scripts.utilities import get_deployer_account
+
+try:
+    from eth_abi import encode
+except ImportError:  # eth-abi < 4
+    from eth_abi import encode_abi as encode
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def mimetic(module_isolation, deployer):
+    contract = MockNft.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    yield contract
+
+
+@pytest.mark.require_network(NETWORK_ID)
+def test_network_is_registered():
+    assert CONFIG.networks[NETWORK_ID]["cmd"] == NETWORK_ID
+    assert CONFIG.networks[NETWORK_ID]["cmd_settings"]["evm_version"] == "istanbul"
+
+
+@pytest.mark.parametrize("error, reason", [
+    (Exception("execution reverted: MimeticERC721: Not owner"), "MimeticERC721: Not owner"),
+    (Exception("MimeticERC721: Not owner"), "MimeticERC721: Not owner"),
+    (Exception(ERROR_SELECTOR + encode(["string"], ["Ownable: caller is not the owner"])),
+     "Ownable: caller is not the owner"),
+    (Exception(Exception("execution reverted: b''")), None),
+    (Exception(b""), None),
+    (Exception(), None),
+])
+def test_revert_reason(error, reason):
+    assert _revert_reason(error) == reason
+
+
+def test_vm_error_has_the_ganache_format():
+    assert _vm_error(NULL_HASH, "Nope") == {"error": {
+        "code": -32000,
+        "message": "VM Exception while processing transaction: revert Nope",
+        "data": {NULL_HASH: {"error": "revert", "reason": "Nope"}},
+    }}
+    assert _vm_error(NULL_HASH, None)["error"]["data"] == {NULL_HASH: {"error": "revert"}}
+
+
+def test_transactions_without_fee_get_a_zero_gas_price():
+    assert _with_gas_price({"from": "0x1"}) == {"from": "0x1", "gas_price": 0}
+    assert _with_gas_price({"from": "0x1", "gas_price": 7}) == {"from": "0x1", "gas_price": 7}
+    assert "gas_price" not in _with_gas_price({"from": "0x1", "max_fee_per_gas": 7})
+
+
+@pytest.mark.require_network(NETWORK_ID)
+def test_reverted_transactions_report_their_reason(mimetic, deployer):
+    mimetic.mint(1, {"from": deployer})
+
+    with brownie.reverts("ERC721: token already minted"):
+        mimetic.mint(1, {"from": deployer})
+    with brownie.reverts("MimeticERC721: Invalid generation name"):
+        mimetic.addGeneration("", "", 0, 0, False, {"from": deployer, "gas_limit": 500000})
+    assert not web3.supports_traces
+
+
+@pytest.mark.require_network(NETWORK_ID)
+def test_undo_and_time(mimetic, deployer):
+    mimetic.mint(2, {"from": deployer})
+    chain.undo()
+    assert mimetic.totalSupply() == 0
+
+    before = chain.time()
+    chain.sleep(3600)
+    chain.mine()
+    assert chain[-1].timestamp >= before + 3600
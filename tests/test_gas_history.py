@@ -0,0 +1,16 @@
+from scripts.gas_history import markdown_table
+
+
+def test_markdown_table_compares_first_and_last_revision():
+    table = markdown_table(["before", "after"], [{"mint": 100000, "burn": 40000}, {"mint": 75000}])
+
+    assert table.splitlines() == [
+        "| operation | before | after | change |",
+        "|---|---:|---:|---:|",
+        "| mint | 100,000 | 75,000 | -25.0% |",
+        "| burn | 40,000 | - | - |",
+    ]
+
+
+def test_markdown_table_of_a_single_revision_has_no_change_column():
+    assert markdown_table(["HEAD"], [{"mint": 75000}]).splitlines()[0] == "| operation | HEAD |"
@@ -0,0 +1,186 @@
+import pytest
+from brownie import MockNft, chain, web3
+from scripts.indexer import MimeticIndexer
+from scripts.utilities import get_deployer_account, get_user_account
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+TOKEN_IDS = [1, 2, 3, 10, 11, 12]
+
+
+def add_unlockable_generation(contract, cost=42, prereq=0):
+    new_id = contract.getGenerationCount()
+    contract.addGeneration("Test", "", cost, prereq, False)
+    contract.enableGeneration(new_id)
+    contract.setGenerationAvailability(new_id, True)
+    return new_id
+
+
+def new_indexer(contract, database=":memory:", web3_instance=web3, **kwargs):
+    return MimeticIndexer(web3_instance, contract.address, database, start_block=contract.tx.block_number, **kwargs)
+
+
+def assert_matches_contract(indexer, contract):
+    for token_id in TOKEN_IDS:
+        assert indexer.active_generation(token_id) == contract.tokenToGenerationId(token_id)
+        assert indexer.unlocked_generations_word(token_id) == contract.tokenToUnlockedGenerations(token_id)
+
+
+class RangeLimitedEth:
+    # Rejects log queries over wide block ranges, like most hosted nodes do.
+    def __init__(self, eth, max_range, error):
+        self._eth = eth
+        self.max_range = max_range
+        self.error = error
+        self.queried_ranges = []
+
+    def get_logs(self, log_filter):
+        block_range = log_filter["toBlock"] - log_filter["fromBlock"] + 1
+        self.queried_ranges.append(block_range)
+        if block_range > self.max_range:
+            raise self.error
+        return self._eth.get_logs(log_filter)
+
+    def __getattr__(self, name):
+        return getattr(self._eth, name)
+
+
+class RangeLimitedWeb3:
+    def __init__(self, max_range, error=None):
+        self.eth = RangeLimitedEth(web3.eth, max_range, error or ValueError("query block range too wide"))
+
+
+@pytest.fixture(scope="module", autouse=True)
+def user():
+    return get_user_account()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def mimetic(module_isolation, deployer, user):
+    # generation 1 unlockable, generation 2 auto-unlocked through 1, and some tokens using them
+    contract = MockNft.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    add_unlockable_generation(contract)
+    contract.addGeneration("Auto", "", 0, 1, True)
+    contract.enableGeneration(2)
+
+    for token_id in (1, 2, 3):
+        contract.mint(token_id, {"from": user})
+    contract.mintBatch(10, 3, {"from": user})
+    contract.unlockGenerations([1, 2, 11], [1, 1, 1], {"from": user, "value": 3 * 42})
+    contract.activateGeneration(1, 1, {"from": user})
+    contract.activateGeneration(2, 2, {"from": user})
+    contract.transferFrom(user, deployer, 2, {"from": user})
+    contract.burn(3)
+    contract.burn(11)
+    yield contract
+
+
+def test_indexer_rebuilds_token_state(mimetic, user, deployer):
+    indexer = new_indexer(mimetic)
+
+    indexer.sync()
+
+    assert_matches_contract(indexer, mimetic)
+    assert indexer.tokens_of(user) == [1, 10, 12]
+    assert indexer.tokens_of(deployer) == [2]
+    assert indexer.owner_of(3) is None
+    assert indexer.unlocked_generations(11) == [0]
+    assert indexer.generations() == {0: True, 1: True, 2: True}
+
+
+def test_indexer_syncs_incrementally(mimetic, user):
+    indexer = new_indexer(mimetic)
+    indexer.sync()
+
+    assert indexer.sync() == 0
+
+    mimetic.activateGeneration(10, 2, {"from": user})
+    mimetic.unlockGeneration(12, 1, {"from": user, "value": 42})
+
+    assert indexer.sync() == 2
+    assert indexer.checkpoint == web3.eth.block_number
+    assert_matches_contract(indexer, mimetic)
+
+
+def test_indexer_resumes_from_checkpoint(mimetic, user, tmp_path):
+    database = str(tmp_path / "index.sqlite")
+    indexer = new_indexer(mimetic, database)
+    indexer.sync()
+    checkpoint = indexer.checkpoint
+    indexer.close()
+
+    mimetic.activateGeneration(12, 2, {"from": user})
+    resumed = new_indexer(mimetic, database)
+
+    assert resumed.checkpoint == checkpoint
+    assert resumed.sync() == 1
+    assert_matches_contract(resumed, mimetic)
+
+
+def test_indexer_shrinks_block_range_when_rejected(mimetic):
+    limited = RangeLimitedWeb3(max_range=4)
+    indexer = new_indexer(mimetic, web3_instance=limited, batch_size=64)
+
+    indexer.sync()
+
+    assert limited.eth.queried_ranges[0] > 4
+    assert limited.eth.queried_ranges[-1] <= 4
+    assert_matches_contract(indexer, mimetic)
+
+
+def test_indexer_shrinks_block_range_on_provider_limit_errors(mimetic):
+    limited = RangeLimitedWeb3(max_range=4, error=ValueError({"code": -32005, "message": "query returned too much"}))
+    indexer = new_indexer(mimetic, web3_instance=limited, batch_size=64)
+
+    indexer.sync()
+
+    assert limited.eth.queried_ranges[-1] <= 4
+    assert_matches_contract(indexer, mimetic)
+
+
+def test_indexer_raises_other_log_query_errors(mimetic):
+    limited = RangeLimitedWeb3(max_range=4, error=ValueError({"code": -32000, "message": "header not found"}))
+    indexer = new_indexer(mimetic, web3_instance=limited, batch_size=64)
+
+    with pytest.raises(ValueError, match="header not found"):
+        indexer.sync()
+
+    # the error is not taken for a range limit, so the range is not narrowed
+    assert limited.eth.queried_ranges == [limited.eth.queried_ranges[0]]
+    assert indexer.batch_size == 64
+
+
+def test_indexer_rolls_back_reorged_blocks(mimetic, user, deployer):
+    indexer = new_indexer(mimetic)
+    indexer.sync()
+    mimetic.activateGeneration(1, 0, {"from": user})
+    indexer.sync()
+
+    # replace the last block with a different one, followed by another block so that the chain gets longer
+    chain.undo()
+    mimetic.transferFrom(user, deployer, 1, {"from": user})
+    mimetic.mint(4, {"from": user})
+    indexer.sync()
+
+    assert indexer.active_generation(1) == 1
+    assert indexer.owner_of(1) == deployer
+    assert indexer.owner_of(4) == user
+    assert_matches_contract(indexer, mimetic)
+
+
+def test_indexer_reads_tokens_minted_before_the_start_block(mimetic, user, deployer):
+    indexer = MimeticIndexer(web3, mimetic.address, start_block=web3.eth.block_number + 1)
+    mimetic.activateGeneration(1, 0, {"from": user})
+    mimetic.transferFrom(deployer, user, 2, {"from": deployer})
+
+    indexer.sync()
+
+    assert (indexer.owner_of(1), indexer.active_generation(1)) == (user, 0)
+    assert (indexer.owner_of(2), indexer.active_generation(2)) == (user, 2)
@@ -0,0 +1,43 @@
+import pytest
+from web3 import Web3
+from scripts.merkle_grants import GrantTree, grant_leaf, read_grants, verify
+
+try:
+    from eth_abi import encode
+except ImportError:  # eth-abi < 4
+    from eth_abi import encode_abi as encode
+
+
+def test_grant_leaf_matches_abi_encoding():
+    encoded = encode(["uint256", "uint256"], [5, 1])
+
+    assert grant_leaf(5, 1) == Web3.keccak(Web3.keccak(encoded))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1000])
+def test_every_proof_verifies(size):
+    tree = GrantTree((token_id, token_id % 3) for token_id in range(size))
+
+    assert all(verify(tree.root, grant_leaf(token_id, gen_id), proof) for token_id, gen_id, proof in tree.proofs())
+
+
+def test_proof_does_not_verify_other_grant():
+    tree = GrantTree([(1, 1), (2, 1), (3, 1)])
+
+    assert not verify(tree.root, grant_leaf(1, 2), tree.proof(1, 1))
+
+
+def test_tree_drops_duplicates_and_ignores_order():
+    assert GrantTree([(2, 1), (1, 1), (2, 1)]).root == GrantTree([(1, 1), (2, 1)]).root
+
+
+def test_tree_fails_when_empty():
+    with pytest.raises(ValueError):
+        GrantTree([])
+
+
+def test_read_grants_skips_header(tmp_path):
+    path = tmp_path / "grants.csv"
+    path.write_text("token_id,generation_id\n1,2\n3,4\n")
+
+    assert read_grants(path) == [(1, 2), (3, 4)]
@@ -1,8 +1,10 @@
 import pytest
 import brownie
-from brownie import accounts, MockNft
+from brownie import accounts, MockNft, MockNftNonEnumerable
 from scripts.utilities import get_deployer_account, get_user_account
 
+pytestmark = pytest.mark.usefixtures("isolation")
+
 
 INDEX_PRICE = 0
 INDEX_PREREQUISITE = 1
@@ -14,6 +16,16 @@ INDEX_ENABLED = 6
 INDEX_AVAILABLE = 7
 INDEX_AUTO_UNLOCK = 8
 
+# generations per `addGenerations` call when filling a catalogue, well below the block gas limit
+FILLER_BATCH_SIZE = 50
+
+
+def add_auto_unlock_generations(contract, count):
+    # auto-unlocked fillers in batches, disabled and unavailable like the ones `addGeneration` creates
+    while contract.getGenerationCount() < count:
+        size = min(FILLER_BATCH_SIZE, count - contract.getGenerationCount())
+        contract.addGenerations([("Filler", "", 0, 0, True, False, False)] * size)
+
 
 def add_and_unlock_generation(contract, user, cost=0, prereq=0, token_id=0, skip_unlock=False):
     new_id = contract.getGenerationCount()
@@ -25,28 +37,67 @@ def add_and_unlock_generation(contract, user, cost=0, prereq=0, token_id=0, skip
             contract.unlockGeneration(token_id, new_id, {"from": user, "value": cost})
 
 
-@pytest.fixture(scope="function", autouse=True)
+def deploy_mimetic(deployer, mimetic_type):
+    contract = mimetic_type.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    return contract
+
+
+@pytest.fixture(scope="module", autouse=True)
 def user():
     return get_user_account()
 
 
-@pytest.fixture(scope="function", autouse=True)
+@pytest.fixture(scope="module", autouse=True)
 def deployer():
     return get_deployer_account()
 
 
-def test_deploy_mimetic(deployer):
-    MockNft.deploy({"from": deployer})
-    contract = MockNft[-1]
+@pytest.fixture(scope="module")
+def mimetic_type(request):
+    # `MockNft` unless a test runs on both bases through `both_bases`
+    return getattr(request, "param", MockNft)
+
+
+# Only token transfers (mint, burn, transfer) and the supported interfaces differ between the enumerable and the plain
+# ERC721 base, so only the tests covering them run against both.
+both_bases = pytest.mark.parametrize(
+    "mimetic_type", [MockNft, MockNftNonEnumerable], ids=["enumerable", "plain"], indirect=True
+)
+
+
+@both_bases
+def test_deploy_mimetic(deployer, mimetic_type):
+    mimetic_type.deploy({"from": deployer})
+    contract = mimetic_type[-1]
     assert contract is not None
 
 
-@pytest.fixture(scope="function", autouse=True)
-def mimetic(deployer):
-    MockNft.deploy({"from": deployer})
-    skrs = MockNft[-1]
-    skrs.enableGeneration(0)
-    yield skrs
+# Module scoped deployments run before the per-test snapshot is taken, so every test starts from them
+# and they are only deployed once per contract type. Scenarios are deployed as separate instances to
+# keep `mimetic` at its freshly deployed state.
+@pytest.fixture(scope="module", autouse=True)
+def mimetic(module_isolation, deployer, mimetic_type):
+    yield deploy_mimetic(deployer, mimetic_type)
+
+
+@pytest.fixture(scope="module")
+def unlocked_token(module_isolation, deployer, user, mimetic_type):
+    # token 99 with generations 1-3 unlocked, each one requiring the previous
+    contract = deploy_mimetic(deployer, mimetic_type)
+    contract.mint(99, {"from": user})
+    for gen_id in range(1, 4):
+        add_and_unlock_generation(contract, user, cost=41 + gen_id, prereq=gen_id - 1, token_id=99)
+    yield contract
+
+
+@pytest.fixture(scope="module")
+def wide_catalogue(module_isolation, deployer, user, mimetic_type):
+    # token 99 and a catalogue of 300 generations, the next one added lands in the second word
+    contract = deploy_mimetic(deployer, mimetic_type)
+    contract.mint(99, {"from": user})
+    add_auto_unlock_generations(contract, 300)
+    yield contract
 
 
 def test_initial_layer_created_when_contract_deployed(mimetic):
@@ -104,6 +155,11 @@ def test_add_generation_succeds_no_prereq(mimetic):
     assert mimetic.getGenerationCount() == gen_count_before + 1
 
 
+def test_add_generation_fails_when_price_too_large(mimetic):
+    with brownie.reverts("SafeCast: value doesn't fit in 128 bits"):
+        mimetic.addGeneration("Test", "baseURI", 2**128, 0, False)
+
+
 def test_add_generation_fails_when_not_owner(mimetic, user):
     with brownie.reverts("Ownable: caller is not the owner"):
         mimetic.addGeneration("Test", "baseURI", 0, 0, True, {"from": user})
@@ -132,6 +188,15 @@ def test_remove_generation_fails_when_not_latest(mimetic, user):
         mimetic.removeGeneration(1)
 
 
+def test_remove_generation_fails_when_generation_has_unlocks(mimetic, user):
+    # minting does not require generation 0 to be enabled
+    mimetic.disableGeneration(0)
+    mimetic.mint(99, {"from": user})
+
+    with brownie.reverts("MimeticERC721: Generation already has unlocks"):
+        mimetic.removeGeneration(0)
+
+
 def test_remove_generation_succeeds(mimetic, user):
     mimetic.addGeneration("Test 1", "baseURI", 0, 0, True)
     mimetic.addGeneration("Test 2", "baseURI", 0, 0, True)
@@ -142,6 +207,16 @@ def test_remove_generation_succeeds(mimetic, user):
     assert mimetic.getGenerationCount() == gen_count_before - 1
 
 
+def test_remove_generation_clears_name_and_baseURI(mimetic):
+    mimetic.addGeneration("Test", "baseURI", 42, 1, False)
+    mimetic.removeGeneration(1)
+
+    mimetic.addGeneration("Other", "", 42, 1, False)
+
+    assert mimetic.generations(1)[INDEX_NAME] == "Other"
+    assert mimetic.generations(1)[INDEX_BASEURI] == ""
+
+
 def test_set_generation_name_fails_when_not_owner(mimetic, user):
     mimetic.addGeneration("Test", "baseURI", 0, 0, True)
 
@@ -197,6 +272,50 @@ def test_set_generation_baseURI_succeeds_enabled(mimetic):
     assert mimetic.generations(0)[INDEX_BASEURI] == "ipfs://Cool"
 
 
+def test_set_generation_baseURI_emits_event(mimetic):
+    tx = mimetic.setGenerationBaseUri(0, "ipfs://Cool")
+
+    assert tx.events["GenerationBaseUriChanged"]["generationId"] == 0
+
+
+def test_set_generation_baseURI_fails_when_invalid_generation(mimetic):
+    with brownie.reverts("MimeticERC721: Invalid generation"):
+        mimetic.setGenerationBaseUri(42, "ipfs://Cool")
+
+
+@pytest.mark.parametrize("length", [1, 31, 32, 33, 100])
+def test_set_generation_baseURI_stores_uri_of_any_length(mimetic, user, length):
+    base_uri = "ipfs://" + "b" * (length - 7) if length > 7 else "x" * length
+    mimetic.mint(99, {"from": user})
+
+    mimetic.setGenerationBaseUri(0, base_uri)
+
+    assert mimetic.generations(0)[INDEX_BASEURI] == base_uri
+    assert mimetic.tokenURI(99) == base_uri + "99"
+
+
+def test_set_generation_baseURI_replaces_previous_uri(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.setGenerationBaseUri(0, "ipfs://" + "long" * 20)
+
+    mimetic.setGenerationBaseUri(0, "ipfs://short/")
+
+    assert mimetic.generations(0)[INDEX_BASEURI] == "ipfs://short/"
+    assert mimetic.tokenURI(99) == "ipfs://short/99"
+
+
+def test_set_generation_baseURI_keeps_unchanged_long_uri(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    long_uri = "ipfs://" + "long" * 20
+    first = mimetic.setGenerationBaseUri(0, long_uri)
+
+    again = mimetic.setGenerationBaseUri(0, long_uri)
+
+    # no new blob is deployed, which alone costs a 32000 gas CREATE
+    assert again.gas_used < first.gas_used - 32000
+    assert mimetic.tokenURI(99) == long_uri + "99"
+
+
 def test_set_generation_price_fails_when_not_owner(mimetic, user):
     mimetic.addGeneration("Test", "baseURI", 42, 1, False)
 
@@ -224,6 +343,13 @@ def test_set_generation_price_succeeds(mimetic):
     assert mimetic.generations(1)[INDEX_PRICE] == 1337
 
 
+def test_set_generation_price_fails_when_price_too_large(mimetic):
+    mimetic.addGeneration("Test", "baseURI", 42, 1, False)
+
+    with brownie.reverts("SafeCast: value doesn't fit in 128 bits"):
+        mimetic.setGenerationPrice(1, 2**128)
+
+
 def test_set_generation_prerequisite_fails_when_not_owner(mimetic, user):
     mimetic.addGeneration("Test", "baseURI", 0, 0, True)
 
@@ -275,6 +401,31 @@ def test_set_generation_prerequisite_succeeds_when_prereq_disabled(mimetic):
     assert mimetic.generations(1)[INDEX_PREREQUISITE] == 0
 
 
+def test_set_generation_prerequisite_fails_when_prereq_later(mimetic):
+    mimetic.addGeneration("A", "baseURI", 42, 0, False)
+    mimetic.addGeneration("B", "baseURI", 42, 0, False)
+
+    with brownie.reverts("MimeticERC721: Invalid prerequisite generation"):
+        mimetic.setGenerationPrerequisite(1, 2)
+
+
+def test_set_generation_prerequisite_updates_chain_of_descendants(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.addGeneration("A", "", 42, 0, False)  # gen = 1
+    mimetic.addGeneration("B", "", 42, 1, False)  # gen = 2
+    mimetic.addGeneration("C", "", 42, 2, False)  # gen = 3
+
+    # C now requires B and genesis only, without A
+    mimetic.setGenerationPrerequisite(2, 0)
+    for gen_id in (2, 3):
+        mimetic.enableGeneration(gen_id)
+        mimetic.setGenerationAvailability(gen_id, True)
+    mimetic.unlockGeneration(99, 2, {"from": user, "value": 42})
+    mimetic.unlockGeneration(99, 3, {"from": user, "value": 42})
+
+    assert mimetic.effectiveUnlockMask(99) == 0b1101
+
+
 def test_set_generation_availability_fails_when_not_owner(mimetic, user):
     mimetic.addGeneration("Test", "baseURI", 42, 1, False)
 
@@ -295,6 +446,154 @@ def test_set_generation_availability_succeeds(mimetic):
     assert mimetic.generations(1)[INDEX_AVAILABLE]
 
 
+def generation_config(name="Test", base_uri="ipfs://test/", price=42, prereq=0, auto_unlock=False, available=True, enabled=True):
+    return (name, base_uri, price, prereq, auto_unlock, available, enabled)
+
+
+def test_add_and_configure_generation_applies_all_properties(mimetic):
+    # the return value is read with a call, transactions only expose it on networks with traces
+    assert mimetic.addAndConfigureGeneration.call(generation_config()) == 1
+    tx = mimetic.addAndConfigureGeneration(generation_config())
+
+    assert tuple(mimetic.generations(1)) == (42, 0, 0, 0, "Test", "ipfs://test/", True, True, False)
+    assert tx.events["GenerationAdded"]["generationId"] == 1
+    assert tx.events["GenerationEnabledDisabled"]["isEnabled"]
+
+
+def test_add_and_configure_generation_can_be_unlocked_right_away(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.addAndConfigureGeneration(generation_config())
+
+    mimetic.unlockGeneration(99, 1, {"from": user, "value": 42})
+
+    assert mimetic.isGenerationUnlocked(99, 1)
+
+
+def test_add_and_configure_generation_fails_when_prerequisite_disabled(mimetic):
+    mimetic.addGeneration("Disabled", "", 42, 0, False)
+
+    with brownie.reverts("MimeticERC721: Prerequisite must be enabled"):
+        mimetic.addAndConfigureGeneration(generation_config(prereq=1))
+
+
+def test_add_and_configure_generation_fails_autounlock_with_price(mimetic):
+    with brownie.reverts("MimeticERC721: Auto-unlock generation must have no associated price"):
+        mimetic.addAndConfigureGeneration(generation_config(auto_unlock=True))
+
+
+def test_add_and_configure_generation_fails_when_not_owner(mimetic, user):
+    with brownie.reverts("Ownable: caller is not the owner"):
+        mimetic.addAndConfigureGeneration(generation_config(), {"from": user})
+
+
+def test_add_generations_adds_in_order(mimetic):
+    configs = [
+        generation_config(name="Fire"),
+        generation_config(name="Shadowfire", prereq=1),
+        generation_config(name="Glow", price=0, prereq=2, auto_unlock=True, available=False),
+    ]
+
+    assert mimetic.addGenerations.call(configs) == 1
+    tx = mimetic.addGenerations(configs)
+
+    assert mimetic.getGenerationCount() == 4
+    assert [e["generationId"] for e in tx.events["GenerationAdded"]] == [1, 2, 3]
+    assert [gen[INDEX_PREREQUISITE] for gen in mimetic.getGenerations(1, 4)] == [0, 1, 2]
+    assert mimetic.generations(3)[INDEX_AUTO_UNLOCK]
+
+
+def test_add_generations_reverts_whole_batch(mimetic):
+    with brownie.reverts("MimeticERC721: Invalid generation name"):
+        mimetic.addGenerations([generation_config(), generation_config(name="")])
+
+    assert mimetic.getGenerationCount() == 1
+
+
+def test_configure_generation_applies_all_properties(mimetic):
+    mimetic.addGeneration("Test", "", 1, 0, False)
+
+    tx = mimetic.configureGeneration(1, generation_config(name="New", base_uri="ipfs://new/", price=7))
+
+    assert tuple(mimetic.generations(1)) == (7, 0, 0, 0, "New", "ipfs://new/", True, True, False)
+    assert tx.events["GenerationBaseUriChanged"]["generationId"] == 1
+    assert tx.events["GenerationEnabledDisabled"]["isEnabled"]
+
+
+def test_configure_generation_keeps_baseuri_when_empty(mimetic):
+    mimetic.addGeneration("Test", "ipfs://kept/", 1, 0, False)
+
+    tx = mimetic.configureGeneration(1, generation_config(base_uri="", enabled=False))
+
+    assert mimetic.generations(1)[INDEX_BASEURI] == "ipfs://kept/"
+    assert not mimetic.generations(1)[INDEX_ENABLED]
+    assert "GenerationBaseUriChanged" not in tx.events
+
+
+def test_configure_generation_fails_when_enabled(mimetic):
+    with brownie.reverts("MimeticERC721: Generation must be disabled"):
+        mimetic.configureGeneration(0, generation_config())
+
+
+def test_configure_generation_fails_when_autounlock_changed(mimetic):
+    mimetic.addGeneration("Test", "", 1, 0, False)
+
+    with brownie.reverts("MimeticERC721: Auto-unlock flag cannot be changed"):
+        mimetic.configureGeneration(1, generation_config(price=0, auto_unlock=True))
+
+
+def test_configure_generation_fails_autounlock_with_price(mimetic):
+    mimetic.addGeneration("Test", "", 0, 0, True)
+
+    with brownie.reverts("MimeticERC721: Auto-unlock must be free"):
+        mimetic.configureGeneration(1, generation_config(auto_unlock=True))
+
+
+def test_configure_generation_fails_when_prerequisite_auto_unlock(mimetic):
+    mimetic.addGeneration("Auto", "", 0, 0, True)
+    mimetic.addGeneration("Test", "", 1, 0, False)
+
+    with brownie.reverts("MimeticERC721: Invalid prerequisite generation"):
+        mimetic.configureGeneration(2, generation_config(prereq=1))
+
+
+def test_configure_generation_fails_when_not_owner(mimetic, user):
+    mimetic.addGeneration("Test", "", 1, 0, False)
+
+    with brownie.reverts("Ownable: caller is not the owner"):
+        mimetic.configureGeneration(1, generation_config(), {"from": user})
+
+
+def test_get_generations_matches_generations(unlocked_token):
+    count = unlocked_token.getGenerationCount()
+
+    generations = unlocked_token.getGenerations(0, count)
+
+    assert [tuple(gen) for gen in generations] == [tuple(unlocked_token.generations(i)) for i in range(count)]
+
+
+def test_get_generations_caps_range_at_generation_count(unlocked_token):
+    assert len(unlocked_token.getGenerations(2, 2**256 - 1)) == unlocked_token.getGenerationCount() - 2
+    assert unlocked_token.getGenerations(4, 4) == []
+
+
+def test_get_generations_fails_when_range_invalid(unlocked_token):
+    with brownie.reverts("MimeticERC721: Invalid generation range"):
+        unlocked_token.getGenerations(3, 2)
+
+
+def test_get_generation_flags_encodes_flags_per_word(wide_catalogue):
+    wide_catalogue.addGeneration("Test", "baseURI", 42, 0, False)
+    wide_catalogue.enableGeneration(300)
+    wide_catalogue.setGenerationAvailability(300, True)
+
+    count, enabled, available, auto_unlock = wide_catalogue.getGenerationFlags()
+
+    assert count == 301
+    assert enabled == [1, 1 << 44]
+    assert available == [0, 1 << 44]
+    assert auto_unlock == [2**256 - 2, 2**44 - 1]
+
+
 def test_enable_generation_fails_when_not_owner(mimetic, user):
     mimetic.addGeneration("Test", "baseURI", 42, 1, False)
 
@@ -404,6 +703,65 @@ def test_disable_generation_succeeds_unlockable_without_unlocks(mimetic, user):
     assert not mimetic.generations(1)[INDEX_ENABLED]
 
 
+def test_effective_unlock_mask_includes_auto_unlocked_generations(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)  # gen = 1
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=1)  # gen = 2
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=1)  # gen = 3
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=3)  # gen = 4
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=0)  # gen = 5
+
+    expected = sum(1 << gen_id for gen_id in range(6) if mimetic.isGenerationUnlocked(99, gen_id))
+
+    assert expected == 0b100111
+    assert mimetic.effectiveUnlockMask(99) == expected
+
+
+def test_effective_unlock_mask_excludes_removed_generation(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.addGeneration("Test", "baseURI", 0, 0, True)
+
+    assert mimetic.effectiveUnlockMask(99) == 0b11
+
+    mimetic.removeGeneration(1)
+
+    assert mimetic.effectiveUnlockMask(99) == 0b1
+
+
+def test_effective_unlock_masks_returns_mask_per_token(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.mint(101, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)  # gen = 1
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=1)  # gen = 2
+
+    # generation 0 is implicitly unlocked, even for token ids which were never minted
+    assert mimetic.effectiveUnlockMasks([99, 101, 42]) == [0b111, 0b1, 0b1]
+
+
+def test_get_unlockable_generations_returns_mask_and_price(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)  # gen = 1
+    add_and_unlock_generation(mimetic, user, cost=43, prereq=1)  # gen = 2
+    add_and_unlock_generation(mimetic, user, cost=44, prereq=2)  # gen = 3, prerequisite not held
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=1)  # gen = 4, auto-unlock
+    mimetic.addGeneration("Disabled", "", 45, 0, False)  # gen = 5
+    add_and_unlock_generation(mimetic, user, cost=46, prereq=0)  # gen = 6
+
+    assert mimetic.getUnlockableGenerations(99) == (0b1000100, 43 + 46)
+    # a token which was never minted only holds generation 0
+    assert mimetic.getUnlockableGenerations(42) == (0b1000010, 42 + 46)
+
+
+def test_get_unlockable_generations_follows_unlocks(unlocked_token, user):
+    add_and_unlock_generation(unlocked_token, user, cost=50, prereq=3)  # gen = 4
+
+    assert unlocked_token.getUnlockableGenerations(99) == (0b10000, 50)
+
+    unlocked_token.unlockGeneration(99, 4, {"from": user, "value": 50})
+
+    assert unlocked_token.getUnlockableGenerations(99) == (0, 0)
+
+
 def test_unlock_generation_fails_when_generation_disabled(mimetic, user):
     mimetic.mint(99, {"from": user})
     mimetic.addGeneration("Test", "baseURI", 42, 0, False)
@@ -421,12 +779,9 @@ def test_unlock_generation_fails_when_generation_not_available(mimetic, user):
         mimetic.unlockGeneration(99, 1, {"from": user, "value": 42})
 
 
-def test_unlock_generation_fails_when_already_unlocked(mimetic, user):
-    mimetic.mint(99, {"from": user})
-    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)
-
+def test_unlock_generation_fails_when_already_unlocked(unlocked_token, user):
     with brownie.reverts("MimeticERC721: Generation already unlocked"):
-        mimetic.unlockGeneration(99, 1, {"from": user, "value": 42})
+        unlocked_token.unlockGeneration(99, 1, {"from": user, "value": 42})
 
 
 def test_unlock_generation_fails_when_generation_auto_unlock(mimetic, user):
@@ -479,12 +834,10 @@ def test_unlock_generation_succeeds_when_no_prereq(mimetic, user):
     assert mimetic.isGenerationUnlocked(99, 1)
 
 
-def test_unlock_generation_succeeds_when_prereq_unlocked(mimetic, user):
-    mimetic.mint(99, {"from": user})
-    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)
-    add_and_unlock_generation(mimetic, user, cost=42, prereq=1, token_id=99)
-
-    assert mimetic.isGenerationUnlocked(99, 2)
+def test_unlock_generation_succeeds_when_prereq_unlocked(unlocked_token):
+    assert unlocked_token.isGenerationUnlocked(99, 2)
+    assert unlocked_token.isGenerationUnlocked(99, 3)
+    assert unlocked_token.effectiveUnlockMask(99) == 0b1111
 
 
 def test_unlock_generation_succeeds_when_done_from_alt_wallet(mimetic, user, deployer):
@@ -513,6 +866,67 @@ def test_unlock_generation_updates_unlocks_counter(mimetic, user):
     assert mimetic.generations(2)[INDEX_UNLOCKS] == unlocks_before + 1
 
 
+def test_unlock_generations_fails_when_length_mismatch(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0)
+
+    with brownie.reverts("MimeticERC721: Array length mismatch"):
+        mimetic.unlockGenerations([99], [1, 1], {"from": user, "value": 84})
+
+
+def test_unlock_generations_fails_when_insufficient_funds(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.mint(101, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0)
+
+    with brownie.reverts("MimeticERC721: Insufficient funds"):
+        mimetic.unlockGenerations([99, 101], [1, 1], {"from": user, "value": 83})
+
+
+def test_unlock_generations_fails_when_pair_repeated(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0)
+
+    with brownie.reverts("MimeticERC721: Generation already unlocked"):
+        mimetic.unlockGenerations([99, 99], [1, 1], {"from": user, "value": 84})
+
+
+def test_unlock_generations_fails_when_generation_unavailable(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0)
+    mimetic.setGenerationAvailability(1, False)
+
+    with brownie.reverts("MimeticERC721: Generation unavailable"):
+        mimetic.unlockGenerations([99], [1], {"from": user, "value": 42})
+
+
+def test_unlock_generations_succeeds_multiple_tokens_and_generations(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.mint(101, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0)  # gen = 1
+    add_and_unlock_generation(mimetic, user, cost=43, prereq=2)  # gen = 2
+
+    tx = mimetic.unlockGenerations([99, 101, 99], [1, 1, 2], {"from": user, "value": 42 + 42 + 43})
+
+    assert mimetic.isGenerationUnlocked(99, 1)
+    assert mimetic.isGenerationUnlocked(101, 1)
+    assert mimetic.isGenerationUnlocked(99, 2)
+    assert not mimetic.isGenerationUnlocked(101, 2)
+    assert mimetic.generations(1)[INDEX_UNLOCKS] == 2
+    assert mimetic.generations(2)[INDEX_UNLOCKS] == 1
+    assert [(e["generationId"], e["tokenId"]) for e in tx.events["GenerationUnlocked"]] == [(1, 99), (1, 101), (2, 99)]
+
+
+def test_unlock_generations_succeeds_when_prereq_unlocked_in_same_call(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0)  # gen = 1
+    add_and_unlock_generation(mimetic, user, cost=43, prereq=1)  # gen = 2
+
+    mimetic.unlockGenerations([99, 99], [1, 2], {"from": user, "value": 42 + 43})
+
+    assert mimetic.isGenerationUnlocked(99, 2)
+
+
 def test_activate_generation_fails_when_generation_disabled(mimetic, user):
     mimetic.mint(99, {"from": user})
     mimetic.addGeneration("Test", "baseURI", 0, 0, True)
@@ -590,16 +1004,12 @@ def test_activate_generation_succeeds_when_auto_and_prereq_unlocked(mimetic, use
     assert mimetic.tokenToGenerationId(99) == 2
 
 
-def test_activate_generation_succeeds_when_unlockable_and_prereq_unlocked(mimetic, user):
-    mimetic.mint(99, {"from": user})
-    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)
-    add_and_unlock_generation(mimetic, user, cost=43, prereq=1, token_id=99)
+def test_activate_generation_succeeds_when_unlockable_and_prereq_unlocked(unlocked_token, user):
+    assert unlocked_token.tokenToGenerationId(99) == 0
 
-    assert mimetic.tokenToGenerationId(99) == 0
+    unlocked_token.activateGeneration(99, 2, {"from": user})
 
-    mimetic.activateGeneration(99, 2, {"from": user})
-
-    assert mimetic.tokenToGenerationId(99) == 2
+    assert unlocked_token.tokenToGenerationId(99) == 2
 
 
 def test_activate_generation_decrements_previous_generation_activations(mimetic, user):
@@ -626,6 +1036,61 @@ def test_activate_generation_increments_new_generation_activations(mimetic, user
     assert mimetic.generations(1)[INDEX_ACTIVATIONS] == next_gen_activations + 1
 
 
+def test_activate_generations_fails_when_not_token_owner(mimetic, user, deployer):
+    mimetic.mint(99, {"from": user})
+    mimetic.mint(101, {"from": deployer})
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=0)
+
+    with brownie.reverts("MimeticERC721: Must be token owner"):
+        mimetic.activateGenerations["uint256[],uint256"]([99, 101], 1, {"from": user})
+
+
+def test_activate_generations_fails_when_length_mismatch(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=0)
+
+    with brownie.reverts("MimeticERC721: Array length mismatch"):
+        mimetic.activateGenerations["uint256[],uint256[]"]([99], [1, 0], {"from": user})
+
+
+def test_activate_generations_succeeds_single_generation(mimetic, user):
+    for token_id in (99, 101, 191):
+        mimetic.mint(token_id, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=0)
+
+    tx = mimetic.activateGenerations["uint256[],uint256"]([99, 101, 191], 1, {"from": user})
+
+    assert [mimetic.tokenToGenerationId(token_id) for token_id in (99, 101, 191)] == [1, 1, 1]
+    assert mimetic.generations(0)[INDEX_ACTIVATIONS] == 0
+    assert mimetic.generations(1)[INDEX_ACTIVATIONS] == 3
+    assert [e["tokenId"] for e in tx.events["GenerationActivated"]] == [99, 101, 191]
+
+
+def test_activate_generations_succeeds_mixed_pairs(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.mint(101, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=0, prereq=0)  # gen = 1
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=2, token_id=99)  # gen = 2
+    mimetic.activateGeneration(101, 1, {"from": user})
+
+    mimetic.activateGenerations["uint256[],uint256[]"]([99, 101, 99], [1, 0, 2], {"from": user})
+
+    assert mimetic.tokenToGenerationId(99) == 2
+    assert mimetic.tokenToGenerationId(101) == 0
+    assert mimetic.generations(0)[INDEX_ACTIVATIONS] == 1
+    assert mimetic.generations(1)[INDEX_ACTIVATIONS] == 0
+    assert mimetic.generations(2)[INDEX_ACTIVATIONS] == 1
+
+
+def test_activate_generations_succeeds_when_already_active(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.mint(101, {"from": user})
+
+    mimetic.activateGenerations["uint256[],uint256"]([99, 101], 0, {"from": user})
+
+    assert mimetic.generations(0)[INDEX_ACTIVATIONS] == 2
+
+
 def test_generation_baseuri_returns_default_generation_baseuri_when_revealed(mimetic, user):
     mimetic.mint(99, {"from": user})
     add_and_unlock_generation(mimetic, user, cost=42, prereq=1, token_id=99)
@@ -671,6 +1136,63 @@ def test_generation_baseuri_returns_correct_baseuri_genesis_generation_simulatio
     assert mimetic.generationBaseURI(99) == mimetic.generations(1)[INDEX_BASEURI]
 
 
+def test_token_uri_appends_token_id_to_generation_baseuri(mimetic, user):
+    mimetic.mint(99, {"from": user})
+
+    assert mimetic.tokenURI(99) == "ipfs://baseuri99"
+
+
+def test_token_uri_returns_unrevealed_uri_when_unrevealed(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)
+    mimetic.activateGeneration(99, 1, {"from": user})
+
+    assert mimetic.tokenURI(99) == mimetic.baseURI()
+
+
+def test_token_uri_follows_active_generation(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)
+    mimetic.setGenerationBaseUri(1, "ipfs://Cool/")
+    mimetic.activateGeneration(99, 1, {"from": user})
+
+    assert mimetic.tokenURI(99) == "ipfs://Cool/99"
+
+    mimetic.activateGeneration(99, 0, {"from": user})
+
+    assert mimetic.tokenURI(99) == "ipfs://baseuri99"
+
+
+def test_token_uri_fails_when_token_nonexistent(mimetic):
+    with brownie.reverts("ERC721Metadata: URI query for nonexistent token"):
+        mimetic.tokenURI(99)
+
+
+def test_token_uris_returns_uri_of_each_token(mimetic, user):
+    mimetic.mintBatch(10, 3, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=11)
+    mimetic.activateGeneration(11, 1, {"from": user})
+
+    assert mimetic.tokenURIs([10, 11, 12]) == ["ipfs://baseuri10", mimetic.baseURI(), "ipfs://baseuri12"]
+    assert mimetic.tokenURIs([]) == []
+
+
+def test_token_to_generation_ids_returns_active_generation_of_each_token(mimetic, user):
+    mimetic.mintBatch(10, 3, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=11)
+    mimetic.activateGeneration(11, 1, {"from": user})
+
+    assert mimetic.tokenToGenerationIds([10, 11, 12]) == [0, 1, 0]
+
+
+def test_token_uris_fails_when_any_token_nonexistent(mimetic, user):
+    mimetic.mint(99, {"from": user})
+
+    with brownie.reverts("ERC721Metadata: URI query for nonexistent token"):
+        mimetic.tokenURIs([99, 100])
+
+
+@both_bases
 def test_mint_increments_unlocks(mimetic, user):
     mimetic.mint(99, {"from": user})
     mimetic.mint(101, {"from": user})
@@ -682,6 +1204,7 @@ def test_mint_increments_unlocks(mimetic, user):
     assert mimetic.generations(0)[INDEX_UNLOCKS] == state_before + 1
 
 
+@both_bases
 def test_mint_increments_activations(mimetic, user):
     mimetic.mint(99, {"from": user})
     mimetic.mint(101, {"from": user})
@@ -693,18 +1216,68 @@ def test_mint_increments_activations(mimetic, user):
     assert mimetic.generations(0)[INDEX_ACTIVATIONS] == state_before + 1
 
 
+@both_bases
 def test_mint_sets_active_generation_to_zero(mimetic, user):
     mimetic.mint(191, {"from": user})
 
     assert mimetic.tokenToGenerationId(191) == 0
 
 
+@both_bases
 def test_mint_sets_unlocked_generations_to_gen_zero(mimetic, user):
     mimetic.mint(191, {"from": user})
 
     assert mimetic.tokenToUnlockedGenerations(191) == (1 << 0)
 
 
+@both_bases
+def test_mint_batch_increments_counters_once(mimetic, user):
+    mimetic.mint(1, {"from": user})
+
+    tx = mimetic.mintBatch(100, 10, {"from": user})
+
+    assert mimetic.generations(0)[INDEX_UNLOCKS] == 11
+    assert mimetic.generations(0)[INDEX_ACTIVATIONS] == 11
+    assert [e["tokenId"] for e in tx.events["Transfer"]] == list(range(100, 110))
+
+
+@both_bases
+def test_mint_batch_sets_genesis_state(mimetic, user):
+    mimetic.mintBatch(100, 3, {"from": user})
+
+    for token_id in range(100, 103):
+        assert mimetic.ownerOf(token_id) == user
+        assert mimetic.tokenToGenerationId(token_id) == 0
+        assert mimetic.tokenToUnlockedGenerations(token_id) == (1 << 0)
+
+
+@both_bases
+def test_mint_batch_fails_when_token_exists(mimetic, user):
+    mimetic.mint(101, {"from": user})
+
+    with brownie.reverts("ERC721: token already minted"):
+        mimetic.mintBatch(100, 3, {"from": user})
+
+
+def test_unlock_generation_fails_for_genesis_generation(mimetic, user):
+    mimetic.mint(99, {"from": user})
+    mimetic.setGenerationAvailability(0, True)
+
+    with brownie.reverts("MimeticERC721: Generation already unlocked"):
+        mimetic.unlockGeneration(99, 0, {"from": user, "value": mimetic.generations(0)[INDEX_PRICE]})
+
+
+@both_bases
+def test_burn_batch_minted_token_decrements_genesis_counters(mimetic, user):
+    mimetic.mintBatch(100, 3, {"from": user})
+
+    mimetic.burn(101)
+
+    assert mimetic.generations(0)[INDEX_UNLOCKS] == 2
+    assert mimetic.generations(0)[INDEX_ACTIVATIONS] == 2
+
+
+@both_bases
 def test_burn_decrements_all_unlocked_generations(mimetic, user):
     mimetic.mint(99, {"from": user})
 
@@ -728,6 +1301,7 @@ def test_burn_decrements_all_unlocked_generations(mimetic, user):
     assert mimetic.generations(4)[INDEX_UNLOCKS] == 0  # this one was 0 before burn too
 
 
+@both_bases
 def test_burn_decrements_active_generation_default(mimetic, user):
     mimetic.mint(99, {"from": user})
 
@@ -748,6 +1322,7 @@ def test_burn_decrements_active_generation_default(mimetic, user):
     assert mimetic.generations(3)[INDEX_ACTIVATIONS] == 0
 
 
+@both_bases
 def test_burn_decrements_active_generation_custom(mimetic, user):
     mimetic.mint(99, {"from": user})
 
@@ -766,3 +1341,113 @@ def test_burn_decrements_active_generation_custom(mimetic, user):
     assert mimetic.generations(1)[INDEX_ACTIVATIONS] == 0
     assert mimetic.generations(2)[INDEX_ACTIVATIONS] == 0
 
+
+
+def mint_and_burn_gas(contract, user, token_id, unlocked_generations=()):
+    contract.mint(token_id, {"from": user})
+    for gen_id in unlocked_generations:
+        contract.unlockGeneration(token_id, gen_id, {"from": user, "value": contract.generations(gen_id)[INDEX_PRICE]})
+    return contract.burn(token_id).gas_used
+
+
+@pytest.mark.parametrize("generation_count", [1, 32, 128, 255])
+def test_burn_gas_independent_of_generation_count(mimetic, user, generation_count):
+    baseline = mint_and_burn_gas(mimetic, user, 99)
+
+    add_auto_unlock_generations(mimetic, generation_count)
+
+    assert mimetic.getGenerationCount() == generation_count
+    assert mint_and_burn_gas(mimetic, user, 99) == baseline
+
+
+def test_burn_gas_scales_with_unlocks_held(mimetic, user):
+    for _ in range(3):
+        add_and_unlock_generation(mimetic, user, cost=42, prereq=0)
+
+    gas_used = [mint_and_burn_gas(mimetic, user, 99, range(1, unlocks + 1)) for unlocks in range(4)]
+
+    assert gas_used == sorted(gas_used)
+    assert len(set(gas_used)) == len(gas_used)
+
+
+def test_get_unlockable_generations_word_beyond_first_word(wide_catalogue, user):
+    add_and_unlock_generation(wide_catalogue, user, cost=42, prereq=0, token_id=99)  # gen = 300
+    add_and_unlock_generation(wide_catalogue, user, cost=43, prereq=300)  # gen = 301
+    add_and_unlock_generation(wide_catalogue, user, cost=44, prereq=301)  # gen = 302
+
+    assert wide_catalogue.getUnlockableGenerationsWord(99, 1) == (1 << (301 - 256), 43)
+    assert wide_catalogue.getUnlockableGenerationsWord(42, 1) == (1 << (300 - 256), 42)
+    assert wide_catalogue.getUnlockableGenerations(99) == (0, 0)
+
+
+def test_unlock_generation_succeeds_beyond_first_word(wide_catalogue, user):
+    add_and_unlock_generation(wide_catalogue, user, cost=42, prereq=0, token_id=99)  # gen = 300
+
+    assert wide_catalogue.isGenerationUnlocked(99, 300)
+    assert not wide_catalogue.isGenerationUnlocked(99, 300 - 256)
+    assert wide_catalogue.unlockedGenerationsWord(99, 1) == 1 << (300 - 256)
+    assert wide_catalogue.tokenToUnlockedGenerations(99) == 1
+    assert wide_catalogue.generations(300)[INDEX_UNLOCKS] == 1
+
+
+def test_activate_and_burn_generation_beyond_first_word(wide_catalogue, user):
+    add_and_unlock_generation(wide_catalogue, user, cost=42, prereq=0, token_id=99)  # gen = 300
+    add_and_unlock_generation(wide_catalogue, user, cost=0, prereq=300)  # gen = 301
+
+    wide_catalogue.activateGeneration(99, 301, {"from": user})
+
+    assert wide_catalogue.tokenToGenerationId(99) == 301
+    assert wide_catalogue.generations(301)[INDEX_ACTIVATIONS] == 1
+
+    wide_catalogue.burn(99)
+
+    assert wide_catalogue.generations(0)[INDEX_UNLOCKS] == 0
+    assert wide_catalogue.generations(300)[INDEX_UNLOCKS] == 0
+    assert wide_catalogue.generations(301)[INDEX_ACTIVATIONS] == 0
+    assert wide_catalogue.unlockedGenerationsWord(99, 1) == 0
+
+
+def test_effective_unlock_mask_word_resolves_auto_unlock_beyond_first_word(wide_catalogue, user):
+    add_and_unlock_generation(wide_catalogue, user, cost=42, prereq=0, token_id=99)  # gen = 300
+    add_and_unlock_generation(wide_catalogue, user, cost=0, prereq=300)  # gen = 301
+    add_and_unlock_generation(wide_catalogue, user, cost=0, prereq=0)  # gen = 302
+
+    # generations 1-255 and 256-299 are auto-unlocked through generation 0
+    assert wide_catalogue.effectiveUnlockMask(99) == 2**256 - 1
+    assert wide_catalogue.effectiveUnlockMaskWord(99, 1) == (1 << (303 - 256)) - 1
+    assert wide_catalogue.effectiveUnlockMaskWord(99, 2) == 0
+
+
+def test_mint_after_burn_starts_with_clean_state(wide_catalogue, user):
+    add_and_unlock_generation(wide_catalogue, user, cost=42, prereq=0, token_id=99)  # gen = 300
+    wide_catalogue.activateGeneration(99, 300, {"from": user})
+    wide_catalogue.burn(99)
+
+    wide_catalogue.mint(99, {"from": user})
+
+    assert wide_catalogue.tokenToGenerationId(99) == 0
+    assert wide_catalogue.tokenToUnlockedGenerations(99) == 1
+    assert not wide_catalogue.isGenerationUnlocked(99, 300)
+
+
+@both_bases
+def test_supports_enumerable_interface_only_when_enumerable(mimetic, mimetic_type):
+    erc721_interface_id = "0x80ac58cd"
+    erc721_enumerable_interface_id = "0x780e9d63"
+
+    assert mimetic.supportsInterface(erc721_interface_id)
+    assert mimetic.supportsInterface(erc721_enumerable_interface_id) == (mimetic_type is MockNft)
+
+
+@both_bases
+def test_transfer_keeps_mimetic_state(mimetic, user, deployer):
+    mimetic.mint(99, {"from": user})
+    add_and_unlock_generation(mimetic, user, cost=42, prereq=0, token_id=99)
+    mimetic.activateGeneration(99, 1, {"from": user})
+
+    mimetic.transferFrom(user, deployer, 99, {"from": user})
+
+    assert mimetic.tokenToGenerationId(99) == 1
+    assert mimetic.isGenerationUnlocked(99, 1)
+    with brownie.reverts("MimeticERC721: Must be token owner"):
+        mimetic.activateGeneration(99, 0, {"from": user})
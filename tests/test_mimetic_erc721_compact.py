@@ -0,0 +1,126 @@
+import pytest
+import brownie
+from brownie import MockNftCompact, MockNftNonEnumerable
+from scripts.utilities import get_deployer_account, get_user_account
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+INDEX_UNLOCKS = 2
+INDEX_ACTIVATIONS = 3
+
+
+def add_unlockable_generation(contract, cost=42, prereq=0):
+    new_id = contract.getGenerationCount()
+    contract.addGeneration("Test", "", cost, prereq, False)
+    contract.enableGeneration(new_id)
+    contract.setGenerationAvailability(new_id, True)
+    return new_id
+
+
+@pytest.fixture(scope="module", autouse=True)
+def user():
+    return get_user_account()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def compact(module_isolation, deployer):
+    contract = MockNftCompact.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    yield contract
+
+
+@pytest.fixture(scope="module")
+def regular(module_isolation, deployer):
+    # the compact layout sits on the same non-enumerable base, so only the per-token state differs
+    contract = MockNftNonEnumerable.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    yield contract
+
+
+def test_mint_sets_token_state(compact, user):
+    compact.mint(99, {"from": user})
+
+    assert compact.tokenToGenerationId(99) == 0
+    assert compact.tokenToUnlockedGenerations(99) == (1 << 0)
+
+
+def test_unlock_preserves_active_generation(compact, user):
+    compact.mint(99, {"from": user})
+    gen_a = add_unlockable_generation(compact)
+    gen_b = add_unlockable_generation(compact)
+    compact.unlockGeneration(99, gen_a, {"from": user, "value": 42})
+    compact.activateGeneration(99, gen_a, {"from": user})
+
+    compact.unlockGeneration(99, gen_b, {"from": user, "value": 42})
+
+    assert compact.tokenToGenerationId(99) == gen_a
+    assert compact.tokenToUnlockedGenerations(99) == (1 << 0) | (1 << gen_a) | (1 << gen_b)
+
+
+def test_activate_preserves_unlocked_generations(compact, user):
+    compact.mint(99, {"from": user})
+    gen_id = add_unlockable_generation(compact)
+    compact.unlockGeneration(99, gen_id, {"from": user, "value": 42})
+
+    compact.activateGeneration(99, gen_id, {"from": user})
+
+    assert compact.tokenToGenerationId(99) == gen_id
+    assert compact.tokenToUnlockedGenerations(99) == (1 << 0) | (1 << gen_id)
+    assert compact.generations(0)[INDEX_ACTIVATIONS] == 0
+    assert compact.generations(gen_id)[INDEX_ACTIVATIONS] == 1
+
+
+def test_burn_decrements_counters(compact, user):
+    compact.mint(99, {"from": user})
+    gen_id = add_unlockable_generation(compact)
+    compact.unlockGeneration(99, gen_id, {"from": user, "value": 42})
+    compact.activateGeneration(99, gen_id, {"from": user})
+
+    compact.burn(99)
+
+    assert compact.generations(0)[INDEX_UNLOCKS] == 0
+    assert compact.generations(gen_id)[INDEX_UNLOCKS] == 0
+    assert compact.generations(gen_id)[INDEX_ACTIVATIONS] == 0
+
+
+def test_add_generation_fails_when_compact_limit_reached(compact):
+    for _ in range(compact.getGenerationCount(), 248):
+        compact.addGeneration("Test", "", 42, 0, False)
+
+    with brownie.reverts("MimeticERC721: Generation limit reached"):
+        compact.addGeneration("Test", "", 42, 0, False)
+
+
+def test_last_generation_does_not_overlap_active_generation(compact, user):
+    compact.mint(99, {"from": user})
+    for _ in range(compact.getGenerationCount(), 247):
+        compact.addGeneration("Test", "", 0, 0, True)
+    last_id = add_unlockable_generation(compact, prereq=247)
+    compact.unlockGeneration(99, last_id, {"from": user, "value": 42})
+
+    compact.activateGeneration(99, last_id, {"from": user})
+
+    assert last_id == 247
+    assert compact.tokenToGenerationId(99) == last_id
+    assert compact.tokenToUnlockedGenerations(99) == (1 << 0) | (1 << last_id)
+
+
+def test_compact_activate_uses_less_gas(compact, regular, user):
+    gas_used = {}
+    for name, contract in (("compact", compact), ("regular", regular)):
+        contract.mint(1, {"from": user})
+        gen_id = add_unlockable_generation(contract)
+        mint_gas = contract.mint(99, {"from": user}).gas_used
+        contract.unlockGeneration(99, gen_id, {"from": user, "value": 42})
+        activate_gas = contract.activateGeneration(99, gen_id, {"from": user}).gas_used
+        gas_used[name] = (mint_gas, activate_gas)
+
+    # neither layout writes per-token state on mint, the contracts only differ in function dispatch
+    assert abs(gas_used["compact"][0] - gas_used["regular"][0]) < 1000
+    assert gas_used["compact"][1] < gas_used["regular"][1]
@@ -0,0 +1,148 @@
+import pytest
+import brownie
+from brownie import MockNftGrants
+from scripts.merkle_grants import GrantTree
+from scripts.utilities import get_deployer_account, get_user_account
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+INDEX_UNLOCKS = 2
+INDEX_ACTIVATIONS = 3
+
+
+@pytest.fixture(scope="module", autouse=True)
+def user():
+    return get_user_account()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def tree():
+    # generation 1 granted to tokens 1-50, generation 2 to token 1 only
+    return GrantTree([(token_id, 1) for token_id in range(1, 51)] + [(1, 2)])
+
+
+@pytest.fixture(scope="module")
+def mimetic(module_isolation, deployer, user, tree):
+    # generations 1 and 2 are priced and unavailable for purchase, generation 2 requires generation 1
+    contract = MockNftGrants.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    contract.addGeneration("Reward", "", 42, 0, False)
+    contract.enableGeneration(1)
+    contract.addGeneration("Second reward", "", 42, 1, False)
+    contract.enableGeneration(2)
+    contract.mintBatch(1, 3, {"from": user})
+    contract.addGrantRoot(tree.root)
+    yield contract
+
+
+def test_add_grant_root_fails_when_not_owner(mimetic, user, tree):
+    with brownie.reverts("Ownable: caller is not the owner"):
+        mimetic.addGrantRoot(tree.root, {"from": user})
+
+
+def test_add_grant_root_fails_when_zero(mimetic):
+    with brownie.reverts("MimeticERC721: Invalid grant root"):
+        mimetic.addGrantRoot(b"\x00" * 32)
+
+
+def test_add_grant_root_emits_event(mimetic, tree):
+    tx = mimetic.addGrantRoot(tree.root)
+
+    assert tx.return_value == 1
+    assert mimetic.getGrantRootCount() == 2
+    assert tx.events["GrantRootAdded"]["rootId"] == 1
+
+
+def test_claim_grant_unlocks_without_payment_or_availability(mimetic, user, tree):
+    tx = mimetic.claimGrant(0, 2, 1, tree.proof(2, 1), {"from": user})
+
+    assert mimetic.isGenerationUnlocked(2, 1)
+    assert mimetic.generations(1)[INDEX_UNLOCKS] == 1
+    assert tx.events["GenerationUnlocked"]["tokenId"] == 2
+
+
+def test_claim_grant_fails_with_proof_of_other_grant(mimetic, user, tree):
+    with brownie.reverts("MimeticERC721: Invalid grant proof"):
+        mimetic.claimGrant(0, 2, 2, tree.proof(2, 1), {"from": user})
+
+
+def test_claim_grant_fails_when_claimed_twice(mimetic, user, tree):
+    mimetic.claimGrant(0, 2, 1, tree.proof(2, 1), {"from": user})
+
+    with brownie.reverts("MimeticERC721: Generation already unlocked"):
+        mimetic.claimGrant(0, 2, 1, tree.proof(2, 1), {"from": user})
+
+
+def test_claim_grant_fails_when_prerequisite_locked(mimetic, user, tree):
+    with brownie.reverts("MimeticERC721: Must unlock prerequisite generation first"):
+        mimetic.claimGrant(0, 1, 2, tree.proof(1, 2), {"from": user})
+
+
+def test_claim_grant_fails_when_generation_disabled(mimetic, user, tree):
+    mimetic.disableGeneration(2)
+
+    with brownie.reverts("MimeticERC721: Generation must be enabled"):
+        mimetic.claimGrant(0, 1, 2, tree.proof(1, 2), {"from": user})
+
+
+def test_claim_grant_fails_when_root_revoked(mimetic, user, tree):
+    tx = mimetic.revokeGrantRoot(0)
+
+    assert tx.events["GrantRootRevoked"]["rootId"] == 0
+    assert not mimetic.isGranted(0, 2, 1, tree.proof(2, 1))
+    with brownie.reverts("MimeticERC721: Invalid grant proof"):
+        mimetic.claimGrant(0, 2, 1, tree.proof(2, 1), {"from": user})
+
+
+def test_is_granted_false_for_unknown_root(mimetic, tree):
+    assert mimetic.isGranted(0, 2, 1, tree.proof(2, 1))
+    assert not mimetic.isGranted(1, 2, 1, tree.proof(2, 1))
+
+
+def test_claim_grants_nets_unlock_counters(mimetic, user, tree):
+    grants = [(1, 1), (2, 1), (3, 1), (1, 2)]
+
+    mimetic.claimGrants(
+        0,
+        [token_id for token_id, _ in grants],
+        [gen_id for _, gen_id in grants],
+        [tree.proof(*grant) for grant in grants],
+        {"from": user},
+    )
+
+    assert mimetic.generations(1)[INDEX_UNLOCKS] == 3
+    assert mimetic.generations(2)[INDEX_UNLOCKS] == 1
+    assert mimetic.isGenerationUnlocked(1, 2)
+
+
+def test_claim_grants_fails_when_length_mismatch(mimetic, user, tree):
+    with brownie.reverts("MimeticERC721: Array length mismatch"):
+        mimetic.claimGrants(0, [1, 2], [1, 1], [tree.proof(1, 1)], {"from": user})
+
+
+def test_activate_generation_with_grant_claims_and_activates(mimetic, user, tree):
+    mimetic.activateGenerationWithGrant(0, 3, 1, tree.proof(3, 1), {"from": user})
+
+    assert mimetic.tokenToGenerationId(3) == 1
+    assert mimetic.generations(1)[INDEX_UNLOCKS] == 1
+    assert mimetic.generations(1)[INDEX_ACTIVATIONS] == 1
+
+
+def test_activate_generation_with_grant_skips_claim_when_unlocked(mimetic, user, tree):
+    mimetic.claimGrant(0, 3, 1, tree.proof(3, 1), {"from": user})
+
+    mimetic.activateGenerationWithGrant(0, 3, 1, [], {"from": user})
+
+    assert mimetic.tokenToGenerationId(3) == 1
+    assert mimetic.generations(1)[INDEX_UNLOCKS] == 1
+
+
+def test_activate_generation_with_grant_fails_when_not_token_owner(mimetic, deployer, tree):
+    with brownie.reverts("MimeticERC721: Must be token owner"):
+        mimetic.activateGenerationWithGrant(0, 3, 1, tree.proof(3, 1), {"from": deployer})
@@ -0,0 +1,131 @@
+import pytest
+import brownie
+from brownie import MockNftSignatures, accounts, chain
+from scripts.relayer import domain_separator, sign_activation
+from scripts.utilities import get_deployer_account, get_user_account
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+INDEX_ACTIVATIONS = 3
+HOLDER_KEY = "0x" + "42" * 32
+OTHER_KEY = "0x" + "43" * 32
+
+
+@pytest.fixture(scope="module", autouse=True)
+def user():
+    return get_user_account()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def holder(deployer):
+    # signing needs the private key, which the unlocked accounts of the node do not expose
+    account = accounts.add(HOLDER_KEY)
+    deployer.transfer(account, "1 ether")
+    return account
+
+
+@pytest.fixture(scope="module")
+def mimetic(module_isolation, deployer, holder):
+    # tokens 1-3 held by `holder`, generation 1 auto-unlocked and generation 2 not unlocked by anyone
+    contract = MockNftSignatures.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    contract.addGeneration("Auto", "", 0, 0, True)
+    contract.enableGeneration(1)
+    contract.addGeneration("Locked", "", 42, 0, False)
+    contract.enableGeneration(2)
+    contract.mintBatch(1, 3, {"from": holder})
+    yield contract
+
+
+def sign(contract, token_id, generation_id, key=HOLDER_KEY, nonce=None, deadline=None):
+    nonce = contract.activationNonce(token_id) if nonce is None else nonce
+    deadline = chain.time() + 3600 if deadline is None else deadline
+    return sign_activation(key, contract.DOMAIN_SEPARATOR(), token_id, generation_id, nonce, deadline)
+
+
+def test_domain_separator_matches_eip712_domain(mimetic):
+    assert mimetic.DOMAIN_SEPARATOR() == domain_separator("MockNFT", "1", chain.id, mimetic.address)
+
+
+def test_activate_generation_with_sig_succeeds(mimetic, user):
+    tx = mimetic.activateGenerationWithSig(*sign(mimetic, 1, 1).as_args(), {"from": user})
+
+    assert mimetic.tokenToGenerationId(1) == 1
+    assert mimetic.activationNonce(1) == 1
+    assert mimetic.generations(1)[INDEX_ACTIVATIONS] == 1
+    assert tx.events["GenerationActivated"]["tokenId"] == 1
+
+
+def test_activate_generation_with_sig_fails_when_replayed(mimetic, user):
+    activation = sign(mimetic, 1, 1)
+    mimetic.activateGenerationWithSig(*activation.as_args(), {"from": user})
+
+    with brownie.reverts("MimeticERC721: Invalid signature"):
+        mimetic.activateGenerationWithSig(*activation.as_args(), {"from": user})
+
+
+def test_activate_generation_with_sig_fails_when_not_signed_by_owner(mimetic, user):
+    with brownie.reverts("MimeticERC721: Invalid signature"):
+        mimetic.activateGenerationWithSig(*sign(mimetic, 1, 1, key=OTHER_KEY).as_args(), {"from": user})
+
+
+def test_activate_generation_with_sig_fails_when_tampered(mimetic, user):
+    token_id, _, deadline, v, r, s = sign(mimetic, 1, 1).as_args()
+
+    with brownie.reverts("MimeticERC721: Invalid signature"):
+        mimetic.activateGenerationWithSig(token_id, 0, deadline, v, r, s, {"from": user})
+
+
+def test_activate_generation_with_sig_fails_when_expired(mimetic, user):
+    activation = sign(mimetic, 1, 1, deadline=chain.time() - 1)
+
+    with brownie.reverts("MimeticERC721: Signature expired"):
+        mimetic.activateGenerationWithSig(*activation.as_args(), {"from": user})
+
+
+def test_activate_generation_with_sig_fails_after_transfer(mimetic, holder, user):
+    activation = sign(mimetic, 1, 1)
+    mimetic.transferFrom(holder, user, 1, {"from": holder})
+
+    with brownie.reverts("MimeticERC721: Invalid signature"):
+        mimetic.activateGenerationWithSig(*activation.as_args(), {"from": user})
+
+
+def test_activate_generation_with_sig_fails_when_not_unlocked(mimetic, user):
+    with brownie.reverts("MimeticERC721: Must unlock first"):
+        mimetic.activateGenerationWithSig(*sign(mimetic, 1, 2).as_args(), {"from": user})
+
+
+def test_activate_generations_with_sigs_nets_counters(mimetic, user):
+    activations = [sign(mimetic, token_id, 1).as_args() for token_id in (1, 2, 3)]
+
+    tx = mimetic.activateGenerationsWithSigs(activations, {"from": user})
+
+    assert [mimetic.tokenToGenerationId(token_id) for token_id in (1, 2, 3)] == [1, 1, 1]
+    assert mimetic.generations(0)[INDEX_ACTIVATIONS] == 0
+    assert mimetic.generations(1)[INDEX_ACTIVATIONS] == 3
+    assert [e["tokenId"] for e in tx.events["GenerationActivated"]] == [1, 2, 3]
+
+
+def test_activate_generations_with_sigs_applies_sequential_nonces_of_a_token(mimetic, user):
+    activations = [sign(mimetic, 1, 1, nonce=0).as_args(), sign(mimetic, 1, 0, nonce=1).as_args()]
+
+    mimetic.activateGenerationsWithSigs(activations, {"from": user})
+
+    assert mimetic.tokenToGenerationId(1) == 0
+    assert mimetic.activationNonce(1) == 2
+
+
+def test_activate_generations_with_sigs_reverts_whole_batch(mimetic, user):
+    activations = [sign(mimetic, 1, 1).as_args(), sign(mimetic, 2, 1, key=OTHER_KEY).as_args()]
+
+    with brownie.reverts("MimeticERC721: Invalid signature"):
+        mimetic.activateGenerationsWithSigs(activations, {"from": user})
+
+    assert mimetic.activationNonce(1) == 0
@@ -0,0 +1,165 @@
+import brownie
+from brownie import MockNft
+from brownie.test import strategy
+from scripts.mimetic_fuzz import OPERATION_WEIGHTS, OWNER, TOKEN_IDS, fuzz, generate_sequences, new_model, sample_sequences
+from scripts.mimetic_model import MimeticModel, ModelRevert, Operation, PANIC
+
+
+def deploy_mock_nft(accounts):
+    contract = MockNft.deploy({"from": accounts[OWNER]})
+    contract.enableGeneration(0, {"from": accounts[OWNER]})
+    return contract
+
+
+def model_outcome(model, operation):
+    try:
+        return None, model.execute(operation)
+    except ModelRevert as exc:
+        return exc.reason, None
+
+
+def contract_outcome(contract, accounts, operation):
+    args = list(operation.args)
+    if operation.name == "transferFrom":
+        args[0], args[1] = accounts[args[0]], accounts[args[1]]
+
+    fn = getattr(contract, operation.name)
+    if operation.name == "activateGenerations":
+        fn = fn["uint256[],uint256"] if isinstance(args[1], int) else fn["uint256[],uint256[]"]
+
+    try:
+        if MimeticModel.OPERATIONS[operation.name][1]:
+            return None, fn(*args)
+        fn(*args, {"from": accounts[operation.sender], "value": operation.value})
+        return None, None
+    except brownie.exceptions.VirtualMachineError as exc:
+        return exc.revert_msg or PANIC, None
+
+
+def assert_same_outcome(contract, model, accounts, operation):
+    expected, _ = model_outcome(model, operation)
+    actual, _ = contract_outcome(contract, accounts, operation)
+
+    if expected == PANIC:
+        # the exact message of panics depends on the client, only check that it reverted
+        assert actual is not None, f"{operation} succeeded on chain, the model reverted"
+    else:
+        assert actual == expected, f"{operation}: chain {actual or 'succeeded'}, model {expected or 'succeeded'}"
+
+
+def assert_same_state(contract, model, accounts):
+    generations = contract.getGenerations(0, 2**256 - 1)
+    assert [tuple(gen) for gen in generations] == [gen.as_tuple() for gen in model.generations]
+
+    token_ids = list(TOKEN_IDS)
+    assert list(contract.effectiveUnlockMasks(token_ids)) == model.effective_unlock_masks(token_ids)
+    for token_id in token_ids:
+        assert contract.getUnlockableGenerations(token_id) == model.get_unlockable_generations(token_id)
+        assert contract.tokenToGenerationId(token_id) == model.token_to_generation_id(token_id)
+        assert contract.tokenToUnlockedGenerations(token_id) == model.token_to_unlocked_generations(token_id)
+        if token_id in model.owners:
+            assert contract.ownerOf(token_id) == accounts[model.owners[token_id]]
+        else:
+            with brownie.reverts("ERC721: owner query for nonexistent token"):
+                contract.ownerOf(token_id)
+
+
+def test_model_fuzz_keeps_invariants():
+    # invariants are checked after every step, a violation raises
+    outcomes = fuzz(500, 50, seed=1)
+
+    # every operation should also succeed sometimes, otherwise the generator only explores reverts
+    assert {name for name, outcome in outcomes if outcome is None} == set(OPERATION_WEIGHTS)
+
+
+def test_sampled_sequences_match_contract(isolation, accounts):
+    sequences = generate_sequences(500, 30, seed=2)
+
+    for operations, _ in sample_sequences(sequences, 5):
+        contract = deploy_mock_nft(accounts)
+        model = new_model()
+        for operation in operations:
+            assert_same_outcome(contract, model, accounts, operation)
+        assert_same_state(contract, model, accounts)
+
+
+class DifferentialStateMachine:
+    st_account = strategy("uint8", max_value=2)
+    st_token = strategy("uint256", min_value=min(TOKEN_IDS), max_value=max(TOKEN_IDS))
+    st_tokens = strategy("uint256[]", min_value=min(TOKEN_IDS), max_value=max(TOKEN_IDS), max_length=3)
+    st_generation = strategy("uint256", max_value=6)
+    st_generations = strategy("uint256[]", max_value=6, max_length=3)
+    st_price = strategy("uint256", max_value=42)
+    st_bool = strategy("bool")
+
+    def __init__(cls, accounts, contract):
+        cls.accounts = accounts
+        cls.contract = contract
+
+    def setup(self):
+        self.model = new_model()
+
+    def apply(self, name, args, sender=OWNER, value=0):
+        assert_same_outcome(self.contract, self.model, self.accounts, Operation(name, args, sender, value))
+
+    def unlock_value(self, generation_ids):
+        generations = self.model.generations
+        return sum(generations[gen_id].price for gen_id in generation_ids if 0 < gen_id < len(generations))
+
+    def rule_add_generation(self, st_price, prereq="st_generation", auto_unlock="st_bool"):
+        self.apply("addGeneration", ("Gen", "", 0 if auto_unlock else st_price, prereq, auto_unlock))
+
+    def rule_enable_generation(self, st_generation):
+        self.apply("enableGeneration", (st_generation,))
+
+    def rule_disable_generation(self, st_generation):
+        self.apply("disableGeneration", (st_generation,))
+
+    def rule_remove_generation(self, st_generation):
+        self.apply("removeGeneration", (st_generation,))
+
+    def rule_set_generation_availability(self, st_generation, st_bool):
+        self.apply("setGenerationAvailability", (st_generation, st_bool))
+
+    def rule_unlock_generation(self, st_token, st_generation, st_account):
+        self.apply("unlockGeneration", (st_token, st_generation), st_account, self.unlock_value([st_generation]))
+
+    def rule_unlock_generations(self, st_tokens, st_generations, st_account):
+        count = min(len(st_tokens), len(st_generations))
+        token_ids, generation_ids = st_tokens[:count], st_generations[:count]
+        self.apply("unlockGenerations", (token_ids, generation_ids), st_account, self.unlock_value(generation_ids))
+
+    def rule_activate_generation(self, st_token, st_generation):
+        self.apply("activateGeneration", (st_token, st_generation), self.model.owners.get(st_token, OWNER))
+
+    def rule_activate_generations(self, st_tokens, st_generation, st_account):
+        self.apply("activateGenerations", (st_tokens, st_generation), st_account)
+
+    def rule_mint(self, st_token, st_account):
+        self.apply("mint", (st_token,), st_account)
+
+    def rule_burn(self, st_token):
+        self.apply("burn", (st_token,))
+
+    def rule_transfer(self, st_token, st_account):
+        owner = self.model.owners.get(st_token, OWNER)
+        self.apply("transferFrom", (owner, st_account, st_token), owner)
+
+    def invariant_counters_match_token_state(self):
+        self.model.check_invariants()
+
+    def invariant_unlock_masks(self):
+        token_ids = list(TOKEN_IDS)
+        assert list(self.contract.effectiveUnlockMasks(token_ids)) == self.model.effective_unlock_masks(token_ids)
+
+    def teardown(self):
+        assert_same_state(self.contract, self.model, self.accounts)
+
+
+def test_stateful_differential(isolation, state_machine, accounts):
+    state_machine(
+        DifferentialStateMachine,
+        accounts,
+        deploy_mock_nft(accounts),
+        settings={"max_examples": 20, "stateful_step_count": 30, "derandomize": True},
+    )
@@ -0,0 +1,106 @@
+import pytest
+from brownie import MockNftSignatures, accounts, chain
+from scripts.relayer import ActivationRelayer, sign_activation
+from scripts.utilities import get_deployer_account
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+HOLDER_KEYS = ["0x" + "51" * 32, "0x" + "52" * 32]
+TOKENS_PER_HOLDER = 5
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def holders(deployer):
+    # signing needs the private key, which the unlocked accounts of the node do not expose
+    result = [accounts.add(key) for key in HOLDER_KEYS]
+    for holder in result:
+        deployer.transfer(holder, "1 ether")
+    return result
+
+
+@pytest.fixture(scope="module")
+def mimetic(module_isolation, deployer, holders):
+    # tokens 1-5 and 6-10 held by the two holders, generation 1 auto-unlocked
+    contract = MockNftSignatures.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    contract.addGeneration("Auto", "", 0, 0, True)
+    contract.enableGeneration(1)
+    for index, holder in enumerate(holders):
+        contract.mintBatch(index * TOKENS_PER_HOLDER + 1, TOKENS_PER_HOLDER, {"from": holder})
+    yield contract
+
+
+def sign(contract, token_id, generation_id, nonce=0, key=None):
+    key = key or HOLDER_KEYS[(token_id - 1) // TOKENS_PER_HOLDER]
+    return sign_activation(key, contract.DOMAIN_SEPARATOR(), token_id, generation_id, nonce, chain.time() + 3600)
+
+
+def test_relayer_submits_all_activations_in_one_batch(mimetic, deployer):
+    relayer = ActivationRelayer(mimetic, deployer)
+    for token_id in range(1, 11):
+        relayer.add(sign(mimetic, token_id, 1))
+
+    transactions = relayer.flush()
+
+    assert len(transactions) == 1
+    assert [mimetic.tokenToGenerationId(token_id) for token_id in range(1, 11)] == [1] * 10
+    assert relayer.pending == [] and relayer.rejected == []
+
+
+def test_relayer_splits_batches_by_gas(mimetic, deployer):
+    single_gas = mimetic.activateGenerationWithSig.estimate_gas(*sign(mimetic, 1, 1).as_args(), {"from": deployer})
+    relayer = ActivationRelayer(mimetic, deployer, max_batch_gas=3 * single_gas)
+    for token_id in range(1, 11):
+        relayer.add(sign(mimetic, token_id, 1))
+
+    transactions = relayer.flush()
+
+    assert len(transactions) > 1
+    assert all(tx.gas_used <= 3 * single_gas for tx in transactions)
+    assert [mimetic.tokenToGenerationId(token_id) for token_id in range(1, 11)] == [1] * 10
+
+
+def test_relayer_drops_invalid_activations(mimetic, deployer):
+    relayer = ActivationRelayer(mimetic, deployer)
+    relayer.add(sign(mimetic, 1, 1))
+    relayer.add(sign(mimetic, 2, 1, key=HOLDER_KEYS[1]))
+    relayer.add(sign(mimetic, 3, 2))
+
+    relayer.flush()
+
+    assert mimetic.tokenToGenerationId(1) == 1
+    assert [(activation.token_id, reason) for activation, reason in relayer.rejected] == [
+        (2, "MimeticERC721: Invalid signature"),
+        (3, "MimeticERC721: Generation must be enabled"),
+    ]
+
+
+def test_relayer_orders_nonces_of_a_token_across_batches(mimetic, deployer):
+    relayer = ActivationRelayer(mimetic, deployer)
+    relayer.add(sign(mimetic, 1, 0, nonce=1))
+    relayer.add(sign(mimetic, 1, 1, nonce=0))
+    relayer.add(sign(mimetic, 2, 1, nonce=0))
+
+    transactions = relayer.flush()
+
+    assert len(transactions) == 2
+    assert mimetic.tokenToGenerationId(1) == 0
+    assert mimetic.tokenToGenerationId(2) == 1
+    assert mimetic.activationNonce(1) == 2
+
+
+def test_relayer_rejects_used_nonces(mimetic, deployer):
+    activation = sign(mimetic, 1, 1)
+    relayer = ActivationRelayer(mimetic, deployer)
+    relayer.add(activation)
+    relayer.flush()
+
+    relayer.add(activation)
+    assert relayer.flush() == []
+    assert relayer.rejected == [(activation, "Nonce already used")]
@@ -0,0 +1,127 @@
+import pytest
+from brownie import MockNft, chain, web3
+from web3.exceptions import ContractLogicError
+from scripts.resolver import TokenUriResolver
+from scripts.utilities import get_deployer_account, get_user_account
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+TOKEN_IDS = [1, 2, 3, 4, 5]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def user():
+    return get_user_account()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def mimetic(module_isolation, deployer, user):
+    # tokens 1-5 on generation 0, generation 1 auto-unlocked and not revealed yet
+    contract = MockNft.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    contract.addGeneration("Auto", "", 0, 0, True)
+    contract.enableGeneration(1)
+    contract.mintBatch(1, len(TOKEN_IDS), {"from": user})
+    yield contract
+
+
+def test_resolver_warms_in_batches_and_serves_hits(mimetic):
+    resolver = TokenUriResolver(web3, mimetic.address, batch_size=2)
+
+    assert resolver.warm(TOKEN_IDS) == len(TOKEN_IDS)
+    assert resolver.stats.fetches == 3
+
+    assert resolver.resolve_many(TOKEN_IDS) == [mimetic.tokenURI(token_id) for token_id in TOKEN_IDS]
+    assert resolver.stats.hits == len(TOKEN_IDS)
+    assert resolver.stats.misses == 0
+    assert resolver.stats.fetches == 3
+
+
+def test_resolver_counts_duplicate_ids_once(mimetic):
+    resolver = TokenUriResolver(web3, mimetic.address)
+
+    assert resolver.resolve_many([1, 1, 2]) == [mimetic.tokenURI(1)] * 2 + [mimetic.tokenURI(2)]
+    assert (resolver.stats.hits, resolver.stats.misses) == (0, 2)
+
+    resolver.resolve_many([2, 2, 2])
+    assert (resolver.stats.hits, resolver.stats.misses) == (1, 2)
+
+
+def test_resolver_evicts_least_recently_used_beyond_max_entries(mimetic):
+    resolver = TokenUriResolver(web3, mimetic.address, max_entries=3)
+    resolver.resolve_many([1, 2, 3])
+    resolver.resolve(1)
+
+    resolver.resolve(4)
+
+    assert 2 not in resolver
+    assert all(token_id in resolver for token_id in (1, 3, 4))
+    assert resolver.stats.evictions == 1
+    assert resolver.stats.misses == 4
+
+
+def test_resolver_evicts_activated_token_only(mimetic, user):
+    resolver = TokenUriResolver(web3, mimetic.address)
+    resolver.warm(TOKEN_IDS)
+
+    mimetic.activateGeneration(2, 1, {"from": user})
+
+    assert resolver.poll() == 1
+    assert 2 not in resolver
+    assert len(resolver) == len(TOKEN_IDS) - 1
+    assert resolver.resolve(2) == mimetic.baseURI()
+
+
+def test_resolver_evicts_tokens_of_revealed_generation_only(mimetic, user):
+    mimetic.activateGeneration(1, 1, {"from": user})
+    mimetic.activateGeneration(3, 1, {"from": user})
+    resolver = TokenUriResolver(web3, mimetic.address)
+    resolver.warm(TOKEN_IDS)
+
+    mimetic.setGenerationBaseUri(1, "ipfs://revealed/")
+
+    assert resolver.poll() == 2
+    assert [token_id for token_id in TOKEN_IDS if token_id in resolver] == [2, 4, 5]
+    assert resolver.resolve(3) == "ipfs://revealed/3"
+
+
+def test_resolver_evicts_burned_token_and_ignores_transfers(mimetic, user, deployer):
+    resolver = TokenUriResolver(web3, mimetic.address)
+    resolver.warm(TOKEN_IDS)
+
+    mimetic.transferFrom(user, deployer, 4, {"from": user})
+    mimetic.burn(5)
+
+    assert resolver.poll() == 1
+    assert 4 in resolver
+    assert 5 not in resolver
+    with pytest.raises(ContractLogicError):
+        resolver.resolve(5)
+
+
+def test_resolver_warm_skips_nonexistent_tokens(mimetic):
+    resolver = TokenUriResolver(web3, mimetic.address)
+
+    assert resolver.warm([1, 99, 2]) == 2
+    assert 99 not in resolver
+
+
+def test_resolver_clears_cache_on_reorg(mimetic, user):
+    mimetic.activateGeneration(1, 1, {"from": user})
+    resolver = TokenUriResolver(web3, mimetic.address)
+    resolver.warm(TOKEN_IDS)
+
+    # replace the block the resolver has seen
+    chain.undo()
+    mimetic.mint(6, {"from": user})
+
+    resolver.poll()
+
+    assert len(resolver) == 0
+    assert resolver.checkpoint == web3.eth.block_number
@@ -0,0 +1,71 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from brownie import MockNft, web3  # noqa: E402
+from scripts.state_export import (  # noqa: E402
+    StateExporter,
+    generation_unlock_counts,
+    load_snapshot,
+    unlocked_generation_counts,
+    words_to_limbs,
+)
+from scripts.utilities import get_deployer_account, get_user_account  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+TOKEN_COUNT = 12
+
+
+@pytest.fixture(scope="module", autouse=True)
+def user():
+    return get_user_account()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+@pytest.fixture(scope="module")
+def mimetic(module_isolation, deployer, user):
+    # tokens 1-12, generation 1 unlocked by every third token and active on token 3, token 2 burned
+    contract = MockNft.deploy({"from": deployer})
+    contract.enableGeneration(0)
+    contract.addGeneration("Unlockable", "", 0, 0, False)
+    contract.enableGeneration(1)
+    contract.setGenerationAvailability(1, True)
+    contract.mintBatch(1, TOKEN_COUNT, {"from": user})
+    contract.unlockGenerations([3, 6, 9, 12], [1] * 4, {"from": user})
+    contract.activateGeneration(3, 1, {"from": user})
+    contract.burn(2, {"from": user})
+    yield contract
+
+
+def test_masks_are_counted_per_generation_and_per_token():
+    masks = np.stack([words_to_limbs([1 | 1 << 65, 1 << 3]), words_to_limbs([1, 0]), words_to_limbs([1 << 65, 0])])
+
+    assert masks.shape == (3, 8)
+    assert generation_unlock_counts(masks, 260, rows=2)[[0, 65, 259]].tolist() == [2, 2, 1]
+    assert generation_unlock_counts(masks, 260).sum() == 5
+    assert unlocked_generation_counts(masks).tolist() == [3, 1, 1]
+
+
+def test_export_matches_the_views(mimetic, user, tmp_path):
+    exporter = StateExporter(web3, mimetic.address, chunk_size=5, batch_size=4)
+
+    metadata = exporter.export(tmp_path)
+    snapshot = load_snapshot(tmp_path)
+
+    token_ids = [mimetic.tokenByIndex(index) for index in range(mimetic.totalSupply())]
+    assert snapshot["token_ids"].tolist() == token_ids
+    assert all(bytes(owner) == bytes.fromhex(user.address[2:]) for owner in snapshot["owners"])
+    assert snapshot["active_generations"].tolist() == [mimetic.tokenToGenerationId(token_id) for token_id in token_ids]
+    assert [int.from_bytes(row.tobytes(), "little") for row in snapshot["unlock_masks"]] == [
+        mimetic.tokenToUnlockedGenerations(token_id) for token_id in token_ids
+    ]
+    assert snapshot["generation_unlocks"].tolist() == [TOKEN_COUNT - 1, 4]
+    assert metadata["unlockMismatches"] == []
+    assert metadata["unlockedGenerations"] == TOKEN_COUNT - 1 + 4
+    assert snapshot["metadata"]["blockNumber"] == web3.eth.block_number
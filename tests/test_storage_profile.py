@@ -0,0 +1,128 @@
+import pytest
+from brownie import MockNft, web3
+from scripts.storage_profile import StorageProfile, main, modifier_spans, profile_transaction
+from scripts.utilities import get_deployer_account
+
+pytestmark = pytest.mark.usefixtures("isolation")
+
+
+SOURCE = """contract Guarded {
+    modifier whenReady(uint256 _id) {
+        require(_ready[_id], "not ready");
+        _;
+    }
+
+    function run(uint256 _id) public whenReady(_id) {
+        _ready[_id] = false;
+    }
+}
+"""
+MODIFIER_OFFSET = SOURCE.index("require")
+BODY_OFFSET = SOURCE.index("_ready[_id] = false")
+CONTRACT = "0x" + "11" * 20
+OTHER_CONTRACT = "0x" + "22" * 20
+
+
+@pytest.fixture(scope="module", autouse=True)
+def deployer():
+    return get_deployer_account()
+
+
+def step(op, gas_cost, fn="Guarded.run", jump_depth=0, depth=0, slot=None, offset=None, address=CONTRACT):
+    return {
+        "op": op,
+        "gasCost": gas_cost,
+        "depth": depth,
+        "fn": fn,
+        "jumpDepth": jump_depth,
+        "address": address,
+        "stack": [] if slot is None else [f"{slot:064x}"],
+        "source": {"filename": "Guarded.sol", "offset": (offset, offset + 1)} if offset is not None else False,
+    }
+
+
+def profile(trace):
+    return StorageProfile(trace, {"Guarded.sol": modifier_spans(SOURCE)})
+
+
+def test_modifier_spans():
+    assert modifier_spans(SOURCE) == [(SOURCE.index("modifier"), SOURCE.index("function") - 6, "Guarded.whenReady")]
+
+
+def test_modifier_steps_are_attributed_below_the_function():
+    result = profile([
+        step("CALLDATALOAD", 3, offset=SOURCE.index("function")),
+        step("SLOAD", 2100, slot=7, offset=MODIFIER_OFFSET),
+        step("SLOAD", 100, slot=7, offset=BODY_OFFSET),
+        step("SSTORE", 2900, slot=7, offset=BODY_OFFSET),
+    ])
+
+    run = result.root.children["Guarded.run"]
+    modifier = run.children["Guarded.whenReady"]
+    assert (modifier.gas, modifier.sloads, modifier.first_touch_sloads, modifier.repeated_sloads) == (2100, 1, 1, 0)
+    assert (run.gas, run.sloads, run.first_touch_sloads, run.repeated_sloads) == (3003, 1, 0, 1)
+    assert (run.sstores, run.first_touch_sstores) == (1, 0)
+    assert result.root.total("gas") == 5103
+
+
+def test_internal_calls_and_repeated_loads():
+    result = profile([
+        step("SLOAD", 2100, slot=1),
+        step("JUMP", 8),
+        step("SLOAD", 100, fn="Guarded._check", jump_depth=1, slot=1),
+        step("MSTORE", 6, fn="Guarded._check", jump_depth=1),
+        step("CALLDATACOPY", 9, fn="Guarded._check", jump_depth=1),
+        step("JUMP", 8),
+        step("SLOAD", 2100, slot=2),
+    ])
+
+    check = result.root.children["Guarded.run"].children["Guarded._check"]
+    assert (check.sloads, check.repeated_sloads, check.memory_gas) == (1, 1, 15)
+    assert result.repeated_loads() == [
+        (CONTRACT, 1, 2, {"Guarded.run": 1, "Guarded.run > Guarded._check": 1})
+    ]
+    assert "Guarded.run;Guarded._check 115" in result.folded().splitlines()
+
+
+def test_external_calls_are_nested_without_the_forwarded_gas():
+    result = profile([
+        step("CALL", 50000),
+        step("SLOAD", 2100, fn="Other.get", depth=1, slot=1, address=OTHER_CONTRACT),
+        step("RETURN", 0, fn="Other.get", depth=1, address=OTHER_CONTRACT),
+        step("SLOAD", 2100, slot=1),
+    ])
+
+    run = result.root.children["Guarded.run"]
+    assert run.children["Other.get"].gas == 2100
+    assert run.total("gas") == 4200
+    # the same slot number of another contract is not the same storage
+    assert run.first_touch_sloads == 1
+
+
+def test_report_lists_every_frame():
+    result = profile([step("SLOAD", 2100, slot=1, offset=MODIFIER_OFFSET), step("STOP", 0)])
+
+    lines = result.report().splitlines()
+    assert [line.split()[-2] for line in lines[1:]] == ["transaction", "Guarded.run", "Guarded.whenReady"]
+
+
+def test_profile_of_a_mimetic_transaction(module_isolation, deployer):
+    if not web3.supports_traces:
+        pytest.skip("the network has no debug_traceTransaction")
+    mimetic = MockNft.deploy({"from": deployer})
+    tx = mimetic.enableGeneration(0, {"from": deployer})
+
+    result = profile_transaction(tx)
+
+    enable = result.root.children["MockNft.enableGeneration"]
+    assert "MimeticERC721Base.whenGenerationDisabled" in enable.children
+    assert result.root.total("sloads") == sum(step["op"] == "SLOAD" for step in tx.trace)
+    # the modifier and the function body both read the generation
+    assert result.root.total("repeated_sloads") > 0
+
+
+def test_main_rejects_unknown_operations(monkeypatch):
+    monkeypatch.setenv("PROFILE_OPERATIONS", "mintBatch,mint")
+
+    with pytest.raises(SystemExit, match="Unknown PROFILE_OPERATIONS mint, expected any of enableGeneration"):
+        main()